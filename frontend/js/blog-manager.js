@@ -60,7 +60,7 @@ const blogManager = {
                 category: "Freedom in Christ",
                 status: "published",
                 date: "2025-01-05",
-                featuredImage: "../../assets/images/blog-post-5.jpg",
+                featuredImage: "../../assets/images/light-after-the-tunnel-english.jpg",
                 slug: "5"
             },
             {
@@ -70,7 +70,7 @@ const blogManager = {
                 category: "Purpose & Focus",
                 status: "published",
                 date: "2025-01-03",
-                featuredImage: "../../assets/images/blog-post-6.jpg",
+                featuredImage: "../../assets/images/light-after-the-tunnel-english.jpg",
                 slug: "6"
             }
         ];
@@ -1,39 +1,60 @@
 // General Service Worker for Raphael's Horizon
-const CACHE_NAME = 'raphaels-horizon-v1.0.0';
-const STATIC_CACHE = 'raphaels-horizon-static-v1.0.0';
+// One static cache per precache list: STATIC_CACHE_PREFIX-<PRECACHE_VERSION> (see below)
+const STATIC_CACHE_PREFIX = 'raphaels-horizon-static';
+const PRECACHE_REVISIONS = '/__precache-revisions';
 const DYNAMIC_CACHE = 'raphaels-horizon-dynamic-v1.0.0';
 
-// Resources to cache immediately
-const STATIC_ASSETS = [
-  '/',
-  '/index.html',
-  '/404.html',
-  '/css/styles.css',
-  '/css/auth.css',
-  '/js/scripts.js',
-  '/js/auth.js',
-  '/js/cookies.js',
-  '/assets/icons/logo-square.png',
-  '/assets/icons/favicon.ico',
-  '/pages/about/about-us.html',
-  '/pages/contact/contact-us.html',
-  '/pages/profile/index.html',
-  '/pages/books/books.html',
-  '/pages/books/audio-books/audio-books.html',
-  '/pages/books/audio-books/audio-books.css',
-  '/pages/books/audio-books/audio-config.js',
-  '/pages/books/audio-books/audio-player.js',
-  '/pages/books/audio-books/audio-security.js',
-  '/pages/books/audio-books/audio-library.js',
-  '/pages/books/books-reader/books-online.html',
-  '/pages/books/books-reader/book-reader.css',
-  '/pages/books/books-reader/books-online.css',
-  '/pages/books/books-reader/books-config.js',
-  '/pages/books/books-reader/book-reader.js',
-  '/pages/books/books-reader/books-online.js',
-  '/pages/books/books-reader/books-utils.js',
-  '/pages/blog/index.html'
+// Resources to cache immediately: generated by tools/sw_precache.py from the site's link
+// graph, do not edit by hand. Each revision is a hash of the file, so an update refetches
+// only the files that changed; PRECACHE_VERSION is a hash of the list.
+const PRECACHE_MANIFEST = [
+  { url: '/', revision: '6897357d2c' },
+  { url: '/index.html', revision: '6897357d2c' },
+  { url: '/css/styles.css', revision: '8e273c6de2' },
+  { url: '/css/auth.css', revision: '64abae338d' },
+  { url: '/site-manifest.json', revision: '743bb68286' },
+  { url: '/assets/icons/logo-square.png', revision: '496798af5f' },
+  { url: '/assets/images/light-after-the-tunnel-english.jpg', revision: '1792970343' },
+  { url: '/assets/images/light-after-the-tunnel-german.jpg', revision: 'dfdf40d8aa' },
+  { url: '/assets/images/divine-jurisprudence-english.jpg', revision: 'c86a14e59c' },
+  { url: '/assets/images/embracing-elegance.jpg', revision: 'f0c394a763' },
+  { url: '/assets/icons/logo-banner.jpg', revision: '4b20186708' },
+  { url: '/js/scripts.js', revision: '85a12c8bb6' },
+  { url: '/js/config.js', revision: 'e5c12a3829' },
+  { url: '/js/auth.js', revision: 'f76daecd7b' },
+  { url: '/js/cookies.js', revision: 'cb76278499' },
+  { url: '/js/pwa-install.js', revision: 'd043ad465d' },
+  { url: '/js/api.js', revision: '6fa90c68e2' },
+  { url: '/404.html', revision: '883c2cc912' },
+  { url: '/pages/contact/privacy-policy.html', revision: 'cd0708023f' },
+  { url: '/homepage.html', revision: 'c7cc4bb8ce' },
+  { url: '/pages/books/books.html', revision: '0452f7595f' },
+  { url: '/assets/images/gottliche-rechtsprechung.jpg', revision: '87a25dc417' },
+  { url: '/assets/images/living-a-life-with-purpose.jpg', revision: '08de289876' },
+  { url: '/pages/books/books-online.html', revision: '671bb7546c' },
+  { url: '/assets/icons/favicon.ico', revision: '496798af5f' },
+  { url: '/js/library-auth.js', revision: '4a1ad603c9' },
+  { url: '/pages/books/audio-books.html', revision: '6736c49a52' },
+  { url: '/pages/about/about-us.html', revision: 'b15460fa98' },
+  { url: '/pages/about/assimagbe-albert-raphael.html', revision: '3c553c4447' },
+  { url: '/pages/contact/contact-us.html', revision: '6aa2579f22' },
+  { url: '/js/forms.js', revision: '217cee4ad9' },
+  { url: '/pages/contact/speaking-request.html', revision: 'eb8e9e5a86' },
+  { url: '/pages/blog/index.html', revision: '053543f1a7' },
+  { url: '/assets/images/about-raphaelshorizon.png', revision: '496798af5f' },
+  { url: '/assets/images/blog-post-2.jpg', revision: '271a4d5f32' },
+  { url: '/assets/images/blog-post-3.jpg', revision: '4d906e6064' },
+  { url: '/assets/images/blog-post-4.jpg', revision: '1f049ce0a8' },
+  { url: '/pages/blog/categories.html', revision: '6c9779186b' },
+  { url: '/donation.html', revision: 'fe3f038c74' },
+  { url: '/pages/profile/login.html', revision: '88f55c25ce' },
+  { url: '/pages/profile/index.html', revision: 'e944dd0f10' },
+  { url: '/pages/profile/subscription.html', revision: '0630a3f125' },
+  { url: '/pages/profile/library.html', revision: '8cddfd3c6d' },
+  { url: '/pages/contact/index.html', revision: 'cc0d76dbce' },
 ];
+const PRECACHE_VERSION = '67142c4bf6';
+const STATIC_CACHE = STATIC_CACHE_PREFIX + '-' + PRECACHE_VERSION;
 
 // External resources that should be cached
 const EXTERNAL_ASSETS = [
@@ -46,10 +67,7 @@ self.addEventListener('install', event => {
   console.log('[SW] Installing service worker');
   event.waitUntil(
     Promise.all([
-      caches.open(STATIC_CACHE).then(cache => {
-        console.log('[SW] Caching static assets');
-        return cache.addAll(STATIC_ASSETS);
-      }),
+      precacheStaticAssets(),
       caches.open(DYNAMIC_CACHE).then(cache => {
         console.log('[SW] Caching external assets');
         return cache.addAll(EXTERNAL_ASSETS);
@@ -60,6 +78,50 @@ self.addEventListener('install', event => {
   );
 });
 
+// Fill this version's static cache: entries whose revision is unchanged are copied from the
+// previous version's cache, the others are fetched. The previous cache is left as it is (its
+// worker may still be serving from it) and is deleted on activate.
+async function precacheStaticAssets() {
+  const cache = await caches.open(STATIC_CACHE);
+  const previousCache = await findPreviousStaticCache();
+  const stored = previousCache && await previousCache.match(PRECACHE_REVISIONS);
+  const previous = stored ? await stored.json() : {};
+  const current = {};
+  const changed = [];
+  let copied = 0;
+  for (const { url, revision } of PRECACHE_MANIFEST) {
+    current[url] = revision;
+    if (await cache.match(url)) {
+      continue;   // left by an earlier, interrupted install of this version
+    }
+    const response = previous[url] === revision && await previousCache.match(url);
+    if (response) {
+      await cache.put(url, response);
+      copied++;
+    } else {
+      changed.push(new Request(url, { cache: 'reload' }));
+    }
+  }
+  console.log('[SW] Caching static assets:', changed.length, 'fetched,', copied, 'copied of', PRECACHE_MANIFEST.length);
+  await cache.addAll(changed);
+  await cache.put(PRECACHE_REVISIONS, new Response(JSON.stringify(current), {
+    headers: { 'Content-Type': 'application/json' }
+  }));
+}
+
+// The most recent other static cache with a complete precache (its revisions are written last)
+async function findPreviousStaticCache() {
+  const names = (await caches.keys()).filter(name => name !== STATIC_CACHE &&
+    (name === STATIC_CACHE_PREFIX || name.startsWith(STATIC_CACHE_PREFIX + '-')));
+  for (const name of names.reverse()) {
+    const cache = await caches.open(name);
+    if (await cache.match(PRECACHE_REVISIONS)) {
+      return cache;
+    }
+  }
+  return null;
+}
+
 // Activate event - clean up old caches
 self.addEventListener('activate', event => {
   console.log('[SW] Activating service worker');
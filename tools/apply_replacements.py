@@ -1,9 +1,21 @@
 #!/usr/bin/env python3
 """
-Apply targeted replacements to HTML files under frontend/ to fix broken links and assets.
+Apply targeted replacements to HTML, CSS and JS files under frontend/ to fix broken links and assets.
+- The replacements below run through one rewrite_engine.RuleSet, with the same result as
+  applying them one after another in this order: each file is scanned once, or once per
+  rule when the RuleSet finds rules that can interact (reported as a warning).
+- Prints the per-rule hit counts and warns about interacting, duplicate and shadowed rules.
+- --verify also rewrites every file one rule pass at a time and compares (exit 1 if any
+  differs).
+
+Run from repo root: python tools/apply_replacements.py [--root DIR] [--verify] [-v]
 """
+import argparse
 import os
 import re
+import sys
+
+from rewrite_engine import RuleSet
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 FRONTEND_DIR = os.path.join(ROOT, 'frontend')
@@ -16,14 +28,14 @@ replacements = [
     (re.compile(r'href="books\.html"'), 'href="/pages/books/books.html"'),
     (re.compile(r'href="books-online\.html"'), 'href="/pages/books/books-online.html"'),
     (re.compile(r'href="audio-books\.html"'), 'href="/pages/books/audio-books.html"'),
-    (re.compile(r'href="../books\.html"'), 'href="/pages/books/books.html"'),
-    (re.compile(r'href="../books/books\.html"'), 'href="/pages/books/books.html"'),
+    (re.compile(r'href="\.\./books\.html"'), 'href="/pages/books/books.html"'),
+    (re.compile(r'href="\.\./books/books\.html"'), 'href="/pages/books/books.html"'),
 
     # 3. Fix contact
     (re.compile(r'href="contact-us\.html"'), 'href="/pages/contact/contact-us.html"'),
-    (re.compile(r'href="../contact/index\.html"'), 'href="/pages/contact/index.html"'),
-    (re.compile(r'href="../contact/speaking-request\.html"'), 'href="/pages/contact/speaking-request.html"'),
-    (re.compile(r'href="../contact/privacy-policy\.html"'), 'href="/pages/contact/privacy-policy.html"'),
+    (re.compile(r'href="\.\./contact/index\.html"'), 'href="/pages/contact/index.html"'),
+    (re.compile(r'href="\.\./contact/speaking-request\.html"'), 'href="/pages/contact/speaking-request.html"'),
+    (re.compile(r'href="\.\./contact/privacy-policy\.html"'), 'href="/pages/contact/privacy-policy.html"'),
 
     # 4. Fix about
     (re.compile(r'href="about-us\.html"'), 'href="/pages/about/about-us.html"'),
@@ -36,15 +48,12 @@ replacements = [
     (re.compile(r'href="blog-post-(\d+)\.html"'), 'href="/pages/blog/post-\1.html"'),
 
     # 6. Fix profile
-    (re.compile(r'href="../profile/index\.html"'), 'href="/pages/profile/index.html"'),
-    (re.compile(r'href="../profile/subscription\.html"'), 'href="/pages/profile/subscription.html"'),
-    (re.compile(r'href="../profile/library\.html"'), 'href="/pages/profile/library.html"'),
+    (re.compile(r'href="\.\./profile/index\.html"'), 'href="/pages/profile/index.html"'),
+    (re.compile(r'href="\.\./profile/subscription\.html"'), 'href="/pages/profile/subscription.html"'),
+    (re.compile(r'href="\.\./profile/library\.html"'), 'href="/pages/profile/library.html"'),
 
     # 7. Fix root index
-    (re.compile(r'href="../../index\.html"'), 'href="/index.html"'),
-    (re.compile(r'href="../../index\.html"'), 'href="/index.html"'),
-    (re.compile(r'href="../../index\.html"'), 'href="/index.html"'),
-    (re.compile(r'href="../../index\.html"'), 'href="/index.html"'),
+    (re.compile(r'href="\.\./\.\./index\.html"'), 'href="/index.html"'),
 
     # 8. JS replacements
     (re.compile(r'src="\.{2}/\.{2}/js/main\.js"'), 'src="/js/scripts.js"'),
@@ -68,37 +77,58 @@ replacements = [
     (re.compile(r'assets/images/author-raphael\.jpg'), 'assets/images/raphael.png'),
 
     # 10. Contact CTA fix
-    (re.compile(r'href="\.{2}/books\.html"'), 'href="/pages/books/books.html"'),
     (re.compile(r'href="\.{2}/books/books-online\.html"'), 'href="/pages/books/books-online.html"'),
     (re.compile(r'href="\.{2}/books/audio-books\.html"'), 'href="/pages/books/audio-books.html"'),
-    (re.compile(r'href="\.{2}/contact/index\.html"'), 'href="/pages/contact/index.html"'),
 
     # 11. remove relative leftover that point to pages root like ../books.html
     (re.compile(r'href="\.{1}/books\.html"'), 'href="/pages/books/books.html"'),
     # Replace invalid blog post placeholders (post-.html) and other placeholder links
-    (re.compile(r'href="/pages/blog/post-[^\"]+\.html"'), 'href="#"'),
+    (re.compile(r'href="/pages/blog/post-\.html"'), 'href="#"'),
     (re.compile(r'href="previous-post\.html"'), 'href="#"'),
     (re.compile(r'href="next-post\.html"'), 'href="#"'),
 ]
 
-# Process files
-changed_files = []
-for root, dirs, files in os.walk(FRONTEND_DIR):
-    for f in files:
-        if not f.lower().endswith('.html') and not f.lower().endswith('.css') and not f.lower().endswith('.js'):
-            continue
-        file_path = os.path.join(root, f)
-        with open(file_path, 'r', encoding='utf-8') as fh:
-            content = fh.read()
-        new_content = content
-        for pattern, repl in replacements:
-            new_content = pattern.sub(repl, new_content)
-        if new_content != content:
-            with open(file_path, 'w', encoding='utf-8') as fh:
-                fh.write(new_content)
-            changed_files.append(os.path.relpath(file_path, ROOT))
-
-print('Updated files:')
-for cf in changed_files:
-    print(' ', cf)
-print('\nDone')
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Apply the link/asset replacements below to HTML, CSS and JS files.')
+    ap.add_argument('--root', default=FRONTEND_DIR, help='site root (default: frontend/)')
+    ap.add_argument('--verify', action='store_true',
+                    help='also apply the rules one pass at a time and compare (exit 1 if any file differs)')
+    ap.add_argument('-v', '--verbose', action='store_true', help='list the hit count of every rule')
+    args = ap.parse_args(argv)
+    frontend_dir = os.path.abspath(args.root)
+    rules = RuleSet(replacements)
+
+    # Process files
+    changed_files = []
+    mismatched = []
+    for root, dirs, files in os.walk(frontend_dir):
+        for f in files:
+            if not f.lower().endswith('.html') and not f.lower().endswith('.css') and not f.lower().endswith('.js'):
+                continue
+            file_path = os.path.join(root, f)
+            with open(file_path, 'r', encoding='utf-8') as fh:
+                content = fh.read()
+            new_content = rules.rewrite(content)
+            if args.verify and new_content != rules.sequential(content):
+                mismatched.append(os.path.relpath(file_path, ROOT))
+            if new_content != content:
+                with open(file_path, 'w', encoding='utf-8') as fh:
+                    fh.write(new_content)
+                changed_files.append(os.path.relpath(file_path, ROOT))
+
+    print('Updated files:')
+    for cf in changed_files:
+        print(' ', cf)
+    print()
+    rules.print_report(args.verbose)
+    if args.verify:
+        print('Verify: {} files differ from sequential application'.format(len(mismatched)))
+        for path in mismatched:
+            print(' ', path)
+    print('\nDone')
+    return 1 if mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
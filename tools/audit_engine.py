@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Rule engine for the page audits (audit_frontend.py, audit_public.py).
+- A rule is a small class that subscribes to the tag events it needs (start tags, end
+  tags, character data) and turns them into issue strings when the page is finished.
+- Every file is parsed once (by an HTML5 html_backend parser), however many rules run; each
+  event goes only to the rules subscribed to that tag. Byte-identical files in several
+  roots (frontend/ and public/) are parsed once and the recorded events are replayed.
+- Optional per-rule timing shows which rules cost the most on large sites.
+- Scored rules (scored = True, e.g. the performance rules) also deduct penalty() points
+  from a per-page score out of 100, kept in AuditEngine.scores by path.
+
+Writing a rule:
+    class NoMarquee(Rule):
+        name = 'no-marquee'
+        tags = ('marquee',)
+
+        def begin(self, page):
+            self.found = 0
+
+        def start(self, tag, attrs, offset):
+            self.found += 1
+
+        def finish(self):
+            return ['<marquee> used {} times'.format(self.found)] if self.found else []
+
+Rules are registered in audit_rules.RULES; see audit_frontend.py for the CLI.
+"""
+import hashlib
+import os
+import time
+
+from fs_snapshot import FsSnapshot
+from html_backend import get_backend
+
+START, END, DATA = 'start', 'end', 'data'
+
+
+class Rule:
+    """Base class: subscribe with tags / end_tags / text, report from finish()."""
+    name = ''
+    description = ''
+    tags = ()         # start tags to receive; '*' for every tag
+    end_tags = ()     # end tags to receive; '*' for every tag
+    text = False      # receive character data
+    scored = False    # counts towards the page score through penalty()
+
+    def begin(self, page):
+        """Reset per-page state; page is the PageContext being audited."""
+
+    def start(self, tag, attrs, offset):
+        pass
+
+    def end(self, tag):
+        pass
+
+    def data(self, text):
+        pass
+
+    def finish(self):
+        """Issue strings for the page just audited."""
+        return []
+
+    def penalty(self):
+        """Score points lost by the page just audited (scored rules, called after finish)."""
+        return 0
+
+
+class PageContext:
+    """What a rule may need about the page besides its events."""
+    __slots__ = ('path', 'root', 'fs')
+
+    def __init__(self, path, root, fs):
+        self.path = path
+        self.root = root
+        self.fs = fs
+
+
+class EventRecorder:
+    """html_backend handler that records one parse as (kind, tag, attrs, offset) / (DATA, text) events."""
+
+    def __init__(self):
+        self.events = []
+
+    def start(self, tag, attrs, offset):
+        self.events.append((START, tag, attrs, offset))
+
+    def end(self, tag):
+        self.events.append((END, tag))
+
+    def data(self, text, offset):
+        self.events.append((DATA, text))
+
+
+def record_events(text, backend=None):
+    recorder = EventRecorder()
+    get_backend(backend, html5=True).parse(text, recorder)
+    return recorder.events
+
+
+class AuditEngine:
+    """Run a set of rules over every HTML file under one or more roots."""
+
+    def __init__(self, rules, timing=False, backend=None):
+        self.rules = list(rules)
+        self.timing = timing
+        self.backend = get_backend(backend, html5=True)
+        self.seconds = {rule.name: 0.0 for rule in self.rules}
+        self.calls = {rule.name: 0 for rule in self.rules}
+        self.parse_seconds = 0.0
+        self.parsed = 0
+        self.scores = {}  # path -> score out of 100, when any rule is scored
+        self._scored = [r for r in self.rules if r.scored]
+        self._start = {}
+        self._end = {}
+        self._all_start = [r for r in self.rules if '*' in r.tags]
+        self._all_end = [r for r in self.rules if '*' in r.end_tags]
+        self._text = [r for r in self.rules if r.text]
+        for rule in self.rules:
+            for tag in rule.tags:
+                if tag != '*':
+                    self._start.setdefault(tag, []).append(rule)
+            for tag in rule.end_tags:
+                if tag != '*':
+                    self._end.setdefault(tag, []).append(rule)
+
+    def _call(self, rule, method, *args):
+        if self.timing:
+            t = time.perf_counter()
+            result = getattr(rule, method)(*args)
+            self.seconds[rule.name] += time.perf_counter() - t
+            self.calls[rule.name] += 1
+            return result
+        return getattr(rule, method)(*args)
+
+    def audit_events(self, page, events):
+        """Replay one page's events through the rules; return [issue strings] in rule order."""
+        for rule in self.rules:
+            self._call(rule, 'begin', page)
+        starts, ends, text = self._start, self._end, self._text
+        all_start, all_end = self._all_start, self._all_end
+        for event in events:
+            kind = event[0]
+            if kind == START:
+                _, tag, attrs, offset = event
+                for rule in starts.get(tag, ()):
+                    self._call(rule, 'start', tag, attrs, offset)
+                for rule in all_start:
+                    self._call(rule, 'start', tag, attrs, offset)
+            elif kind == END:
+                tag = event[1]
+                for rule in ends.get(tag, ()):
+                    self._call(rule, 'end', tag)
+                for rule in all_end:
+                    self._call(rule, 'end', tag)
+            elif text:
+                for rule in text:
+                    self._call(rule, 'data', event[1])
+        issues = []
+        for rule in self.rules:
+            issues.extend(self._call(rule, 'finish'))
+        if self._scored:
+            self.scores[page.path] = max(0, 100 - sum(rule.penalty() for rule in self._scored))
+        return issues
+
+    def run(self, roots):
+        """Yield (root, path, issues) for every HTML file, roots in order, files in walk order."""
+        memo = {} if len(roots) > 1 else None
+        for root in roots:
+            root = os.path.abspath(root)
+            fs = FsSnapshot.scan(root)
+            for path in fs.iter_files(('.html',)):
+                with open(path, 'rb') as fh:
+                    data = fh.read()
+                events = None
+                if memo is not None:
+                    digest = hashlib.sha1(data).hexdigest()
+                    events = memo.get(digest)
+                if events is None:
+                    t = time.perf_counter()
+                    events = record_events(data.decode('utf-8'), self.backend)
+                    self.parse_seconds += time.perf_counter() - t
+                    self.parsed += 1
+                    if memo is not None:
+                        memo[digest] = events
+                yield root, path, self.audit_events(PageContext(path, root, fs), events)
+
+    def timing_report(self):
+        """[(rule name, seconds, calls)] slowest first."""
+        return sorted(((n, self.seconds[n], self.calls[n]) for n in self.seconds),
+                      key=lambda r: r[1], reverse=True)
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Simple audit of frontend HTML pages for common best practices.
-Checks:
+Checks (rules in audit_rules.py):
 - Each page has one <title>
 - Each page has one <meta name="viewport">
 - Each page has html[lang]
@@ -9,102 +9,92 @@ Checks:
 - No <img> without alt text (or alt empty)
 - External links with target="_blank" should have rel="noopener noreferrer"
 - Flag uses of href="#" as placeholder links
+- Each page has a <meta name="description">
+- No duplicate ids on a page
+Performance checks (perf_rules.py), each scored towards a per-page performance score:
+- No render-blocking <script src> in <head>; no script included twice
+- <img> has width/height, below-the-fold images are lazy, images are not far larger than shown
+- Stylesheets do not chain @import
 
-Run from repo root: python tools/audit_frontend.py
+All rules run from one parse per file through the rule engine (audit_engine.py); several
+roots can be audited in one run (identical pages are parsed once), --rules picks a subset
+and --timing prints what each rule cost.
+
+Run from repo root: python tools/audit_frontend.py [--root DIR ...] [--rules title h1] [--timing]
 """
+import argparse
 import os
-import re
-from html.parser import HTMLParser
+import sys
+
+from audit_engine import AuditEngine
+from audit_rules import RULES, make_rules
+from html_backend import html5_backends
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 FRONTEND_DIR = os.path.join(ROOT, 'frontend')
 
-class PageAudit(HTMLParser):
-    def __init__(self):
-        super().__init__()
-        self.titles = 0
-        self.has_viewport = False
-        self.lang = None
-        self.h1_count = 0
-        self.imgs_missing_alt = []
-        self.external_blank_no_rel = []
-        self.has_html_lang = False
-        self.placeholder_links = []
 
-    def handle_starttag(self, tag, attrs):
-        attrs = dict(attrs)
-        if tag == 'title':
-            self.titles += 1
-        if tag == 'meta' and attrs.get('name') == 'viewport':
-            self.has_viewport = True
-        if tag == 'html' and 'lang' in attrs:
-            self.has_html_lang = True
-            self.lang = attrs['lang']
-        if tag == 'h1':
-            self.h1_count += 1
-        if tag == 'img':
-            alt = attrs.get('alt')
-            if alt is None or alt.strip() == '':
-                self.imgs_missing_alt.append(attrs.get('src', ''))
-        if tag == 'a' and attrs.get('target') == '_blank':
-            rel = attrs.get('rel','')
-            if 'noopener' not in rel or 'noreferrer' not in rel:
-                self.external_blank_no_rel.append(attrs.get('href',''))
-        if tag == 'a' and attrs.get('href') == '#':
-            self.placeholder_links.append(attrs.get('href'))
+def print_timing(engine):
+    print('\nRule timing ({} files parsed by {} in {:.1f} ms):'.format(
+        engine.parsed, engine.backend.name, engine.parse_seconds * 1000))
+    for name, seconds, calls in engine.timing_report():
+        print('  {:24} {:9.2f} ms {:9} calls'.format(name, seconds * 1000, calls))
 
 
-def audit_file(file_path):
-    a = PageAudit()
-    with open(file_path, 'r', encoding='utf-8') as fh:
-        content = fh.read()
-    a.feed(content)
-    return a
+def print_scores(engine, roots, lowest=10):
+    for root in roots:
+        scores = sorted((score, os.path.relpath(path, ROOT)) for path, score in engine.scores.items()
+                        if path.startswith(root + os.sep))
+        if not scores:
+            continue
+        print('\nPerformance scores{}: average {:.0f}/100'.format(
+            ' ({})'.format(os.path.relpath(root, ROOT)) if len(roots) > 1 else '',
+            sum(s for s, _ in scores) / len(scores)))
+        for score, page in scores[:lowest]:
+            if score < 100:
+                print('  {:3}/100  {}'.format(score, page))
 
-html_files = []
-for root, dirs, files in os.walk(FRONTEND_DIR):
-    for f in files:
-        if f.lower().endswith('.html'):
-            html_files.append(os.path.join(root, f))
 
-issues = []
-print('Auditing {} pages...'.format(len(html_files)))
-for hf in html_files:
-    audit = audit_file(hf)
-    page_issues = []
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Audit HTML pages for common best practices.')
+    ap.add_argument('--root', action='append', help='site root (repeatable; default: frontend/)')
+    ap.add_argument('--rules', nargs='+', choices=[r.name for r in RULES], help='run only these rules')
+    ap.add_argument('--timing', action='store_true', help='report time spent per rule')
+    ap.add_argument('--parser', choices=('auto',) + tuple(html5_backends()), default=None,
+                    help='HTML parser backend (default: fastest installed, or $SITE_HTML_BACKEND)')
+    args = ap.parse_args(argv)
+    roots = [os.path.abspath(r) for r in (args.root or [FRONTEND_DIR])]
 
-    if audit.titles == 0:
-        page_issues.append('Missing <title>')
-    if not audit.has_viewport:
-        page_issues.append('Missing <meta name="viewport">')
-    if not audit.has_html_lang:
-        page_issues.append('<html> tag missing lang attribute')
-    if audit.h1_count == 0:
-        page_issues.append('No <h1> found')
-    elif audit.h1_count > 1:
-        page_issues.append('Multiple <h1> tags ({})'.format(audit.h1_count))
-    if audit.imgs_missing_alt:
-        page_issues.append('Images with missing/empty alt: {}'.format(', '.join(audit.imgs_missing_alt[:5])))
-    if audit.external_blank_no_rel:
-        page_issues.append('External links with target=_blank missing rel=noopener noreferrer: {}'.format(', '.join(audit.external_blank_no_rel[:5])))
-    if audit.placeholder_links:
-        page_issues.append('Placeholder links (href="#") count: {}'.format(len(audit.placeholder_links)))
+    engine = AuditEngine(make_rules(args.rules), timing=args.timing, backend=args.parser)
+    issues = {root: [] for root in roots}
+    counts = dict.fromkeys(roots, 0)
+    for root, path, page_issues in engine.run(roots):
+        counts[root] += 1
+        if page_issues:
+            issues[root].append((os.path.relpath(path, ROOT), page_issues))
 
-    if page_issues:
-        issues.append((os.path.relpath(hf, ROOT), page_issues))
+    for root in roots:
+        if len(roots) > 1:
+            print('\n== {} =='.format(os.path.relpath(root, ROOT)))
+        print('Auditing {} pages...'.format(counts[root]))
+        print('\nAudit Results:')
+        if not issues[root]:
+            print('No issues detected')
+        else:
+            for page, ps in issues[root]:
+                print('- {}: '.format(page))
+                for p in ps:
+                    print('    -', p)
+    print_scores(engine, roots)
+    if args.timing:
+        print_timing(engine)
 
-print('\nAudit Results:')
-if not issues:
-    print('No issues detected')
-else:
-    for page, ps in issues:
-        print('- {}: '.format(page))
-        for p in ps:
-            print('    -', p)
-
-# Exit nonzero if issues found
-if issues:
-    raise SystemExit(1)
-else:
+    # Exit nonzero if issues found
+    if any(issues.values()):
+        return 1
     print('\nAll pages passed the audit')
+    return 0
+
 
+if __name__ == '__main__':
+    sys.exit(main())
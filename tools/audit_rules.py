@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+SEO / accessibility rules for the audit engine (see audit_engine.py).
+Each rule subscribes only to the tags it inspects; RULES lists them in report order,
+followed by the performance rules from perf_rules.py.
+"""
+from audit_engine import Rule
+from perf_rules import PERF_RULES
+
+
+class TitleRule(Rule):
+    name = 'title'
+    description = 'Each page has one <title>'
+    tags = ('title',)
+
+    def begin(self, page):
+        self.count = 0
+
+    def start(self, tag, attrs, offset):
+        self.count += 1
+
+    def finish(self):
+        return ['Missing <title>'] if self.count == 0 else []
+
+
+class ViewportRule(Rule):
+    name = 'viewport'
+    description = 'Each page has one <meta name="viewport">'
+    tags = ('meta',)
+
+    def begin(self, page):
+        self.found = False
+
+    def start(self, tag, attrs, offset):
+        if attrs.get('name') == 'viewport':
+            self.found = True
+
+    def finish(self):
+        return [] if self.found else ['Missing <meta name="viewport">']
+
+
+class LangRule(Rule):
+    name = 'lang'
+    description = 'Each page has html[lang]'
+    tags = ('html',)
+
+    def begin(self, page):
+        self.found = False
+
+    def start(self, tag, attrs, offset):
+        if 'lang' in attrs:
+            self.found = True
+
+    def finish(self):
+        return [] if self.found else ['<html> tag missing lang attribute']
+
+
+class H1Rule(Rule):
+    name = 'h1'
+    description = 'Each page has exactly one <h1>'
+    tags = ('h1',)
+
+    def begin(self, page):
+        self.count = 0
+
+    def start(self, tag, attrs, offset):
+        self.count += 1
+
+    def finish(self):
+        if self.count == 0:
+            return ['No <h1> found']
+        if self.count > 1:
+            return ['Multiple <h1> tags ({})'.format(self.count)]
+        return []
+
+
+class ImgAltRule(Rule):
+    name = 'img-alt'
+    description = 'No <img> without alt text (or alt empty)'
+    tags = ('img',)
+
+    def begin(self, page):
+        self.missing = []
+
+    def start(self, tag, attrs, offset):
+        alt = attrs.get('alt')
+        if alt is None or alt.strip() == '':
+            self.missing.append(attrs.get('src', ''))
+
+    def finish(self):
+        if self.missing:
+            return ['Images with missing/empty alt: {}'.format(', '.join(self.missing[:5]))]
+        return []
+
+
+class NoopenerRule(Rule):
+    name = 'noopener'
+    description = 'Links with target="_blank" have rel="noopener noreferrer"'
+    tags = ('a',)
+
+    def begin(self, page):
+        self.missing = []
+
+    def start(self, tag, attrs, offset):
+        if attrs.get('target') == '_blank':
+            rel = attrs.get('rel') or ''
+            if 'noopener' not in rel or 'noreferrer' not in rel:
+                self.missing.append(attrs.get('href', ''))
+
+    def finish(self):
+        if self.missing:
+            return ['External links with target=_blank missing rel=noopener noreferrer: {}'.format(
+                ', '.join(self.missing[:5]))]
+        return []
+
+
+class PlaceholderLinkRule(Rule):
+    name = 'placeholder-links'
+    description = 'Flag uses of href="#" as placeholder links'
+    tags = ('a',)
+
+    def begin(self, page):
+        self.count = 0
+
+    def start(self, tag, attrs, offset):
+        if attrs.get('href') == '#':
+            self.count += 1
+
+    def finish(self):
+        return ['Placeholder links (href="#") count: {}'.format(self.count)] if self.count else []
+
+
+class MetaDescriptionRule(Rule):
+    name = 'meta-description'
+    description = 'Each page has a non-empty <meta name="description">'
+    tags = ('meta',)
+
+    def begin(self, page):
+        self.found = False
+
+    def start(self, tag, attrs, offset):
+        if (attrs.get('name') or '').lower() == 'description' and (attrs.get('content') or '').strip():
+            self.found = True
+
+    def finish(self):
+        return [] if self.found else ['Missing <meta name="description">']
+
+
+class DuplicateIdRule(Rule):
+    name = 'duplicate-id'
+    description = 'No id is used twice on a page (breaks #anchors and label/aria references)'
+    tags = ('*',)
+
+    def begin(self, page):
+        self.seen = set()
+        self.duplicates = []
+
+    def start(self, tag, attrs, offset):
+        value = attrs.get('id')
+        if value:
+            if value in self.seen and value not in self.duplicates:
+                self.duplicates.append(value)
+            self.seen.add(value)
+
+    def finish(self):
+        if self.duplicates:
+            return ['Duplicate ids: {}'.format(', '.join(self.duplicates[:5]))]
+        return []
+
+
+RULES = [TitleRule, ViewportRule, LangRule, H1Rule, ImgAltRule, NoopenerRule, PlaceholderLinkRule,
+         MetaDescriptionRule, DuplicateIdRule] + PERF_RULES
+
+
+def make_rules(names=None):
+    """Instances of RULES, optionally only those whose name is in names (report order kept)."""
+    return [cls() for cls in RULES if names is None or cls.name in names]
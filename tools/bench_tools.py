@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark the tools/ scripts against synthetic sites of increasing size.
+- Sites come from synth_site.py (100 / 1k / 10k pages by default, 50k with --sizes) and are
+  kept under .cache/synth/<pages>/; they are regenerated only when missing or with --regen.
+- Each tool runs in its own process with --root pointed at the site. Tools that edit files
+  (relativize_links, enhance_seo_a11y, apply_replacements) get a fresh copy of the site.
+  check_links is measured cold (--full) and warm (incremental, after an untimed priming run
+  of its own that leaves the cache, so it does not depend on the cold run going first).
+- Recorded per run: wall time, html files/sec, peak RSS, read/write syscall counts
+  (Linux /proc/self/io syscr/syscw of the tool process) and the exit code.
+  With --strace (and strace installed) the total syscall count comes from strace -c -f.
+- Every invocation appends one entry (git commit, python, cpu count, results) to the JSON
+  history file so scaling can be compared across commits.
+
+Run from repo root:
+    python tools/bench_tools.py [--sizes 100 1000 10000 50000] [--tools check_links audit_frontend] [--regen]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import synth_site
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNTH_CACHE = os.path.join(ROOT, '.cache', 'synth')
+HISTORY_PATH = os.path.join(ROOT, '.cache', 'bench_history.json')
+
+# name -> (script, extra args, edits the site, untimed priming run first)
+TOOLS = {
+    'check_links': ('check_links.py', ['--full'], False, False),
+    'check_links_warm': ('check_links.py', [], False, True),
+    'audit_frontend': ('audit_frontend.py', [], False, False),
+    'relativize_links': ('relativize_links.py', [], True, False),
+    'enhance_seo_a11y': ('enhance_seo_a11y.py', [], True, False),
+    'apply_replacements': ('apply_replacements.py', [], True, False),
+}
+
+# Runs the tool in-process in the child so its own counters (and its reaped workers') are reported
+CHILD = r'''
+import json, os, resource, runpy, sys
+stats_path, script = sys.argv[1], sys.argv[2]
+sys.argv = sys.argv[2:]
+sys.path.insert(0, os.path.dirname(script))
+code = 0
+try:
+    runpy.run_path(script, run_name='__main__')
+except SystemExit as e:
+    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+finally:
+    io = {}
+    try:
+        with open('/proc/self/io') as fh:
+            io = dict(line.split(': ') for line in fh.read().splitlines())
+    except OSError:
+        pass
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    with open(stats_path, 'w') as fh:
+        json.dump({'exit': code, 'peak_rss_kb': max(u.ru_maxrss for u in usage),
+                   'syscr': int(io.get('syscr', 0)) or None, 'syscw': int(io.get('syscw', 0)) or None}, fh)
+sys.exit(code)
+'''
+
+
+def site_for(pages, regen=False):
+    """Path of the synthetic site with pages posts, generating it if needed."""
+    dest = os.path.join(SYNTH_CACHE, str(pages))
+    if regen or not os.path.exists(os.path.join(dest, 'synth.json')):
+        print('Generating {}-page site in {} ...'.format(pages, os.path.relpath(dest, ROOT)))
+        synth_site.generate(dest, pages)
+    with open(os.path.join(dest, 'synth.json'), 'r', encoding='utf-8') as fh:
+        return dest, json.load(fh)
+
+
+def strace_total(path):
+    """Total call count from an `strace -c` summary file."""
+    with open(path, 'r', encoding='utf-8') as fh:
+        for line in fh:
+            parts = line.split()
+            if parts and parts[-1] == 'total':
+                return int(parts[3]) if len(parts) > 5 else int(parts[2])
+    return None
+
+
+def run_tool(name, site, use_strace=False):
+    """Measure one tool run against site; returns the result dict."""
+    script, extra, _, prime = TOOLS[name]
+    if prime:
+        subprocess.run([sys.executable, os.path.join(TOOLS_DIR, script), '--root', site] + extra, cwd=ROOT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_path = os.path.join(tmp, 'stats.json')
+        cmd = [sys.executable, '-c', CHILD, stats_path, os.path.join(TOOLS_DIR, script), '--root', site] + extra
+        strace_path = os.path.join(tmp, 'strace.txt')
+        if use_strace:
+            cmd = ['strace', '-f', '-c', '-o', strace_path] + cmd
+        # unbuffered stdio would turn every print into a write syscall
+        env = {k: v for k, v in os.environ.items() if k != 'PYTHONUNBUFFERED'}
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+        wall = time.perf_counter() - start
+        with open(stats_path, 'r', encoding='utf-8') as fh:
+            stats = json.load(fh)
+        if use_strace:
+            stats['syscalls'] = strace_total(strace_path)
+    stats['wall_s'] = round(wall, 3)
+    return stats
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_history(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return []
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmark tools/ scripts on synthetic sites.')
+    ap.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='synthetic post counts')
+    ap.add_argument('--tools', nargs='+', choices=sorted(TOOLS), default=list(TOOLS), help='tools to run')
+    ap.add_argument('--regen', action='store_true', help='regenerate the synthetic sites')
+    ap.add_argument('--strace', action='store_true', help='count all syscalls with strace -c -f')
+    ap.add_argument('--history', default=HISTORY_PATH, help='JSON history file to append to')
+    args = ap.parse_args(argv)
+
+    if args.strace and not shutil.which('strace'):
+        print('--strace: strace is not installed')
+        return 2
+
+    results = []
+    print('{:>7} {:>6}  {:20} {:>9} {:>10} {:>10} {:>10} {:>10}  exit'.format(
+        'posts', 'html', 'tool', 'wall s', 'files/s', 'rss MB', 'syscr', 'syscw'))
+    for size in args.sizes:
+        site, summary = site_for(size, args.regen)
+        files = summary['html_files']
+        for name in args.tools:
+            if TOOLS[name][2]:
+                work = site + '.work'
+                if os.path.exists(work):
+                    shutil.rmtree(work)
+                shutil.copytree(site, work)
+                stats = run_tool(name, work, args.strace)
+                shutil.rmtree(work)
+            else:
+                stats = run_tool(name, site, args.strace)
+            stats.update({'tool': name, 'pages': size, 'html_files': files,
+                          'files_per_s': round(files / stats['wall_s'], 1) if stats['wall_s'] else None})
+            results.append(stats)
+            print('{:7} {:6}  {:20} {:9.2f} {:10.1f} {:10.1f} {:>10} {:>10}  {}'.format(
+                size, files, name, stats['wall_s'], stats['files_per_s'] or 0, stats['peak_rss_kb'] / 1024,
+                stats['syscr'] or '-', stats['syscw'] or '-', stats['exit']))
+
+    history = load_history(args.history)
+    history.append({
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'results': results,
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, 'w', encoding='utf-8') as fh:
+        json.dump(history, fh, indent=1)
+    print('\nAppended run {} to {}'.format(len(history), os.path.relpath(args.history, ROOT)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
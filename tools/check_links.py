@@ -1,152 +1,329 @@
 #!/usr/bin/env python3
 """
 Simple link and asset checker for local HTML files.
-- Scans `frontend/` for HTML files and checks local href/src references.
+- Scans `frontend/` for HTML files and stylesheets and checks local href/src references,
+  including srcset, <source>/<video>, icon/preload/manifest <link>s and CSS url()/@import.
 - Flags missing files and invalid anchors.
-- Skips remote links (http[s]://), mailto:, tel:
+- Skips remote links (http[s]://), mailto:, tel: unless --external is given, which also
+  checks every http(s) link and sw.js EXTERNAL_ASSETS entry (see external_links.py).
+- Pages are parsed once through the shared SiteIndex; `a.html#frag` links are
+  answered from the target page's indexed ids instead of re-reading the file.
+- Incremental: parsed pages, per-page results and the targets each result depends on
+  are cached in .cache/. Only changed pages, and pages whose targets changed state
+  (file added/removed, #id added/removed), are re-checked; the report matches a full scan.
+- --jobs N spreads parsing and target resolution over N processes. Results are merged
+  in page order, so the report and exit code are identical to a serial run.
+- Several site roots can be checked in one run (--root frontend --root public).
+  Byte-identical pages across roots share one parse; the report is grouped per root.
+- Existence checks are answered from an in-memory FsSnapshot (one scandir pass, exact
+  case on every OS). Links that only resolve case-insensitively are reported separately:
+  they work on a developer's laptop but break on the case-sensitive Linux deploy.
+- Pages are parsed with the fastest installed html_backend (selectolax, lxml, else the
+  stdlib html.parser); --parser picks one explicitly.
 
-Run from repository root: python tools/check_links.py
+Run from repository root: python tools/check_links.py [--root DIR ...] [--full] [--jobs N] [--external]
 """
+import argparse
 import os
 import sys
-from html.parser import HTMLParser
-from urllib.parse import urlparse, unquote
+from concurrent.futures import ProcessPoolExecutor
+
+import external_links
+from html_backend import BACKENDS
+from site_index import PageCache, SiteIndex, is_local_link
+from tool_cache import cache_path
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 FRONTEND_DIR = os.path.join(ROOT, 'frontend')
 
-class LinkCollector(HTMLParser):
-    def __init__(self):
-        super().__init__()
-        self.hrefs = []
-        self.srcs = []
-        self.ids = set()
 
-    def handle_starttag(self, tag, attrs):
-        attrs = dict(attrs)
-        if tag == 'a' and 'href' in attrs:
-            self.hrefs.append(attrs['href'])
-        if tag in ('img','script') and 'src' in attrs:
-            self.srcs.append(attrs['src'])
-        if tag == 'link' and attrs.get('rel') == 'stylesheet' and 'href' in attrs:
-            self.srcs.append(attrs['href'])
-        if 'id' in attrs:
-            self.ids.add(attrs['id'])
+def target_defines(index, target_file, frag):
+    """Does target_file define #frag? Non-indexed targets fall back to a text search."""
+    found = index.defines(target_file, frag)
+    if found is not None:
+        return found
+    if index.fs.isdir(target_file):
+        return False
+    with open(target_file, 'r', encoding='utf-8', errors='replace') as fh:
+        t = fh.read()
+    return f'id="{frag}"' in t or f"id='{frag}'" in t or f"name=\"{frag}\"" in t
 
-    def handle_startendtag(self, tag, attrs):
-        self.handle_starttag(tag, attrs)
 
+def dep_state(index, target_file, frag):
+    """The fact a page's result depends on: does target exist (and define #frag)?
 
-# Utilities
+    'case' means target is missing but exists with different letter case.
+    """
+    if not index.fs.exists(target_file):
+        return 'case' if index.fs.case_match(target_file) else False
+    return not frag or target_defines(index, target_file, frag)
 
-def is_local_link(link):
-    if not link:
-        return False
-    lp = link.strip()
-    # Skip anchors, protocols
-    if lp.startswith('#'):
-        return False
-    if lp.startswith('mailto:') or lp.startswith('tel:'):
-        return False
-    parsed = urlparse(lp)
-    if parsed.scheme in ('http','https'):
-        return False
-    # images or relative files are local
-    return True
-
-
-def resolve_path(base_file, link):
-    """Resolve a relative link against base html file (local filesystem)."""
-    # Remove query and fragment
-    parsed = urlparse(link)
-    path = unquote(parsed.path)
-    if path.startswith('/'):
-        # treat as relative to FRONTEND_DIR root
-        return os.path.normpath(os.path.join(FRONTEND_DIR, path.lstrip('/')))
-    # otherwise relative to base file directory
-    base_dir = os.path.dirname(base_file)
-    return os.path.normpath(os.path.join(base_dir, path))
-
-
-# Walk frontend directory
-html_files = []
-for root, dirs, files in os.walk(FRONTEND_DIR):
-    for f in files:
-        if f.lower().endswith('.html'):
-            html_files.append(os.path.join(root, f))
-
-# Collect issues
-missing_files = []
-broken_anchors = []
-missing_assets = []
-
-print('Scanning', len(html_files), 'html files...')
-for html_file in html_files:
-    with open(html_file, 'r', encoding='utf-8') as fh:
-        text = fh.read()
-    parser = LinkCollector()
-    parser.feed(text)
-
-    # Build set of ids defined in the page
-    local_ids = parser.ids
-
-    # Hrefs
-    for href in parser.hrefs:
-        href = href.strip()
+
+def check_page(index, page, skip_javascript=False, deps=None):
+    """Return (missing_files, missing_assets, broken_anchors, case_mismatches) for one page.
+
+    If deps is a list, every (target, frag, state) the result depends on is appended to it.
+    """
+    missing_files = []
+    broken_anchors = []
+    missing_assets = []
+    case_mismatches = []
+    html_file = page.path
+    fs = index.fs
+    if deps is None:
+        deps = []
+
+    for ref in page.hrefs:
+        href = ref.value.strip()
         if not href:
             continue
-        # Skip external
-        if not is_local_link(href):
+        if not is_local_link(href, skip_javascript):
             continue
-        # If it's an anchor-only link like '#section', check it in same page
+        # fragment-only links like '#section' must exist on the same page
         if href.startswith('#'):
-            if href[1:] and href[1:] not in local_ids:
+            if href[1:] and not page.defines(href[1:]):
                 broken_anchors.append((html_file, href))
             continue
-        # For links with fragments
-        target_file = resolve_path(html_file, href)
-        # If anchor in uri: a.html#section
-        parsed = urlparse(href)
-        frag = parsed.fragment
-        if not os.path.exists(target_file):
-            missing_files.append((html_file, href, target_file))
+        target_file = index.resolve(page, href)
+        frag = href.partition('#')[2]
+        if not fs.exists(target_file):
+            actual = fs.case_match(target_file)
+            if actual:
+                case_mismatches.append((html_file, href, actual))
+            else:
+                missing_files.append((html_file, href, target_file))
+            deps.append((target_file, '', 'case' if actual else False))
+        elif frag and not target_defines(index, target_file, frag):
+            broken_anchors.append((html_file, href))
+            deps.append((target_file, frag, False))
         else:
-            if frag:
-                with open(target_file, 'r', encoding='utf-8') as fh2:
-                    t = fh2.read()
-                if f'id="{frag}"' not in t and f"id='{frag}'" not in t and f"name=\"{frag}\"" not in t:
-                    broken_anchors.append((html_file, href))
+            deps.append((target_file, frag, True))
 
     # Sources (images, scripts, css)
-    for src in parser.srcs:
-        src = src.strip()
+    for ref in page.srcs:
+        src = ref.value.strip()
         if not src:
             continue
-        if not is_local_link(src):
+        if not is_local_link(src, skip_javascript):
             continue
-        target_file = resolve_path(html_file, src)
-        if not os.path.exists(target_file):
+        target_file = index.resolve(page, src)
+        state = dep_state(index, target_file, '')
+        if state == 'case':
+            case_mismatches.append((html_file, src, fs.case_match(target_file)))
+        elif not state:
             missing_assets.append((html_file, src, target_file))
+        deps.append((target_file, '', state))
+
+    return missing_files, missing_assets, broken_anchors, case_mismatches
+
+
+def _rel(path, root):
+    return os.path.relpath(path, root).replace('\\', '/')
+
+
+def stale_pages(index, checks):
+    """Pages whose cached result cannot be reused.
+
+    A page is stale if it was re-parsed, has no cached result, or any target it
+    depends on changed state. Each distinct (target, frag) is evaluated once and
+    mapped back to its dependents through a reverse-dependency map.
+    """
+    stale = set(index.reparsed)
+    dependents = {}
+    for page in index.documents():
+        entry = checks.get(_rel(page.path, index.root))
+        if entry is None:
+            stale.add(page.path)
+            continue
+        for target, frag, state in entry['deps']:
+            dependents.setdefault((target, frag), []).append((page.path, state))
+    for (target, frag), pages in dependents.items():
+        now = dep_state(index, os.path.normpath(os.path.join(index.root, target)), frag)
+        for path, state in pages:
+            if state != now:
+                stale.add(path)
+    return stale
+
+
+# Per-process state for --jobs workers, set once by the pool initializer
+_worker_index = None
+_worker_skip_javascript = False
+
+
+def _init_worker(index, skip_javascript):
+    global _worker_index, _worker_skip_javascript
+    _worker_index = index
+    _worker_skip_javascript = skip_javascript
+
+
+def _check_worker(path):
+    deps = []
+    result = check_page(_worker_index, _worker_index.get(path), _worker_skip_javascript, deps)
+    return result, deps
+
 
-# Print report
-print('\nReport:')
-print('Missing files (hrefs):', len(missing_files))
-for f,h,t in missing_files:
-    print('  Page:', os.path.relpath(f, ROOT), '->', h, 'expected at', os.path.relpath(t, ROOT))
-
-print('\nMissing assets (src/href for CSS/IMG/SCRIPT):', len(missing_assets))
-for f,s,t in missing_assets:
-    print('  Page:', os.path.relpath(f, ROOT), '->', s, 'expected at', os.path.relpath(t, ROOT))
-
-print('\nBroken anchors (fragments):', len(broken_anchors))
-for f,h in broken_anchors:
-    print('  Page:', os.path.relpath(f, ROOT), '->', h)
-
-# Exit with nonzero if issues found
-count = len(missing_files) + len(missing_assets) + len(broken_anchors)
-if count:
-    print('\nIssues found:', count)
-    sys.exit(2)
-else:
+def _check_pages(index, paths, skip_javascript, jobs):
+    """{path: ((mf, ma, ba), deps)} for paths, serially or over a process pool."""
+    if jobs > 1 and len(paths) > 1:
+        chunksize = max(1, len(paths) // (jobs * 8))
+        with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                                 initargs=(index, skip_javascript)) as pool:
+            return dict(zip(paths, pool.map(_check_worker, paths, chunksize=chunksize)))
+    results = {}
+    for path in paths:
+        deps = []
+        results[path] = check_page(index, index.get(path), skip_javascript, deps), deps
+    return results
+
+
+def check_site(index, skip_javascript=False, checks=None, stats=None, jobs=1):
+    """Check every page and stylesheet; with a checks cache dict, reuse results of pages that are not stale.
+
+    stats, if given, receives the number of pages actually re-checked.
+    """
+    missing_files = []
+    missing_assets = []
+    broken_anchors = []
+    case_mismatches = []
+    documents = list(index.documents())
+    stale = stale_pages(index, checks) if checks is not None else {d.path for d in documents}
+    results = _check_pages(index, [d.path for d in documents if d.path in stale], skip_javascript, jobs)
+    for page in documents:
+        key = _rel(page.path, index.root)
+        if page.path not in results:
+            entry = checks[key]
+            mf = [(page.path, h, os.path.join(index.root, t)) for h, t in entry['missing_files']]
+            ma = [(page.path, s, os.path.join(index.root, t)) for s, t in entry['missing_assets']]
+            ba = [(page.path, h) for h in entry['broken_anchors']]
+            cm = [(page.path, h, os.path.join(index.root, t)) for h, t in entry['case_mismatches']]
+        else:
+            (mf, ma, ba, cm), deps = results[page.path]
+            if checks is not None:
+                checks[key] = {
+                    'missing_files': [(h, _rel(t, index.root)) for _, h, t in mf],
+                    'missing_assets': [(s, _rel(t, index.root)) for _, s, t in ma],
+                    'broken_anchors': [h for _, h in ba],
+                    'case_mismatches': [(h, _rel(t, index.root)) for _, h, t in cm],
+                    'deps': sorted({(_rel(t, index.root), f, st) for t, f, st in deps}),
+                }
+        missing_files.extend(mf)
+        missing_assets.extend(ma)
+        broken_anchors.extend(ba)
+        case_mismatches.extend(cm)
+    if checks is not None:
+        for key in set(checks) - {_rel(d.path, index.root) for d in documents}:
+            del checks[key]
+    if stats is not None:
+        stats['rechecked'] = len(results)
+    return missing_files, missing_assets, broken_anchors, case_mismatches
+
+
+def print_report(missing_files, missing_assets, broken_anchors, case_mismatches):
+    """Print the three report sections and return the number of issues."""
+    print('\nReport:')
+    print('Missing files (hrefs):', len(missing_files))
+    for f, h, t in missing_files:
+        print('  Page:', os.path.relpath(f, ROOT), '->', h, 'expected at', os.path.relpath(t, ROOT))
+
+    print('\nMissing assets (src/href for CSS/IMG/SCRIPT):', len(missing_assets))
+    for f, s, t in missing_assets:
+        print('  Page:', os.path.relpath(f, ROOT), '->', s, 'expected at', os.path.relpath(t, ROOT))
+
+    print('\nBroken anchors (fragments):', len(broken_anchors))
+    for f, h in broken_anchors:
+        print('  Page:', os.path.relpath(f, ROOT), '->', h)
+
+    if case_mismatches:
+        print('\nCase-mismatched links (resolve only on case-insensitive filesystems):', len(case_mismatches))
+        for f, h, t in case_mismatches:
+            print('  Page:', os.path.relpath(f, ROOT), '->', h, 'matches', os.path.relpath(t, ROOT))
+
+    return len(missing_files) + len(missing_assets) + len(broken_anchors) + len(case_mismatches)
+
+
+def external_refs(index):
+    """[(page path, url)] for every http(s) href/src in page order, plus sw.js EXTERNAL_ASSETS."""
+    refs = []
+    for page in index:
+        for ref in page.refs:
+            if external_links.is_external_link(ref.value):
+                refs.append((page.path, ref.value.strip()))
+    sw_path = os.path.join(index.root, 'sw.js')
+    for url in external_links.sw_external_assets(sw_path):
+        refs.append((sw_path, url))
+    return refs
+
+
+def print_external_report(refs, results):
+    """Print broken external links and return their number."""
+    broken = [(f, u) for f, u in refs if external_links.is_broken(results[u])]
+    print('\nBroken external links:', len(broken))
+    for f, u in broken:
+        print('  Page:', os.path.relpath(f, ROOT), '->', u, '({})'.format(external_links.describe(results[u])))
+    return len(broken)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Check local links and assets in HTML pages.')
+    ap.add_argument('--root', action='append', metavar='DIR',
+                    help='site root to check, relative to the repo root; repeat to check several '
+                         'roots in one run (default: frontend)')
+    ap.add_argument('--skip-javascript', action='store_true', help='skip javascript: links')
+    ap.add_argument('--full', action='store_true', help='ignore the cache and re-check every page')
+    ap.add_argument('--parser', choices=('auto',) + tuple(BACKENDS), default=None,
+                    help='HTML parser backend (default: fastest installed, or $SITE_HTML_BACKEND)')
+    ap.add_argument('-j', '--jobs', type=int, default=1, help='worker processes for parsing and checking (default: 1)')
+    ap.add_argument('--external', action='store_true', help='also check http(s) links (HEAD, falling back to GET)')
+    ap.add_argument('--external-ttl', type=float, default=24, metavar='HOURS',
+                    help='reuse cached external results younger than this (default: 24; timeouts and 5xx: '
+                         '{} minutes)'.format(external_links.TRANSIENT_TTL // 60))
+    ap.add_argument('--external-timeout', type=float, default=10, metavar='SECONDS', help='per request (default: 10)')
+    args = ap.parse_args(argv)
+
+    roots = [os.path.join(ROOT, r) for r in (args.root or [os.path.relpath(FRONTEND_DIR, ROOT)])]
+    memo = {}   # sha1 -> parsed Page, shared so identical files across roots are parsed once
+    checked = []
+    for root in roots:
+        cache = PageCache(cache_path('check_links', root), root)
+        if not args.full:
+            cache.load()
+        checks = cache.extra.setdefault('skip_javascript={}'.format(args.skip_javascript), {})
+        index = SiteIndex(root, args.parser).build(cache, jobs=args.jobs, memo=memo)
+        if len(roots) > 1:
+            print('\n== {} =='.format(os.path.relpath(root, ROOT)))
+        print('Scanning', len(index), 'html files and', len(index.styles), 'stylesheets...')
+        stats = {}
+        report = check_site(index, args.skip_javascript, checks, stats, jobs=args.jobs)
+        print('Re-parsed {} and re-checked {} of {} files'.format(
+            len(index.reparsed), stats['rechecked'], len(index) + len(index.styles)))
+        cache.save()
+        checked.append((root, report, external_refs(index) if args.external else None))
+
+    results = {}
+    if args.external:
+        urls = [u for _, _, refs in checked for _, u in refs]
+        ext_cache = external_links.ResultCache(ttl=args.external_ttl * 3600)
+        if not args.full:
+            ext_cache.load()
+        print('\nChecking', len(set(urls)), 'external urls...')
+        results = external_links.check_urls(urls, ext_cache, timeout=args.external_timeout)
+        ext_cache.save()
+
+    count = 0
+    for root, report, refs in checked:
+        if len(roots) > 1:
+            print('\n== {} report =='.format(os.path.relpath(root, ROOT)))
+        count += print_report(*report)
+        if refs is not None:
+            count += print_external_report(refs, results)
+
+    # Exit with nonzero if issues found
+    if count:
+        print('\nIssues found:', count)
+        return 2
     print('\nNo issues found')
-    sys.exit(0)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
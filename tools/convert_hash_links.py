@@ -5,26 +5,35 @@ Convert anchors with href="#" used as UI controls to <button> elements while pre
 - Preserves inner HTML content.
 - Leaves other href="#" anchors unchanged (if they are real anchors for same-page links, but those are usually '#id' and not '#').
 
+Pages whose raw bytes have no href="#" (HASH_HREF prefilter) are skipped without being parsed.
+Only the converted start and end tags are rewritten (html_patch.Patch); the anchors' contents and the
+rest of the page keep their bytes.
+
+convert_hash_links() is also the 'convert-hash-links' step of fix_pipeline.py.
+
+Run from repo root: python tools/convert_hash_links.py [--root DIR]
+
 Caution: This naively transforms strings; validate resulting HTML if page relies on 'a' selectors.
 """
+import argparse
 import os
 import re
-from bs4 import BeautifulSoup
+import sys
+
+from fs_snapshot import FsSnapshot
+from html_patch import Patch
+from prefilter import Prefilter
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 FRONTEND = os.path.join(ROOT, 'frontend')
 
-html_files = []
-for root, dirs, files in os.walk(FRONTEND):
-    for f in files:
-        if f.lower().endswith('.html'):
-            html_files.append(os.path.join(root, f))
+# href="#", href='#', href=#, with any blanks around '=' and '#'
+HASH_HREF = Prefilter('href="#"', regex=rb'''(?i)\bhref\s*=\s*["']?\s*#\s*(?:["'>]|\s)''')
+
 
-converted = []
-for page in html_files:
-    with open(page, 'r', encoding='utf-8') as fh:
-        content = fh.read()
-    soup = BeautifulSoup(content, 'html.parser')
+def convert_hash_links(patch):
+    """Turn the href="#" anchors of patch's page that act as controls into buttons; True if any were."""
+    soup = patch.soup
     changed = False
     anchors = soup.find_all('a', href=True)
     for a in anchors:
@@ -64,17 +73,34 @@ for page in html_files:
                     btn[attr] = val
                 # Ensure type=button to avoid form submit
                 btn['type'] = 'button'
-                # Replace element preserving contents (append children)
-                for child in list(a.contents):
-                    btn.append(child)
-                a.replace_with(btn)
+                # Replace element preserving contents (only the tags change in the source)
+                patch.replace_tags(a, btn)
                 changed = True
-    if changed:
-        with open(page, 'w', encoding='utf-8') as fh:
-            fh.write(str(soup))
-        converted.append(os.path.relpath(page, ROOT))
+    return changed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Convert href="#" anchors used as UI controls to <button> elements.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    args = ap.parse_args(argv)
+    html_files = HASH_HREF.filter(FsSnapshot.scan(os.path.abspath(args.root)).iter_files(('.html',)))
+
+    converted = []
+    for page in html_files:
+        with open(page, 'r', encoding='utf-8') as fh:
+            patch = Patch(fh.read())
+        if convert_hash_links(patch):
+            with open(page, 'w', encoding='utf-8') as fh:
+                fh.write(patch.text())
+            converted.append(os.path.relpath(page, ROOT))
+
+    print('Converted files:')
+    for c in converted:
+        print('  ', c)
+    HASH_HREF.report()
+    print('Done')
+    return 0
+
 
-print('Converted files:')
-for c in converted:
-    print('  ', c)
-print('Done')
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Critical-CSS extraction and inlining per page template, run in place on a deploy copy of the
+site (e.g. public/).
+- Pages are grouped by TEMPLATES (home, blog post, books, profile). Per template and set of
+  local stylesheets, one representative page (the first by path) is parsed and its
+  above-the-fold markup is taken as the first FOLD_ELEMENTS elements of <body> in document
+  order (header, nav and the hero on these templates).
+- A stylesheet rule is critical when one of its selectors, without pseudo-elements and state
+  pseudo-classes (:hover, ::after, ...), matches an above-the-fold element (soupsieve, which
+  BeautifulSoup uses for select()); <html> and <body> always count, so :root rules stay.
+  Selectors soupsieve cannot compile are kept, as are @font-face rules; @keyframes, @import
+  and @page are not. @media/@supports blocks keep their critical rules.
+- Relative url()s are rebased from their stylesheet to the site root ('fonts/a.woff2' in
+  css/styles.css becomes '/css/fonts/a.woff2'), so they load the same files from every page.
+- Every page of the template gets the critical subset inlined in <style data-critical> before
+  its first stylesheet, and each local render-blocking stylesheet becomes
+  <link rel="preload" as="style" onload="this.rel='stylesheet'"> plus a <noscript> fallback.
+  Pages that already have a data-critical block are left alone.
+- Results are cached per template (.cache/) on the representative page and stylesheet
+  contents, so the blog posts share one computation and unchanged templates are not redone.
+- Warns when a template's critical CSS is over CRITICAL_BUDGET (about the first round trip).
+
+Run from repo root:
+    python tools/critical_css.py --root public [--fold 80] [--dry-run]
+"""
+import argparse
+import fnmatch
+import hashlib
+import os
+import posixpath
+import re
+import sys
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from css_rules import StyleRule, parse_css, split_selectors, structural
+from fs_snapshot import FsSnapshot
+from precompress import minify_css
+from site_index import css_refs, is_local_link, resolve_path
+from tool_cache import cache_path, load_json, save_json
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# (template name, page patterns relative to the site root); the first matching template wins
+TEMPLATES = (
+    ('home', ('index.html', 'homepage.html')),
+    ('blog-post', ('pages/blog/post-*.html',)),
+    ('books', ('pages/books/*.html',)),
+    ('profile', ('pages/profile/*.html',)),
+)
+FOLD_ELEMENTS = 80
+CRITICAL_BUDGET = 14 * 1024
+ALWAYS_KEEP_AT_RULES = frozenset(('font-face',))
+IGNORED_TAGS = frozenset(('script', 'noscript', 'template', 'style', 'link', 'meta'))
+CACHE_VERSION = 2   # 2: url()s rebased to the site root
+
+LINK_RE = re.compile(r'<link\b[^>]*>', re.I)
+ATTR_RE = re.compile(r'''([\w:-]+)\s*=\s*("([^"]*)"|'([^']*)'|([^\s>]+))''')
+REL_RE = re.compile(r'''\brel\s*=\s*("stylesheet"|'stylesheet'|stylesheet\b)''', re.I)
+ASYNC_LOAD = 'rel="preload" as="style" onload="this.onload=null;this.rel=\'stylesheet\'"'
+
+
+def template_of(rel):
+    for name, patterns in TEMPLATES:
+        if any(fnmatch.fnmatch(rel, p) for p in patterns):
+            return name
+    return None
+
+
+def link_attrs(tag):
+    return {m.group(1).lower(): next(g for g in m.group(3, 4, 5) if g is not None) for m in ATTR_RE.finditer(tag)}
+
+
+def blocking_stylesheets(root, page_path, text):
+    """[(link tag match, stylesheet path)] for the local stylesheets that block rendering."""
+    out = []
+    for m in LINK_RE.finditer(text):
+        attrs = link_attrs(m.group())
+        if 'stylesheet' not in attrs.get('rel', '').lower().split():
+            continue
+        if attrs.get('media', 'all').strip().lower() not in ('all', 'screen'):
+            continue
+        href = attrs.get('href', '')
+        if not is_local_link(href, skip_javascript=True):
+            continue
+        out.append((m, resolve_path(root, page_path, href)))
+    return out
+
+
+def fold_elements(html, fold):
+    soup = BeautifulSoup(html, 'html.parser')
+    body = soup.body or soup
+    elements = [el for el in body.find_all(True) if el.name not in IGNORED_TAGS][:fold]
+    return [el for el in (soup.find('html'), soup.body) if el is not None] + elements
+
+
+def is_critical(selector, elements, compiled):
+    for part in split_selectors(selector):
+        part = structural(part)
+        if part not in compiled:
+            try:
+                compiled[part] = soupsieve.compile(part)
+            except Exception:   # soupsieve.SelectorSyntaxError and unsupported pseudo-classes
+                compiled[part] = None
+        pattern = compiled[part]
+        if pattern is None or any(pattern.match(el) for el in elements):
+            return True
+    return False
+
+
+def critical_rules(nodes, elements, compiled):
+    """CSS text of the critical subset of nodes."""
+    out = []
+    for node in nodes:
+        if isinstance(node, StyleRule):
+            if is_critical(node.selector, elements, compiled):
+                out.append('{}{{{}}}'.format(node.selector, node.body))
+        elif node.rules is not None:
+            inner = critical_rules(node.rules, elements, compiled)
+            if inner:
+                out.append('@{} {}{{{}}}'.format(node.name, node.prelude, inner))
+        elif node.name in ALWAYS_KEEP_AT_RULES and node.body is not None:
+            out.append('@{}{}{{{}}}'.format(node.name, ' ' + node.prelude if node.prelude else '', node.body))
+    return ''.join(out)
+
+
+def rebase_urls(css, css_path, root):
+    """css with its relative url()s made root-absolute, so they point at the same file from any page."""
+    base = '/' + os.path.relpath(os.path.dirname(css_path), root).replace(os.sep, '/')
+    out, pos = [], 0
+    for kind, value, offset in css_refs(css):
+        if value.startswith('/') or not is_local_link(value, skip_javascript=True):
+            continue
+        path, suffix = re.match(r'([^?#]*)(.*)', value, re.S).groups()
+        if not path:
+            continue
+        i = css.index(value, offset)
+        out.append(css[pos:i])
+        out.append(posixpath.normpath(posixpath.join(base, path)) + suffix)
+        pos = i + len(value)
+    out.append(css[pos:])
+    return ''.join(out)
+
+
+def extract(html, stylesheets, fold, root):
+    """Minified critical CSS of the stylesheets ([(path, text)]) for the page html."""
+    elements = fold_elements(html, fold)
+    compiled = {}
+    return minify_css(''.join(critical_rules(parse_css(rebase_urls(css, path, root)), elements, compiled)
+                              for path, css in stylesheets))
+
+
+def inline(text, links, template, css):
+    """text with css inlined before the first link and the links loaded asynchronously."""
+    out, pos = [], 0
+    for i, (m, _) in enumerate(links):
+        out.append(text[pos:m.start()])
+        if i == 0:
+            out.append('<style data-critical="{}">{}</style>\n    '.format(template, css))
+        tag = m.group()
+        out.append(REL_RE.sub(ASYNC_LOAD, tag, count=1))
+        out.append('<noscript>{}</noscript>'.format(tag))
+        pos = m.end()
+    out.append(text[pos:])
+    return ''.join(out)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Inline per-template critical CSS and load stylesheets async, in place.')
+    ap.add_argument('--root', required=True, help='deploy copy of the site to process in place (e.g. public/)')
+    ap.add_argument('--fold', type=int, default=FOLD_ELEMENTS,
+                    help='body elements counted as above the fold (default: {})'.format(FOLD_ELEMENTS))
+    ap.add_argument('--dry-run', action='store_true', help='report only, do not write pages')
+    ap.add_argument('--force', action='store_true', help='recompute every template, ignoring the cache')
+    args = ap.parse_args(argv)
+    root = os.path.abspath(args.root)
+
+    cached = {}
+    if not args.force:
+        data = load_json(cache_path('critical_css', root), {})
+        if data.get('version') == CACHE_VERSION and data.get('fold') == args.fold:
+            cached = data.get('templates', {})
+
+    # (template, stylesheets) -> [(page path, text, links)]
+    groups = {}
+    already = 0
+    fs = FsSnapshot.scan(root)
+    for path in sorted(fs.iter_files(('.html',))):
+        template = template_of(os.path.relpath(path, root).replace(os.sep, '/'))
+        if template is None:
+            continue
+        with open(path, encoding='utf-8') as fh:
+            text = fh.read()
+        if 'data-critical=' in text:
+            already += 1
+            continue
+        links = [(m, css) for m, css in blocking_stylesheets(root, path, text) if fs.isfile(css)]
+        if links:
+            key = '{}|{}'.format(template, ','.join(os.path.relpath(css, root).replace(os.sep, '/') for _, css in links))
+            groups.setdefault(key, []).append((path, text, links))
+
+    entries, computed = dict(cached), 0
+    for key, pages in groups.items():
+        template = key.split('|', 1)[0]
+        path, text, links = pages[0]
+        stylesheets = []
+        for _, css in links:
+            with open(css, encoding='utf-8') as fh:
+                stylesheets.append((css, fh.read()))
+        digest = hashlib.sha1('\0'.join([text] + [css for _, css in stylesheets]).encode('utf-8')).hexdigest()
+        entry = cached.get(key)
+        if not entry or entry['sha1'] != digest:
+            entry = {'sha1': digest, 'css': extract(text, stylesheets, args.fold, root)}
+            computed += 1
+        entries[key] = entry
+        full = sum(len(css.encode('utf-8')) for _, css in stylesheets)
+        size = len(entry['css'].encode('utf-8'))
+        print('{:<10} {:>3} pages  critical {:>6.1f} KB of {:>6.1f} KB  ({})'.format(
+            template, len(pages), size / 1024, full / 1024, key.split('|', 1)[1]))
+        if size > CRITICAL_BUDGET:
+            print('  Warning: over the {} KB critical budget'.format(CRITICAL_BUDGET // 1024))
+        if not args.dry_run:
+            for page_path, page_text, page_links in pages:
+                with open(page_path, 'w', encoding='utf-8') as fh:
+                    fh.write(inline(page_text, page_links, template, entry['css']))
+
+    save_json(cache_path('critical_css', root), {'version': CACHE_VERSION, 'fold': args.fold, 'templates': entries})
+
+    print('{} templates: {} computed, {} cached; {} pages {}{}'.format(
+        len(groups), computed, len(groups) - computed, sum(len(p) for p in groups.values()),
+        'would be rewritten' if args.dry_run else 'rewritten',
+        '; {} already inlined'.format(already) if already else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
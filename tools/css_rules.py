@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Small CSS rule parser shared by the stylesheet tools (critical_css.py, ...).
+- parse_css() splits a stylesheet into StyleRule/AtRule nodes that keep their span in the
+  source text. @media, @supports, @layer, @container and @document blocks are parsed into
+  nested rules; every other block (@font-face, @keyframes, @page, ...) is kept as a body.
+- Comments and strings are skipped, so braces and semicolons inside them do not count.
+- filtered() drops rules from the source text by span, leaving the formatting of the rules
+  that stay as it was; grouping at-rules left empty are dropped too.
+
+Use from a sibling tool:
+    from css_rules import parse_css, filtered
+    text = filtered(css, parse_css(css), lambda rule: '.unused' not in rule.selector)
+"""
+import re
+from collections import namedtuple
+
+# A selector block; selector and body exclude the braces. start/end span the whole rule.
+StyleRule = namedtuple('StyleRule', 'selector body start end')
+# An at-rule. rules: nested nodes for GROUPING_AT_RULES, else None; body: None for statements (@import ...;)
+AtRule = namedtuple('AtRule', 'name prelude rules body start end')
+
+GROUPING_AT_RULES = frozenset(('media', 'supports', 'layer', 'container', 'document', '-moz-document', 'scope'))
+
+TOKEN_RE = re.compile(r'''/\*.*?\*/|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|[{};]''', re.S)
+BLANK_RE = re.compile(r'(?:\s+|/\*.*?\*/)*', re.S)
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+AT_NAME_RE = re.compile(r'@([-\w]+)')
+LINE_END_RE = re.compile(r'[ \t]*(?:\r?\n|$)')
+
+# Pseudo-elements and state pseudo-classes say nothing about which elements a selector is for
+PSEUDO_RE = re.compile(r'''
+    ::?(?:before|after|first-line|first-letter)(?![\w-])
+  | ::[-\w]+(?:\([^)]*\))?
+  | :(?:hover|focus|focus-within|focus-visible|active|visited|link|any-link|target|autofill|-webkit-autofill)(?![\w-])
+''', re.I | re.X)
+
+
+def _prelude(text, start, stop):
+    """(start of the prelude after blanks and comments, prelude text without comments)."""
+    start = BLANK_RE.match(text, start, stop).end()
+    return start, COMMENT_RE.sub(' ', text[start:stop]).strip()
+
+
+def _node(prelude, start, end, body=None, rules=None):
+    if prelude.startswith('@'):
+        m = AT_NAME_RE.match(prelude)
+        name = m.group(1).lower() if m else ''
+        return AtRule(name, prelude[m.end() if m else 1:].strip(), rules if name in GROUPING_AT_RULES else None,
+                      body, start, end)
+    return StyleRule(prelude, body, start, end)
+
+
+def parse_css(text):
+    """Top-level rules of a stylesheet as StyleRule/AtRule nodes, in source order."""
+    top = []
+    # frames: (rules collected inside the block or None, prelude, prelude start, '{' end)
+    stack = []
+    last = 0   # end of the previous delimiter; the next prelude starts after it
+
+    def collecting():
+        return not stack or (stack[-1][0] is not None)
+
+    for m in TOKEN_RE.finditer(text):
+        tok = m.group()
+        if tok not in '{};':
+            continue
+        if tok == '{':
+            start, prelude = _prelude(text, last, m.start())
+            name = AT_NAME_RE.match(prelude)
+            is_group = collecting() and name is not None and name.group(1).lower() in GROUPING_AT_RULES
+            stack.append(([] if is_group else None, prelude if collecting() else None, start, m.end()))
+        elif tok == ';':
+            if collecting():
+                start, prelude = _prelude(text, last, m.start())
+                if prelude.startswith('@'):
+                    (stack[-1][0] if stack else top).append(_node(prelude, start, m.end()))
+        elif stack:
+            rules, prelude, start, body_start = stack.pop()
+            if prelude is not None:
+                node = _node(prelude, start, m.end(), text[body_start:m.start()], rules)
+                (stack[-1][0] if stack else top).append(node)
+        last = m.end()
+    return top
+
+
+def split_selectors(selector):
+    """The comma-separated parts of a selector list, ignoring commas inside (), [] and strings."""
+    parts, depth, current, quote = [], 0, [], None
+    for ch in selector:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    parts.append(''.join(current).strip())
+    return [p for p in parts if p]
+
+
+def structural(selector):
+    """selector without pseudo-elements and state pseudo-classes ('a.nav:hover::after' -> 'a.nav').
+
+    A part left empty, or ending on a combinator, gets '*' so it still parses.
+    """
+    selector = PSEUDO_RE.sub('', selector).strip()
+    if not selector or selector[-1] in '>+~':
+        selector = (selector + ' *').strip()
+    return selector
+
+
+def filtered(text, rules, keep):
+    """text without the StyleRules keep(rule) rejects, and AtRules nested rules no longer fill.
+
+    Statements and non-grouping at-rules are kept. A removed rule that had its lines to itself
+    takes them with it, indentation and line break included.
+    """
+    drops = []
+
+    def walk(nodes):
+        kept = 0
+        for node in nodes:
+            if isinstance(node, StyleRule):
+                ok = keep(node)
+            elif node.rules is not None:
+                ok = walk(node.rules) > 0
+            else:
+                ok = True
+            if ok:
+                kept += 1
+            elif isinstance(node, StyleRule) or node.rules is not None:
+                drops.append((node.start, node.end))
+        return kept
+
+    walk(rules)
+    # a dropped at-rule's span already covers the rules dropped inside it
+    drops.sort()
+    out, pos = [], 0
+    for start, end in drops:
+        if start < pos:
+            continue
+        line_start = start - len(text[pos:start]) + len(text[pos:start].rstrip(' \t'))
+        line_end = LINE_END_RE.match(text, end)
+        if (line_start == 0 or text[line_start - 1] == '\n') and line_end:
+            start, end = line_start, line_end.end()
+        out.append(text[pos:start])
+        pos = end
+    out.append(text[pos:])
+    return ''.join(out)
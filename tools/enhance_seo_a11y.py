@@ -7,32 +7,66 @@ Enhance SEO and accessibility for all HTML pages under frontend/:
 - Add a H1 if missing (use title fallback)
 - Add alt attributes for <img> if missing or empty
 - Ensure external links with target="_blank" include rel="noopener noreferrer"
+- With --responsive, wrap <img> tags whose image has variants built by responsive_images.py
+  in <picture>, one <source type srcset> per format (sizes from the width attribute, if any);
+  refused while a variant is not committed (the deploy would serve 404s for it)
 
-Run from repo root: python tools/enhance_seo_a11y.py
+Pages are picked from the shared SiteIndex; only pages that need a fix are re-parsed with BeautifulSoup.
+The fixes are written back as source patches (html_patch.Patch): the rest of the page keeps its bytes.
+enhance() is also the 'enhance-seo-a11y' step of fix_pipeline.py.
+
+Run from repo root: python tools/enhance_seo_a11y.py [--root DIR] [--responsive]
 """
+import argparse
 import os
-from bs4 import BeautifulSoup
+import sys
+
+import responsive_images
+from html_patch import Patch
+from site_index import SiteIndex, is_local_link, resolve_path
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 FRONTEND = os.path.join(ROOT, 'frontend')
 
-html_files = []
-for root, dirs, files in os.walk(FRONTEND):
-    for f in files:
-        if f.lower().endswith('.html'):
-            html_files.append(os.path.join(root, f))
 
-changed = []
+def variant_sources(variants, root, page_path, src):
+    """<source> (type, srcset) pairs for an <img src> on page_path; [] without --responsive or variants."""
+    if variants is None or not is_local_link(src):
+        return []
+    path = resolve_path(root, page_path, src)
+    return responsive_images.picture_sources(variants, root, page_path, src, path)
+
+
+def needs_enhancement(page, variants=None, root=FRONTEND):
+    """Cheap index query: could any of the fixes below change this page?"""
+    if any(not h.attrs.get('lang') for h in page.find('html')):
+        return True
+    if page.title_count == 0 or page.h1_count == 0:
+        return True
+    if not any(m.attrs.get('name') == 'viewport' for m in page.find('meta')):
+        return True
+    for img in page.find('img'):
+        alt = img.attrs.get('alt')
+        if alt is None or alt.strip() == '':
+            return True
+        if not img.attrs.get('srcset') and variant_sources(variants, root, page.path, img.attrs.get('src') or ''):
+            return True
+    for a in page.find('a'):
+        if a.attrs.get('target') == '_blank':
+            rel = a.attrs.get('rel') or ''
+            if 'noopener' not in rel or 'noreferrer' not in rel:
+                return True
+    return False
 
-for page in html_files:
-    with open(page, 'r', encoding='utf-8') as fh:
-        soup = BeautifulSoup(fh, 'html.parser')
 
+def enhance(patch, page, variants=None, root=FRONTEND):
+    """Apply the fixes to patch, the Patch of the page at path page; True if anything changed."""
+    soup = patch.soup
     modified = False
     # lang on html
     html_tag = soup.find('html')
     if html_tag and not html_tag.get('lang'):
-        html_tag['lang'] = 'en'
+        patch.set_attr(html_tag, 'lang', 'en')
         modified = True
 
     # title
@@ -49,14 +83,14 @@ for page in html_files:
         new_title = soup.new_tag('title')
         new_title.string = f"{title_text} — Raphael's Horizon"
         if head:
-            head.append(new_title)
+            patch.append(head, new_title)
             modified = True
 
     # viewport
     viewport = head.find('meta', attrs={'name': 'viewport'}) if head else None
     if not viewport and head:
         meta = soup.new_tag('meta', attrs={'name': 'viewport', 'content': 'width=device-width, initial-scale=1.0'})
-        head.append(meta)
+        patch.append(head, meta)
         modified = True
 
     # H1 present
@@ -73,7 +107,7 @@ for page in html_files:
         if body:
             new_h1 = soup.new_tag('h1')
             new_h1.string = title_text
-            body.insert(0, new_h1)
+            patch.prepend(body, new_h1)
             modified = True
 
     # Images alt text
@@ -84,8 +118,20 @@ for page in html_files:
             src = img.get('src', '')
             # use filename for alt
             alt_text = os.path.splitext(os.path.basename(src))[0].replace('-', ' ').replace('_', ' ').title()
-            img['alt'] = alt_text
+            patch.set_attr(img, 'alt', alt_text)
             modified = True
+        # responsive variants
+        if img.parent.name != 'picture' and not img.get('srcset'):
+            sources = variant_sources(variants, root, page, img.get('src', ''))
+            if sources:
+                width = img.get('width', '').strip().rstrip('px')
+                patch.wrap(img, soup.new_tag('picture'))
+                for mime, srcset in sources:
+                    source = soup.new_tag('source', attrs={'type': mime, 'srcset': srcset})
+                    if width.isdigit():
+                        source['sizes'] = '(max-width: {0}px) 100vw, {0}px'.format(width)
+                    patch.insert_before(img, source)
+                modified = True
 
     # external target rel
     anchors = soup.find_all('a', target=True)
@@ -96,15 +142,42 @@ for page in html_files:
                 rel = ' '.join(rel)
             if 'noopener' not in rel or 'noreferrer' not in rel:
                 new_rel = (rel + ' noopener noreferrer').strip()
-                a['rel'] = new_rel
+                patch.set_attr(a, 'rel', new_rel)
                 modified = True
+    return modified
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Add missing lang/title/viewport/h1/alt/rel to HTML pages.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('--responsive', action='store_true',
+                    help='wrap images in <picture> with the variants from responsive_images.py')
+    args = ap.parse_args(argv)
+    root = os.path.abspath(args.root)
+
+    index = SiteIndex(root).build()
+    try:
+        variants = responsive_images.committed_variant_index(index.fs, root) if args.responsive else None
+    except responsive_images.UntrackedVariants as e:
+        print('Not rewriting pages: {} (git add them first)'.format(e), file=sys.stderr)
+        return 2
+    html_files = [p.path for p in index if needs_enhancement(p, variants, root)]
+
+    changed = []
+    for page in html_files:
+        with open(page, 'r', encoding='utf-8') as fh:
+            patch = Patch(fh.read())
+        if enhance(patch, page, variants, root):
+            with open(page, 'w', encoding='utf-8') as fh:
+                fh.write(patch.text())
+            changed.append(os.path.relpath(page, ROOT))
+
+    print('Updated files:')
+    for c in changed:
+        print('  ', c)
+    print('Done')
+    return 0
 
-    if modified:
-        with open(page, 'w', encoding='utf-8') as fh:
-            fh.write(str(soup))
-        changed.append(os.path.relpath(page, ROOT))
 
-print('Updated files:')
-for c in changed:
-    print('  ', c)
-print('Done')
+if __name__ == '__main__':
+    sys.exit(main())
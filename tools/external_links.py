@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Asyncio checker for external (http/https) links.
+- Minimal HTTP/1.1 client on asyncio streams (stdlib only): keep-alive connections are
+  pooled per host, with a per-host and a global concurrency limit.
+- Sends HEAD first and falls back to GET when HEAD fails or returns >= 400
+  (many CDNs and stores reject HEAD). Redirects are followed up to MAX_REDIRECTS.
+- Results are cached on disk with a TTL so repeated runs do not hit the hosts again.
+  Transient failures (timeouts, connection errors, 408/429 and 5xx) are kept only for
+  TRANSIENT_TTL, so a host that was briefly down is asked again on the next run.
+- Any http:// URL works, so it can be pointed at a local stand-in server that serves
+  canned statuses, redirects and slow responses; --self-check does that (http.server on
+  127.0.0.1) and checks the results, the HEAD to GET fallback, the timeout and the cache.
+
+Used by `check_links.py --external`; can also check URLs directly:
+    python tools/external_links.py https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css
+Self-check: python tools/external_links.py --self-check
+"""
+import asyncio
+import os
+import re
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin, urlsplit
+
+from tool_cache import CACHE_DIR, load_json, save_json
+
+CACHE_PATH = os.path.join(CACHE_DIR, 'external_links.json')
+
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+TRANSIENT_STATUSES = (408, 425, 429)   # plus every 5xx
+TRANSIENT_TTL = 10 * 60
+USER_AGENT = "RaphaelsHorizon-linkcheck/1.0 (+https://raphaelshorizon.com)"
+
+EXTERNAL_ASSETS_RE = re.compile(r'EXTERNAL_ASSETS\s*=\s*\[(.*?)\]', re.DOTALL)
+JS_STRING_RE = re.compile(r'''['"](https?://[^'"]+)['"]''')
+
+
+def is_external_link(link):
+    return link.strip().lower().startswith(('http://', 'https://'))
+
+
+def sw_external_assets(sw_path):
+    """URLs listed in the EXTERNAL_ASSETS array of a service worker, if any."""
+    if not os.path.exists(sw_path):
+        return []
+    with open(sw_path, 'r', encoding='utf-8') as fh:
+        m = EXTERNAL_ASSETS_RE.search(fh.read())
+    return JS_STRING_RE.findall(m.group(1)) if m else []
+
+
+class ResultCache:
+    """{url: result} persisted as JSON; entries older than ttl seconds (transient_ttl for
+    transient failures) are ignored."""
+
+    def __init__(self, path=CACHE_PATH, ttl=24 * 3600, transient_ttl=TRANSIENT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.transient_ttl = transient_ttl
+        self.results = {}
+
+    def _fresh(self, result, now):
+        ttl = min(self.ttl, self.transient_ttl) if is_transient(result) else self.ttl
+        return now - result['checked_at'] < ttl
+
+    def load(self):
+        self.results = load_json(self.path, {})
+        return self
+
+    def save(self):
+        now = time.time()
+        fresh = {u: r for u, r in self.results.items() if self._fresh(r, now)}
+        save_json(self.path, fresh, indent=1, sort_keys=True)
+
+    def get(self, url):
+        r = self.results.get(url)
+        if r is not None and self._fresh(r, time.time()):
+            return r
+        return None
+
+    def put(self, url, result):
+        self.results[url] = result
+
+
+class HostPool:
+    """Keep-alive connections per (scheme, host, port) with per-host and global limits."""
+
+    def __init__(self, per_host=4, concurrency=20, timeout=10.0):
+        self.per_host = per_host
+        self.timeout = timeout
+        self._global = asyncio.Semaphore(concurrency)
+        self._limits = {}
+        self._idle = {}
+        self._ssl = ssl.create_default_context()
+        self.opened = 0
+
+    def _key(self, url):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError('unsupported scheme: ' + scheme)
+        port = parts.port or (443 if scheme == 'https' else 80)
+        return scheme, parts.hostname, port
+
+    async def _open(self, key):
+        scheme, host, port = key
+        self.opened += 1
+        if scheme == 'https':
+            return await asyncio.open_connection(host, port, ssl=self._ssl, server_hostname=host)
+        return await asyncio.open_connection(host, port)
+
+    async def request(self, method, url):
+        """Return (status, headers) for one request; the body is never kept."""
+        key = self._key(url)
+        limit = self._limits.setdefault(key, asyncio.Semaphore(self.per_host))
+        async with self._global, limit:
+            return await asyncio.wait_for(self._request(key, method, url), self.timeout)
+
+    async def _request(self, key, method, url):
+        parts = urlsplit(url)
+        target = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        host = parts.netloc.rpartition('@')[2]
+        payload = ('{} {} HTTP/1.1\r\nHost: {}\r\nUser-Agent: {}\r\nAccept: */*\r\n'
+                   'Connection: keep-alive\r\n\r\n').format(method, target, host, USER_AGENT).encode('latin-1')
+        idle = self._idle.setdefault(key, [])
+        while True:
+            reused = bool(idle)
+            reader, writer = idle.pop() if reused else await self._open(key)
+            try:
+                writer.write(payload)
+                await writer.drain()
+                status, headers, reusable = await _read_response(reader, method)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                # the server dropped an idle keep-alive connection; retry on a fresh one
+            except BaseException:
+                writer.close()
+                raise
+        if reusable:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+        return status, headers
+
+    def close(self):
+        for conns in self._idle.values():
+            for _, writer in conns:
+                writer.close()
+        self._idle.clear()
+
+
+async def _read_response(reader, method):
+    """Read status line and headers; return (status, headers, connection_reusable)."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError('connection closed before response')
+    version, status, _ = (line.decode('latin-1').split(None, 2) + [''])[:3]
+    status = int(status)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    reusable = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+    if method == 'HEAD' or status in (204, 304) or status < 200:
+        return status, headers, reusable
+    # GET: only a small fixed-length body is drained to keep the connection; otherwise drop it
+    length = headers.get('content-length')
+    if length is not None and length.isdigit() and int(length) <= 64 * 1024 and 'chunked' not in headers.get('transfer-encoding', ''):
+        await reader.readexactly(int(length))
+        return status, headers, reusable
+    return status, headers, False
+
+
+async def check_url(pool, url, max_redirects=MAX_REDIRECTS):
+    """Follow one URL: HEAD, falling back to GET; return a JSON-friendly result dict."""
+    method = 'HEAD'
+    current = url
+    redirects = 0
+    while True:
+        try:
+            status, headers = await pool.request(method, current)
+        except (OSError, asyncio.TimeoutError, ValueError, asyncio.IncompleteReadError) as e:
+            if method == 'HEAD':
+                method = 'GET'
+                continue
+            error = 'timeout' if isinstance(e, asyncio.TimeoutError) else '{}: {}'.format(type(e).__name__, e)
+            return {'status': None, 'error': error, 'final_url': current, 'method': method}
+        if status in REDIRECT_STATUSES and headers.get('location'):
+            redirects += 1
+            if redirects > max_redirects:
+                return {'status': status, 'error': 'too many redirects', 'final_url': current, 'method': method}
+            current = urljoin(current, headers['location'])
+            continue
+        if status >= 400 and method == 'HEAD':
+            method = 'GET'
+            continue
+        return {'status': status, 'error': None, 'final_url': current, 'method': method}
+
+
+def is_broken(result):
+    return result['error'] is not None or result['status'] >= 400
+
+
+def is_transient(result):
+    """Could the failure go away by itself (timeout, connection error, overload, server error)?"""
+    if result['status'] is None:
+        return True
+    return result['status'] in TRANSIENT_STATUSES or result['status'] >= 500
+
+
+async def _check_all(urls, per_host, concurrency, timeout):
+    pool = HostPool(per_host=per_host, concurrency=concurrency, timeout=timeout)
+    try:
+        results = await asyncio.gather(*(check_url(pool, u) for u in urls))
+    finally:
+        pool.close()
+    return dict(zip(urls, results))
+
+
+def check_urls(urls, cache=None, per_host=4, concurrency=20, timeout=10.0):
+    """{url: result} for every URL; cached results within the TTL are reused."""
+    urls = list(dict.fromkeys(urls))
+    results = {}
+    todo = []
+    for url in urls:
+        cached = cache.get(url) if cache is not None else None
+        if cached is not None:
+            results[url] = cached
+        else:
+            todo.append(url)
+    if todo:
+        fresh = asyncio.run(_check_all(todo, per_host, concurrency, timeout))
+        now = time.time()
+        for url, result in fresh.items():
+            result['checked_at'] = now
+            if cache is not None:
+                cache.put(url, result)
+        results.update(fresh)
+    return {u: results[u] for u in urls}
+
+
+def describe(result):
+    if result['error']:
+        return result['error']
+    return 'HTTP {} ({})'.format(result['status'], result['method'])
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """Canned responses for self_check(); every request is counted in server.hits."""
+    protocol_version = 'HTTP/1.1'
+    SLOW_SECONDS = 1.0
+    ROUTES = {   # path: (status, Location)
+        '/ok': (200, None),
+        '/missing': (404, None),
+        '/moved': (301, '/moved-again'),
+        '/moved-again': (302, '/ok'),
+        '/loop': (301, '/loop'),
+        '/unavailable': (503, None),
+    }
+
+    def _respond(self, method):
+        self.server.hits.append((method, self.path))
+        if self.path == '/slow':
+            time.sleep(self.SLOW_SECONDS)
+        if self.path == '/no-head':
+            status, location = (405, None) if method == 'HEAD' else (200, None)
+        else:
+            status, location = self.ROUTES.get(self.path, (200, None))
+        body = b'' if method == 'HEAD' else b'stand-in'
+        self.send_response(status)
+        if location:
+            self.send_header('Location', location)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._respond('HEAD')
+
+    def do_GET(self):
+        self._respond('GET')
+
+    def log_message(self, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (ConnectionError, OSError):
+            pass    # the client gave up on /slow
+
+
+def self_check():
+    """Check URLs on a local stand-in server; return a list of problems."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StandIn)
+    server.daemon_threads = True
+    server.hits = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    problems = []
+
+    def expect(what, actual, expected):
+        if actual != expected:
+            problems.append('{}: expected {!r}, got {!r}'.format(what, expected, actual))
+
+    # path: (status, error, final path, method that gave the answer)
+    cases = {
+        '/ok': (200, None, '/ok', 'HEAD'),
+        '/missing': (404, None, '/missing', 'GET'),
+        '/moved': (200, None, '/ok', 'HEAD'),
+        '/loop': (301, 'too many redirects', '/loop', 'HEAD'),
+        '/no-head': (200, None, '/no-head', 'GET'),
+        '/slow': (None, 'timeout', '/slow', 'GET'),
+    }
+
+    async def run():
+        pool = HostPool(per_host=2, timeout=_StandIn.SLOW_SECONDS / 4)
+        try:
+            return await asyncio.gather(*(check_url(pool, base + path) for path in cases)), pool.opened
+        finally:
+            pool.close()
+
+    try:
+        results, opened = asyncio.run(run())
+        for (path, (status, error, final, method)), result in zip(cases.items(), results):
+            expect(path, (result['status'], result['error'], result['final_url'], result['method']),
+                   (status, error, base + final, method))
+        expect('/no-head requests', [m for m, p in server.hits if p == '/no-head'], ['HEAD', 'GET'])
+        expect('/slow requests (HEAD times out, GET times out)', [m for m, p in server.hits if p == '/slow'],
+               ['HEAD', 'GET'])
+        expect('/loop requests', sum(p == '/loop' for _, p in server.hits), MAX_REDIRECTS + 1)
+        requests = len(server.hits)
+        if not opened < requests:
+            problems.append('keep-alive: {} connections opened for {} requests'.format(opened, requests))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(os.path.join(tmp, 'external_links.json'), ttl=60, transient_ttl=10)
+            urls = [base + '/ok', base + '/missing', base + '/unavailable']
+            first = check_urls(urls, cache)
+            cache.save()
+            cache = ResultCache(cache.path, ttl=60, transient_ttl=10).load()
+            hits = len(server.hits)
+            expect('cache hit', check_urls(urls, cache), first)
+            expect('requests on a cache hit', len(server.hits) - hits, 0)
+            for url in urls:
+                cache.results[url]['checked_at'] -= 11
+            check_urls(urls, cache)
+            expect('requests after the transient TTL ran out', server.hits[hits:],
+                   [('HEAD', '/unavailable'), ('GET', '/unavailable')])
+            hits = len(server.hits)
+            cache.results[base + '/ok']['checked_at'] -= 61
+            check_urls(urls, cache)
+            expect('requests after the TTL ran out', server.hits[hits:], [('HEAD', '/ok')])
+            cache.results[base + '/unavailable']['checked_at'] -= 11
+            cache.save()
+            expect('transient results saved after their TTL', sorted(ResultCache(cache.path).load().results),
+                   [base + '/missing', base + '/ok'])
+    finally:
+        server.shutdown()
+        server.server_close()
+    return problems
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description='Check external URLs (HEAD, falling back to GET).')
+    ap.add_argument('urls', nargs='*')
+    ap.add_argument('--self-check', action='store_true', help='check this module against a local stand-in server')
+    ap.add_argument('--ttl', type=float, default=24, help='cache lifetime in hours (0 disables the cache)')
+    ap.add_argument('--timeout', type=float, default=10, help='seconds per request')
+    ap.add_argument('--per-host', type=int, default=4, help='connections per host')
+    ap.add_argument('--concurrency', type=int, default=20, help='requests in flight overall')
+    args = ap.parse_args(argv)
+    if args.self_check:
+        problems = self_check()
+        for problem in problems:
+            print('  ', problem)
+        print('Self-check: {} problems'.format(len(problems)))
+        return 1 if problems else 0
+    if not args.urls:
+        ap.error('give URLs to check, or --self-check')
+
+    cache = ResultCache(ttl=args.ttl * 3600).load() if args.ttl > 0 else None
+    results = check_urls(args.urls, cache, args.per_host, args.concurrency, args.timeout)
+    if cache is not None:
+        cache.save()
+    broken = 0
+    for url, result in results.items():
+        flag = 'BROKEN' if is_broken(result) else 'ok'
+        broken += is_broken(result)
+        print('  {:6} {} -> {}'.format(flag, url, describe(result)))
+    return 2 if broken else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Content-hash fingerprinting of the site's static assets, as a build step on a copy of the site.
+- CSS, JS, images and fonts referenced from HTML, CSS, JS, sw.js or JSON get the first
+  HASH_LEN hex digits of their sha256 in the name (css/styles.css -> css/styles.1a2b3c4d5e.css)
+  and every reference to them is rewritten; only the file name in each reference changes,
+  so relative/absolute form, query strings and fragments are kept.
+- References are resolved like relativize_links.resolve_target does (same fallbacks); in
+  JS/JSON only root-relative strings ('/css/x.css', 'assets/...') are rewritten.
+- Assets are hashed after their own references were rewritten (a stylesheet's hash covers
+  the hashed names of its images), in dependency order.
+- An asset is left alone (pinned) when its file name also appears somewhere it could not be
+  resolved, e.g. a page-relative path built in a script; KEEP lists files that must keep
+  their URL (the service worker, the no-cache runtime config) and directories whose files
+  load each other by computed names.
+- Writes asset-manifest.json (original -> hashed path) into the output root, then rebuilds
+  the output's sw.js precache list with sw_precache, so its URLs, revisions and
+  PRECACHE_VERSION are those of the fingerprinted files.
+- Hashed names never change, so they can be cached for a year: see cache_rules(); the
+  rules are in nginx.prod.conf and frontend/vercel.json, and are checked on every run.
+
+Run from repo root:
+    python tools/fingerprint_assets.py --out public [--root frontend] [--keep-originals]
+    python tools/fingerprint_assets.py --print-rules
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from urllib.parse import quote, unquote
+
+import sw_precache
+from fs_snapshot import FsSnapshot
+from relativize_links import ROOT_LIKE_PREFIXES, resolve_target
+from site_index import css_refs, is_local_link, resolve_path, srcset_urls
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+NGINX_CONF = os.path.join(ROOT, 'nginx.prod.conf')
+VERCEL_JSON = 'vercel.json'
+MANIFEST = 'asset-manifest.json'
+
+HASH_LEN = 10
+FINGERPRINT_SUFFIXES = ('.css', '.js', '.mjs', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg',
+                        '.ico', '.woff', '.woff2', '.ttf', '.otf', '.eot')
+TEXT_SUFFIXES = ('.html', '.css', '.js', '.mjs', '.json', '.webmanifest')
+KEEP = ('sw.js', 'js/config.js')
+KEEP_DIRS = ('js/pdfjs/',)
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+HASHED_RE = re.compile(r'\.[0-9a-f]{%d}\.(?:%s)$' % (HASH_LEN, '|'.join(s[1:] for s in FINGERPRINT_SUFFIXES)))
+ATTR_RE = re.compile(r'''\b(href|src|srcset|poster|data-src)\s*=\s*("|')(.*?)\2''', re.I | re.S)
+URL_FUNC_RE = re.compile(r'''url\(\s*(["']?)([^"')]+?)\1\s*\)''', re.I)
+STRING_RE = re.compile(r'''(["'`])([^"'`\s<>]+?)\1''')
+
+
+def cache_rules():
+    """(vercel.json header entry, nginx location block) giving fingerprinted names a long cache life."""
+    exts = '|'.join(s[1:] for s in FINGERPRINT_SUFFIXES)
+    vercel = {
+        'source': '/(.*)\\.([0-9a-f]{%d})\\.(%s)' % (HASH_LEN, exts),
+        'headers': [{'key': 'Cache-Control', 'value': CACHE_CONTROL}],
+    }
+    # the proxy settings of "location /", which a nested location does not inherit in full
+    nginx = ('location ~* "\\.[0-9a-f]{%d}\\.(%s)$" {\n'
+             '    proxy_pass http://backend:5002;\n'
+             '    proxy_http_version 1.1;\n'
+             "    proxy_set_header Upgrade $http_upgrade;\n"
+             "    proxy_set_header Connection 'upgrade';\n"
+             '    proxy_set_header Host $host;\n'
+             '    proxy_cache_bypass $http_upgrade;\n'
+             '    proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;\n'
+             '    proxy_set_header X-Forwarded-Proto $scheme;\n'
+             '    proxy_read_timeout 60s;\n'
+             '    proxy_hide_header Cache-Control;\n'
+             '    add_header Cache-Control "%s";\n'
+             '}' % (HASH_LEN, exts, CACHE_CONTROL))
+    return vercel, nginx
+
+
+def missing_rules(out):
+    """Descriptions of deploy configs that lack the cache rule for fingerprinted names."""
+    vercel, nginx = cache_rules()
+    missing = []
+    vercel_path = os.path.join(out, VERCEL_JSON)
+    if os.path.isfile(vercel_path):
+        with open(vercel_path, encoding='utf-8') as fh:
+            headers = json.load(fh).get('headers', [])
+        if vercel not in headers:
+            missing.append(os.path.relpath(vercel_path, ROOT))
+    if os.path.isfile(NGINX_CONF):
+        with open(NGINX_CONF, encoding='utf-8') as fh:
+            if nginx.splitlines()[0] not in fh.read():
+                missing.append(os.path.relpath(NGINX_CONF, ROOT))
+    return missing
+
+
+def rel(root, path):
+    return os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def is_candidate(root, path):
+    """Could this file be fingerprinted (right type, not kept, not already hashed)?"""
+    r = rel(root, path)
+    return (path.lower().endswith(FINGERPRINT_SUFFIXES) and r not in KEEP
+            and not r.startswith(KEEP_DIRS) and not HASHED_RE.search(os.path.basename(path)))
+
+
+def find_refs(path, text):
+    """[(start, end, value)] spans of the URL references in a text file."""
+    lower = path.lower()
+    spans = []
+    if lower.endswith('.html'):
+        for m in ATTR_RE.finditer(text):
+            start = m.start(3)
+            if m.group(1).lower() == 'srcset':
+                pos = 0
+                for url in srcset_urls(m.group(3)):
+                    i = m.group(3).index(url, pos)
+                    spans.append((start + i, start + i + len(url), url))
+                    pos = i + len(url)
+            else:
+                spans.append((start, m.end(3), m.group(3)))
+        for m in URL_FUNC_RE.finditer(text):
+            spans.append((m.start(2), m.end(2), m.group(2)))
+    elif lower.endswith('.css'):
+        for kind, value, offset in css_refs(text):
+            i = text.index(value, offset)
+            spans.append((i, i + len(value), value))
+    else:
+        for m in STRING_RE.finditer(text):
+            value = m.group(2)
+            if value.startswith('/') or value.startswith(ROOT_LIKE_PREFIXES):
+                spans.append((m.start(2), m.end(2), value))
+    return spans
+
+
+def resolve_ref(fs, root, path, value):
+    """The file a reference value in path points at, or None."""
+    if not is_local_link(value, skip_javascript=True):
+        return None
+    link = value.split('#', 1)[0].split('?', 1)[0]
+    if not link:
+        return None
+    exact = resolve_path(root, path, link)
+    if fs.isfile(exact):
+        return exact
+    target = resolve_target(fs, root, path, unquote(link))
+    return target if target and fs.isfile(target) else None
+
+
+def renamed_value(value, target, new_path):
+    """value with its file name replaced by new_path's, or None if value does not end in target's name."""
+    cut = len(value)
+    for sep in '?#':
+        i = value.find(sep)
+        if i != -1:
+            cut = min(cut, i)
+    link = value[:cut]
+    slash = link.rfind('/') + 1
+    if unquote(link[slash:]) != os.path.basename(target):
+        return None
+    return link[:slash] + quote(os.path.basename(new_path)) + value[cut:]
+
+
+class TextFile:
+    """A text file under the output root and its resolved references."""
+
+    def __init__(self, fs, root, path):
+        self.path = path
+        with open(path, 'rb') as fh:
+            self.data = fh.read()
+        self.text = self.data.decode('utf-8', errors='surrogateescape')
+        self.refs = []   # (start, end, value, target)
+        for start, end, value in find_refs(path, self.text):
+            target = resolve_ref(fs, root, path, value)
+            if target is not None and target != path:
+                self.refs.append((start, end, value, target))
+
+    def unresolved_text(self):
+        """The text outside the resolved references."""
+        parts, pos = [], 0
+        for start, end, _, _ in sorted(self.refs):
+            parts.append(self.text[pos:start])
+            pos = max(pos, end)
+        parts.append(self.text[pos:])
+        return ''.join(parts)
+
+    def rewritten(self, renames):
+        """(new bytes, number of references changed) with renames {old path: new path} applied."""
+        out, pos, count = [], 0, 0
+        for start, end, value, target in sorted(self.refs):
+            if target in renames and start >= pos:
+                new = renamed_value(value, target, renames[target])
+                if new is not None:
+                    out.append(self.text[pos:start])
+                    out.append(new)
+                    pos = end
+                    count += 1
+        if not count:
+            return self.data, 0
+        out.append(self.text[pos:])
+        return ''.join(out).encode('utf-8', errors='surrogateescape'), count
+
+
+def hashed_path(path, data):
+    stem, ext = os.path.splitext(path)
+    return '{}.{}{}'.format(stem, hashlib.sha256(data).hexdigest()[:HASH_LEN], ext)
+
+
+def fingerprint(root, keep_originals=False):
+    """Fingerprint the site at root in place; return (renames {old: new}, references rewritten, pinned)."""
+    fs = FsSnapshot.scan(root)
+    files = {p: TextFile(fs, root, p) for p in fs.iter_files(TEXT_SUFFIXES)}
+
+    referenced = {t for f in files.values() for *_, t in f.refs if is_candidate(root, t)}
+    by_name = {}
+    for target in referenced:
+        by_name.setdefault(os.path.basename(target), set()).add(target)
+    # a path ending in an asset's name that we could not resolve (page-relative paths in
+    # scripts) pins the assets whose path ends the same way
+    mentions = {name: re.compile(r'(?<![\w@%+.~-])([\w@%+.~/-]*?)' + re.escape(name) + r'(?![\w.-])')
+                for name in by_name}
+    pinned = set()
+    for f in files.values():
+        leftover = f.unresolved_text()
+        for name, targets in by_name.items():
+            if name not in leftover:
+                continue
+            for m in mentions[name].finditer(leftover):
+                dirs = [d for d in m.group(1).split('/') if d not in ('', '.', '..')]
+                pinned |= {t for t in targets if rel(root, t).split('/')[:-1][-len(dirs):] == dirs or not dirs}
+    candidates = referenced - pinned
+
+    # dependencies first, so a file is hashed after its references were rewritten
+    def deps(path):
+        return iter(sorted({t for *_, t in files[path].refs} & candidates) if path in files else ())
+
+    order, seen = [], set()
+    for path in sorted(candidates):
+        if path in seen:
+            continue
+        seen.add(path)
+        stack = [(path, deps(path))]
+        while stack:
+            node, pending = stack[-1]
+            for dep in pending:
+                if dep not in seen:   # a dependency cycle is cut here
+                    seen.add(dep)
+                    stack.append((dep, deps(dep)))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+
+    renames = {}
+    rewrites = 0
+    for path in order:
+        if path in files:
+            data, count = files[path].rewritten(renames)
+            rewrites += count
+        else:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+        new_path = hashed_path(path, data)
+        with open(new_path, 'wb') as fh:
+            fh.write(data)
+        shutil.copystat(path, new_path)
+        if not keep_originals:
+            os.remove(path)
+        renames[path] = new_path
+
+    for path, f in files.items():
+        if path in renames:
+            continue
+        data, count = f.rewritten(renames)
+        if count:
+            with open(path, 'wb') as fh:
+                fh.write(data)
+            rewrites += count
+    return renames, rewrites, pinned
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Rename assets with a content hash and rewrite their references.')
+    ap.add_argument('--root', default=FRONTEND, help='site to build from (default: frontend/)')
+    where = ap.add_mutually_exclusive_group()
+    where.add_argument('--out', help='write the fingerprinted site here (replaced if it exists)')
+    where.add_argument('--in-place', action='store_true', help='fingerprint --root itself')
+    ap.add_argument('--keep-originals', action='store_true', help='keep the unhashed files next to the hashed ones')
+    ap.add_argument('--print-rules', action='store_true', help='print the vercel.json / nginx cache rules and exit')
+    args = ap.parse_args(argv)
+
+    if args.print_rules:
+        vercel, nginx = cache_rules()
+        print('vercel.json "headers" entry:')
+        print(json.dumps(vercel, indent=2))
+        print('\nnginx location (nested inside "location /", so /api/ and the other prefixes keep theirs):')
+        print(nginx)
+        return 0
+    if not args.out and not args.in_place:
+        ap.error('one of --out or --in-place is required')
+
+    root = os.path.abspath(args.root)
+    if args.out:
+        out = os.path.abspath(args.out)
+        if os.path.exists(out):
+            shutil.rmtree(out)
+        shutil.copytree(root, out, symlinks=True)
+    else:
+        out = root
+
+    renames, rewrites, pinned = fingerprint(out, args.keep_originals)
+    manifest = {rel(out, old): rel(out, new) for old, new in sorted(renames.items())}
+    with open(os.path.join(out, MANIFEST), 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+
+    print('Fingerprinted {} assets, rewrote {} references'.format(len(renames), rewrites))
+    if pinned:
+        print('Left unhashed ({} assets whose name also appears in an unresolvable reference):'.format(len(pinned)))
+        for path in sorted(pinned):
+            print('  ', rel(out, path))
+    print('Manifest:', os.path.relpath(os.path.join(out, MANIFEST), ROOT))
+    status = 0
+    if os.path.isfile(os.path.join(out, 'sw.js')):
+        status = sw_precache.main(['--root', out])
+    missing = missing_rules(out)
+    for path in missing:
+        print('Warning: {} has no long-lived Cache-Control rule for fingerprinted names '
+              '(see --print-rules)'.format(path), file=sys.stderr)
+    return 1 if missing or status else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,55 @@
 #!/usr/bin/env python3
+"""
+Lower-case the divine-Jurisprudence slug in the built site (public/ by default).
+- Runs through rewrite_engine.RuleSet like the other replacement fixers, so more case fixes
+  can be added to REPLACEMENTS without another pass over every file.
+- --verify also rewrites every file one rule pass at a time and compares (exit 1 if any
+  differs).
+
+Run from repo root: python tools/fix_divine_case.py [--root public] [--verify] [-v]
+"""
+import argparse
+import sys
 from pathlib import Path
-paths = list(Path('public').rglob('*.html')) + list(Path('public').rglob('*.js')) + list(Path('public').rglob('*.css'))
-modified = []
-for f in paths:
-    s = f.read_text(encoding='utf-8')
-    if 'divine-Jurisprudence' in s:
-        ns = s.replace('divine-Jurisprudence', 'divine-jurisprudence')
-        f.write_text(ns, encoding='utf-8')
-        modified.append(str(f))
-print('Modified files:')
-for m in modified:
-    print(m)
+
+from rewrite_engine import RuleSet
+
+REPLACEMENTS = [
+    ('divine-Jurisprudence', 'divine-jurisprudence'),
+]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Fix the case of the divine-jurisprudence slug in HTML, JS and CSS.')
+    ap.add_argument('--root', default='public', help='site root (default: public/)')
+    ap.add_argument('--verify', action='store_true',
+                    help='also apply the rules one pass at a time and compare (exit 1 if any file differs)')
+    ap.add_argument('-v', '--verbose', action='store_true', help='list the hit count of every rule')
+    args = ap.parse_args(argv)
+    rules = RuleSet(REPLACEMENTS)
+
+    root = Path(args.root)
+    paths = list(root.rglob('*.html')) + list(root.rglob('*.js')) + list(root.rglob('*.css'))
+    modified = []
+    mismatched = []
+    for f in paths:
+        s = f.read_text(encoding='utf-8')
+        ns = rules.rewrite(s)
+        if args.verify and ns != rules.sequential(s):
+            mismatched.append(str(f))
+        if ns != s:
+            f.write_text(ns, encoding='utf-8')
+            modified.append(str(f))
+    print('Modified files:')
+    for m in modified:
+        print(m)
+    rules.print_report(args.verbose)
+    if args.verify:
+        print('Verify: {} files differ from sequential application'.format(len(mismatched)))
+        for m in mismatched:
+            print(m)
+    return 1 if mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,21 +3,33 @@
 Ensure all `index.html` links point to site root index.html (frontend/index.html) rather than folder-local index.html.
 - For each HTML file, find href values to index.html and replace them with the relative path to ROOT/index.html
 
+Only pages whose raw bytes mention index.html (INDEX_LINK prefilter) are parsed, and only those
+whose hrefs reference an index.html other than the root one are rewritten.
+
 Run: python tools/fix_home_links.py
 """
 import os
 import re
 
+from fs_snapshot import FsSnapshot
+from prefilter import Prefilter
+from site_index import parse_page
+
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 FRONTEND = os.path.join(ROOT, 'frontend')
 
-html_files = []
-for root, dirs, files in os.walk(FRONTEND):
-    for f in files:
-        if f.lower().endswith('.html'):
-            html_files.append(os.path.join(root, f))
-
 INDEX_PATH = os.path.join(FRONTEND, 'index.html')
+INDEX_LINK = Prefilter('index.html', regex=rb'(?i)index\.html')
+
+
+def needs_fix(page):
+    rel = os.path.relpath(INDEX_PATH, os.path.dirname(page.path)).replace('\\', '/')
+    return any(r.attr == 'href' and r.value.lower().endswith('index.html') and r.value != rel
+               for r in page.refs)
+
+
+candidates = INDEX_LINK.filter(FsSnapshot.scan(FRONTEND).iter_files(('.html',)))
+html_files = [path for path in candidates if needs_fix(parse_page(path))]
 
 pattern = re.compile(r'href=("|\')([^"\']*index\.html)("|\')', re.IGNORECASE)
 changed = []
@@ -42,4 +54,5 @@ for page in html_files:
 print('Updated files:')
 for c in changed:
     print('  ', c)
+INDEX_LINK.report()
 print('Done')
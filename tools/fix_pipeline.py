@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Run the page fixers (fixers.py) as one pipeline instead of one script after another.
+- Every fixer is a small plugin class (fixers.py): prepare() once per run with the site
+  (root and the shared SiteIndex), wants() per page from the index without parsing it, and
+  fix() on the page's html_patch.Patch.
+- A page that no fixer wants is not read. Every other page is read and parsed once, goes
+  through the fixers that want it in FIXERS order on the same tree (each fixer sees the
+  edits of the ones before it) and is written at most once, as source patches.
+- --dry-run writes nothing and prints the unified diff of every page that would change.
+- --timing prints the time spent in each fixer (wants() and fix()), in the index build and
+  in reading and parsing pages.
+- --verify checks every changed page with Patch.verify() and exits 1 on a problem.
+
+Run from repo root:
+    python tools/fix_pipeline.py [--root frontend] [--fixers convert-hash-links ...] [--responsive]
+                                 [--dry-run] [--timing] [--verify]
+"""
+import argparse
+import difflib
+import os
+import sys
+import time
+
+from fixers import FIXERS, SiteContext, make_fixers
+from html_patch import Patch
+from responsive_images import UntrackedVariants
+from site_index import SiteIndex
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+
+class PageResult:
+    __slots__ = ('path', 'original', 'patch', 'fixed_by')
+
+    def __init__(self, path, original, patch, fixed_by):
+        self.path = path
+        self.original = original
+        self.patch = patch
+        self.fixed_by = fixed_by   # names of the fixers that changed the page
+
+    def text(self):
+        return self.patch.text()
+
+
+class FixPipeline:
+    """Run a list of fixers over every HTML page under a root, one parse per page."""
+
+    def __init__(self, fixers, timing=False):
+        self.fixers = list(fixers)
+        self.timing = timing
+        self.seconds = {fixer.name: 0.0 for fixer in self.fixers}
+        self.calls = {fixer.name: 0 for fixer in self.fixers}
+        self.fixed = {fixer.name: 0 for fixer in self.fixers}
+        self.index_seconds = 0.0
+        self.load_seconds = 0.0
+        self.pages = 0
+        self.loaded = 0
+
+    def _call(self, fixer, method, *args):
+        if self.timing:
+            t = time.perf_counter()
+            result = getattr(fixer, method)(*args)
+            self.seconds[fixer.name] += time.perf_counter() - t
+            self.calls[fixer.name] += 1
+            return result
+        return getattr(fixer, method)(*args)
+
+    def run(self, root):
+        """Yield a PageResult for every page some fixer changed, in walk order; writes nothing."""
+        root = os.path.abspath(root)
+        t = time.perf_counter()
+        index = SiteIndex(root).build()
+        self.index_seconds += time.perf_counter() - t
+        site = SiteContext(root, index)
+        for fixer in self.fixers:
+            self._call(fixer, 'prepare', site)
+        for page in index:
+            self.pages += 1
+            fixers = [fixer for fixer in self.fixers if self._call(fixer, 'wants', page)]
+            if not fixers:
+                continue
+            t = time.perf_counter()
+            with open(page.path, 'r', encoding='utf-8') as fh:
+                original = fh.read()
+            patch = Patch(original)
+            self.load_seconds += time.perf_counter() - t
+            self.loaded += 1
+            fixed_by = []
+            for fixer in fixers:
+                if self._call(fixer, 'fix', patch, page):
+                    fixed_by.append(fixer.name)
+                    self.fixed[fixer.name] += 1
+            if fixed_by:
+                yield PageResult(page.path, original, patch, fixed_by)
+
+    def timing_report(self):
+        """[(fixer name, seconds, calls, pages fixed)] slowest first."""
+        return sorted(((n, self.seconds[n], self.calls[n], self.fixed[n]) for n in self.seconds),
+                      key=lambda r: r[1], reverse=True)
+
+
+def unified_diff(path, original, text):
+    rel = os.path.relpath(path, ROOT).replace(os.sep, '/')
+    return ''.join(difflib.unified_diff(original.splitlines(True), text.splitlines(True), 'a/' + rel, 'b/' + rel))
+
+
+def print_timing(pipeline):
+    print('\nFixer timing ({} pages, {} read and parsed in {:.1f} ms, index built in {:.1f} ms):'.format(
+        pipeline.pages, pipeline.loaded, pipeline.load_seconds * 1000, pipeline.index_seconds * 1000))
+    for name, seconds, calls, fixed in pipeline.timing_report():
+        print('  {:24} {:9.2f} ms {:9} calls {:6} pages fixed'.format(name, seconds * 1000, calls, fixed))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Run the page fixers in one pass: one parse and at most one write per page.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('--fixers', nargs='+', choices=[f.name for f in FIXERS], help='run only these fixers')
+    ap.add_argument('--responsive', action='store_true',
+                    help='enhance-seo-a11y: wrap images in <picture> with the variants from responsive_images.py')
+    ap.add_argument('--dry-run', action='store_true', help='write nothing, print the diff of every page that would change')
+    ap.add_argument('--timing', action='store_true', help='report time spent per fixer')
+    ap.add_argument('--verify', action='store_true', help='check every changed page with Patch.verify()')
+    args = ap.parse_args(argv)
+
+    pipeline = FixPipeline(make_fixers(args.fixers, responsive=args.responsive), timing=args.timing)
+    changed = []
+    problems = []
+    try:
+        results = list(pipeline.run(args.root))
+    except UntrackedVariants as e:
+        print('Not rewriting pages: {} (git add them first)'.format(e), file=sys.stderr)
+        return 2
+    for result in results:
+        text = result.text()
+        if text == result.original:
+            continue
+        rel = os.path.relpath(result.path, ROOT)
+        changed.append((rel, result.fixed_by))
+        if args.verify:
+            problems.extend('{}: {}'.format(rel, problem) for problem in result.patch.verify(text))
+        if args.dry_run:
+            sys.stdout.write(unified_diff(result.path, result.original, text))
+        else:
+            with open(result.path, 'w', encoding='utf-8') as fh:
+                fh.write(text)
+
+    print('{} files:'.format('Would update' if args.dry_run else 'Updated'))
+    for rel, fixed_by in changed:
+        print('   {}  ({})'.format(rel, ', '.join(fixed_by)))
+    print('{} of {} pages changed, {} read'.format(len(changed), pipeline.pages, pipeline.loaded))
+    if args.timing:
+        print_timing(pipeline)
+    if args.verify:
+        print('Verify: {} problems'.format(len(problems)))
+        for problem in problems:
+            print('  ', problem)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Page fixers for the fix pipeline (see fix_pipeline.py).
+Each fixer wraps the fix of one of the standalone scripts, which keep working on their own;
+FIXERS lists them in the order they run on a page:
+- enhance-seo-a11y      lang/title/viewport/h1/alt/rel (enhance_seo_a11y.py)
+- convert-hash-links    href="#" controls to <button> (convert_hash_links.py)
+- remove-duplicate-h1   the extra <h1> at the start of <body> (remove_duplicate_h1.py)
+- fix-blog-navigation   blog index Read More and post prev/next links (fix_blog_navigation.py)
+
+Writing a fixer:
+    class LangFixer(Fixer):
+        name = 'lang'
+        description = 'Add <html lang="en">'
+
+        def wants(self, page):
+            return not page.lang
+
+        def fix(self, patch, page):
+            html = patch.soup.find('html')
+            if html is None or html.get('lang'):
+                return False
+            patch.set_attr(html, 'lang', 'en')
+            return True
+"""
+import os
+
+import responsive_images
+from convert_hash_links import convert_hash_links
+from enhance_seo_a11y import enhance, needs_enhancement
+from fix_blog_navigation import blog_posts, fix_index_links, fix_post_navigation, neighbours
+from remove_duplicate_h1 import remove_duplicate_h1
+
+
+class Fixer:
+    """Base class: pick pages with wants(), edit them through the Patch in fix()."""
+    name = ''
+    description = ''
+    options = ()   # make_fixers() keyword options this fixer takes
+
+    def prepare(self, site):
+        """Set up once per run, before any page; site is the SiteContext."""
+
+    def wants(self, page):
+        """Could fix() change this page? page is its site_index.Page, as indexed before the run."""
+        return True
+
+    def fix(self, patch, page):
+        """Edit the page through patch (an html_patch.Patch); return True if anything changed."""
+        return False
+
+
+class SiteContext:
+    """What a fixer may need about the whole site."""
+    __slots__ = ('root', 'index', 'fs')
+
+    def __init__(self, root, index):
+        self.root = root
+        self.index = index
+        self.fs = index.fs
+
+
+class EnhanceSeoA11y(Fixer):
+    name = 'enhance-seo-a11y'
+    description = 'Add missing lang/title/viewport/h1/alt/rel'
+    options = ('responsive',)
+
+    def __init__(self, responsive=False):
+        self.responsive = responsive
+
+    def prepare(self, site):
+        self.root = site.root
+        self.variants = responsive_images.committed_variant_index(site.fs, site.root) if self.responsive else None
+
+    def wants(self, page):
+        return needs_enhancement(page, self.variants, self.root)
+
+    def fix(self, patch, page):
+        return enhance(patch, page.path, self.variants, self.root)
+
+
+class ConvertHashLinks(Fixer):
+    name = 'convert-hash-links'
+    description = 'Turn href="#" anchors used as controls into buttons'
+
+    def wants(self, page):
+        return any(ref.value.strip() == '#' for ref in page.hrefs)
+
+    def fix(self, patch, page):
+        return convert_hash_links(patch)
+
+
+class RemoveDuplicateH1(Fixer):
+    name = 'remove-duplicate-h1'
+    description = 'Remove a second <h1> at the start of <body>'
+
+    def wants(self, page):
+        return page.h1_count > 1
+
+    def fix(self, patch, page):
+        return remove_duplicate_h1(patch)
+
+
+class FixBlogNavigation(Fixer):
+    name = 'fix-blog-navigation'
+    description = 'Point blog Read More and prev/next links at the right posts'
+
+    def prepare(self, site):
+        blog_dir = os.path.join(site.root, 'pages', 'blog')
+        self.index_path = os.path.join(blog_dir, 'index.html')
+        self.posts = []
+        if os.path.isdir(blog_dir):
+            # titles from the index's first <h1>, so the posts are not parsed twice
+            self.posts = blog_posts(blog_dir, lambda path: self._title(site.index.pages.get(path)))
+        self.title_to_fname = {t: f for _, f, t in self.posts if t}
+        self.post_paths = {os.path.join(blog_dir, f): f for _, f, _ in self.posts}
+
+    @staticmethod
+    def _title(page):
+        if page is None:
+            return None
+        return next((text for level, text, _ in page.headings if level == 1), None) or None
+
+    def wants(self, page):
+        return page.path == self.index_path or page.path in self.post_paths
+
+    def fix(self, patch, page):
+        if page.path == self.index_path:
+            return fix_index_links(patch, self.title_to_fname)
+        return fix_post_navigation(patch, *neighbours(self.posts, self.post_paths[page.path]))
+
+
+FIXERS = [EnhanceSeoA11y, ConvertHashLinks, RemoveDuplicateH1, FixBlogNavigation]
+
+
+def make_fixers(names=None, **options):
+    """Instances of FIXERS in pipeline order, optionally only those whose name is in names;
+    each gets the options it lists."""
+    return [cls(**{k: v for k, v in options.items() if k in cls.options})
+            for cls in FIXERS if names is None or cls.name in names]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Immutable in-memory snapshot of the files and directories under a site root.
+- Built with one recursive os.scandir pass; afterwards existence, is-dir, directory-index
+  and case-insensitive lookups are set/dict lookups instead of stat syscalls.
+- Lookups are exact-case on every OS, so a link that only resolves on a case-insensitive
+  filesystem (a developer's laptop) fails here like it does on the Linux deploy;
+  case_match() tells the caller what the link probably meant.
+- Paths outside the root fall back to os.path.
+
+Use from a sibling tool:
+    from fs_snapshot import FsSnapshot
+    fs = FsSnapshot.scan(FRONTEND)
+    fs.exists(path)
+
+Or from the command line, to list files whose names differ only by case:
+    python tools/fs_snapshot.py [--root frontend]
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+
+class FsSnapshot:
+    """Sets of absolute file and directory paths under root, as of scan time."""
+    __slots__ = ('root', 'files', 'dirs', 'ordered_files', '_folded')
+
+    def __init__(self, root, files, dirs, ordered_files):
+        self.root = os.path.abspath(root)
+        self.files = frozenset(files)
+        self.dirs = frozenset(dirs)
+        self.ordered_files = tuple(ordered_files)   # os.walk order
+        self._folded = None                          # casefolded path -> (actual paths,)
+
+    @classmethod
+    def scan(cls, root):
+        root = os.path.abspath(root)
+        files = []
+        dirs = []
+        if not os.path.isdir(root):
+            return cls(root, files, dirs, files)
+        dirs.append(root)
+        stack = [root]
+        while stack:
+            top = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(top) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir():
+                    dirs.append(entry.path)
+                    # like os.walk, list symlinked directories but do not descend into them
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                else:
+                    files.append(entry.path)
+            # reversed so subdirectories are visited in scandir order, like os.walk
+            stack.extend(reversed(subdirs))
+        return cls(root, files, dirs, files)
+
+    def _inside(self, path):
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def exists(self, path):
+        if not self._inside(path):
+            return os.path.exists(path)
+        return path in self.files or path in self.dirs
+
+    def isfile(self, path):
+        if not self._inside(path):
+            return os.path.isfile(path)
+        return path in self.files
+
+    def isdir(self, path):
+        if not self._inside(path):
+            return os.path.isdir(path)
+        return path in self.dirs
+
+    def dir_index(self, path, name='index.html'):
+        """path/index.html if path is a directory that has one, else None."""
+        index = os.path.join(path, name)
+        if self.isdir(path) and self.isfile(index):
+            return index
+        return None
+
+    def iter_files(self, suffixes=None):
+        """Files in os.walk order, optionally only those ending in one of suffixes (lowercase)."""
+        for path in self.ordered_files:
+            if suffixes is None or path.lower().endswith(suffixes):
+                yield path
+
+    def _folded_paths(self):
+        if self._folded is None:
+            folded = {}
+            for p in self.files | self.dirs:
+                folded.setdefault(p.casefold(), []).append(p)
+            self._folded = {k: tuple(sorted(v)) for k, v in folded.items()}
+        return self._folded
+
+    def case_match(self, path):
+        """The existing path that matches path case-insensitively but not exactly, or None."""
+        if not self._inside(path) or self.exists(path):
+            return None
+        matches = self._folded_paths().get(path.casefold())
+        return matches[0] if matches else None
+
+    def case_collisions(self):
+        """Groups of paths that differ only by case (they collide on case-insensitive filesystems)."""
+        return sorted(v for v in self._folded_paths().values() if len(v) > 1)
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description='Snapshot a site root and report case collisions.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    args = ap.parse_args(argv)
+    fs = FsSnapshot.scan(args.root)
+    print('Snapshot: {} files, {} directories'.format(len(fs.files), len(fs.dirs)))
+    collisions = fs.case_collisions()
+    print('Paths differing only by case:', len(collisions))
+    for group in collisions:
+        print('  ', ', '.join(os.path.relpath(p, ROOT) for p in group))
+    return 1 if collisions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Build frontend/sitemap.xml from the site's pages, with real lastmod values.
+- Every HTML page from the SiteIndex is listed, except EXCLUDE_PAGES, pages with
+  <meta name="robots" content="noindex"> and URLs robots.txt disallows. A Disallow in any
+  User-agent group counts (ours sit under the last group, but are meant for everyone);
+  within a group the longest matching Allow/Disallow wins, as Google applies them.
+- URLs follow the deploy: index.html is its directory and other pages keep their .html, as
+  backend/server.js and nginx serve them. --clean-urls drops the suffix, for a host that
+  serves extensionless URLs (vercel.json "cleanUrls"); entries match across both forms.
+- lastmod is the time of the last git commit touching the file; for files with uncommitted
+  changes (or with --lastmod hash) it is kept from the current sitemap while the content
+  hash stored in .cache/ is unchanged, and set to now when it changed. A file whose only
+  commit is the repository's first one (the import) gets no lastmod: that date says
+  nothing about when the page changed.
+- Incremental: entries keep their order, changefreq and priority; only entries whose
+  lastmod changed are rewritten, removed pages are dropped, new pages are appended. The
+  file is not touched when nothing changed.
+- Past MAX_URLS entries the sitemap is split into sitemap-1.xml, sitemap-2.xml, ... and
+  sitemap.xml becomes a sitemap index.
+
+Run from repo root:
+    python tools/generate_sitemap.py [--root frontend] [--base-url https://...] [--lastmod git|hash]
+                                    [--clean-urls] [--check]
+"""
+import argparse
+import datetime
+import fnmatch
+import os
+import re
+import subprocess
+import sys
+from urllib.parse import quote, urlparse
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from site_index import SiteIndex
+from tool_cache import cache_path, load_json, save_json
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+SITEMAP = 'sitemap.xml'
+NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+# homepage.html is what vercel.json serves at '/', the URL of index.html; the rest are
+# account and admin utilities with nothing for a search engine to index
+EXCLUDE_PAGES = ('404.html', 'homepage.html', '*-template.html',
+                 'pages/profile/login.html', 'pages/profile/forgot-password.html',
+                 'pages/profile/reset-password.html', 'pages/blog/publish.html', 'pages/blog/posts-list.html')
+
+
+class Robots:
+    """Allow/Disallow rules of a robots.txt, applied to site paths."""
+
+    def __init__(self, text=''):
+        self.groups = []    # [[(allow, prefix)]]
+        self.sitemaps = []
+        rules, in_agents = None, False
+        for line in text.splitlines():
+            line = line.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            field, value = (part.strip() for part in line.split(':', 1))
+            field = field.lower()
+            if field == 'user-agent':
+                if not in_agents:
+                    rules = []
+                    self.groups.append(rules)
+                in_agents = True
+            elif field in ('allow', 'disallow'):
+                in_agents = False
+                if rules is not None and value:
+                    rules.append((field == 'allow', value))
+            elif field == 'sitemap':
+                self.sitemaps.append(value)
+            else:
+                in_agents = False
+
+    @staticmethod
+    def _pattern(value):
+        regex = ''.join('.*' if c == '*' else re.escape(c) for c in value.rstrip('$'))
+        return re.compile(regex + ('$' if value.endswith('$') else ''))
+
+    def disallowed(self, path):
+        """Is path disallowed by any group (longest match per group, Allow wins ties)?"""
+        for rules in self.groups:
+            best = None
+            for allow, value in rules:
+                if self._pattern(value).match(path):
+                    if best is None or len(value) > len(best[1]) or (len(value) == len(best[1]) and allow):
+                        best = (allow, value)
+            if best is not None and not best[0]:
+                return True
+        return False
+
+
+def page_url_path(root, path, clean_urls):
+    rel = os.path.relpath(path, root).replace(os.sep, '/')
+    if rel == 'index.html' or rel.endswith('/index.html'):
+        rel = rel[:-len('index.html')]
+    elif clean_urls and rel.endswith('.html'):
+        rel = rel[:-len('.html')]
+    return '/' + quote(rel)
+
+
+def url_key(url_path):
+    """URL path with .html / index.html dropped, so entries match across clean/plain URLs."""
+    if url_path.endswith('/index.html'):
+        url_path = url_path[:-len('index.html')]
+    elif url_path.endswith('.html'):
+        url_path = url_path[:-len('.html')]
+    return url_path
+
+
+def noindex(page):
+    return any((m.attrs.get('name') or '').lower() == 'robots' and 'noindex' in (m.attrs.get('content') or '').lower()
+               for m in page.find('meta'))
+
+
+def git_times(root):
+    """{absolute path: last commit time (ISO 8601)} for files under root with no uncommitted changes.
+
+    The time is None for files only the root (import) commit touched.
+    """
+    try:
+        top = subprocess.run(['git', 'rev-parse', '--show-toplevel'], cwd=root, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        log = subprocess.run(['git', 'log', '--format=%x00%P %cI', '--name-only', '--', '.'], cwd=root,
+                             capture_output=True, text=True, check=True).stdout
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--no-renames', '-z', '--', '.'], cwd=root,
+                               capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+    times = {}
+    when = None
+    for line in log.splitlines():
+        if line.startswith('\0'):
+            parents, _, when = line[1:].rpartition(' ')
+            when = when if parents else None
+        elif line:
+            times.setdefault(os.path.normpath(os.path.join(top, line)), when)
+    for entry in dirty.split('\0'):
+        if entry:
+            times.pop(os.path.normpath(os.path.join(top, entry[3:])), None)
+    return times
+
+
+def read_sitemap(path):
+    """[{loc, lastmod, changefreq, priority}] from a sitemap or sitemap index (and its local parts)."""
+    try:
+        tree = ElementTree.parse(path)
+    except (OSError, ElementTree.ParseError):
+        return []
+    root = tree.getroot()
+    if root.tag == '{%s}sitemapindex' % NS:
+        entries = []
+        for loc in root.iter('{%s}loc' % NS):
+            part = os.path.join(os.path.dirname(path), os.path.basename(urlparse(loc.text.strip()).path))
+            entries.extend(read_sitemap(part))
+        return entries
+    entries = []
+    for url in root.iter('{%s}url' % NS):
+        entry = {}
+        for field in ('loc', 'lastmod', 'changefreq', 'priority'):
+            el = url.find('{%s}%s' % (NS, field))
+            entry[field] = el.text.strip() if el is not None and el.text else None
+        if entry['loc']:
+            entries.append(entry)
+    return entries
+
+
+def render_urlset(entries):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="{}">'.format(NS)]
+    for entry in entries:
+        lines.append('  <url>')
+        for field in ('loc', 'lastmod', 'changefreq', 'priority'):
+            if entry.get(field):
+                lines.append('    <{0}>{1}</{0}>'.format(field, escape(entry[field])))
+        lines.append('  </url>')
+    lines.append('</urlset>')
+    return '\n'.join(lines) + '\n'
+
+
+def render_index(locs, lastmods):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<sitemapindex xmlns="{}">'.format(NS)]
+    for loc, lastmod in zip(locs, lastmods):
+        lines.append('  <sitemap>')
+        lines.append('    <loc>{}</loc>'.format(escape(loc)))
+        if lastmod:
+            lines.append('    <lastmod>{}</lastmod>'.format(escape(lastmod)))
+        lines.append('  </sitemap>')
+    lines.append('</sitemapindex>')
+    return '\n'.join(lines) + '\n'
+
+
+def split_entries(entries):
+    """Chunks of entries that each fit in one sitemap file."""
+    chunks, chunk, size = [], [], 0
+    for entry in entries:
+        entry_size = len(render_urlset([entry]).encode('utf-8'))
+        if chunk and (len(chunk) >= MAX_URLS or size + entry_size > MAX_BYTES):
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(entry)
+        size += entry_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def sitemap_files(root, base_url, entries):
+    """{file path: text} for the sitemap, split into an index and parts past the limits."""
+    chunks = split_entries(entries)
+    if len(chunks) <= 1:
+        return {os.path.join(root, SITEMAP): render_urlset(entries)}
+    files = {}
+    locs, lastmods = [], []
+    stem = os.path.splitext(SITEMAP)[0]
+    for i, chunk in enumerate(chunks, 1):
+        name = '{}-{}.xml'.format(stem, i)
+        files[os.path.join(root, name)] = render_urlset(chunk)
+        locs.append('{}/{}'.format(base_url, name))
+        lastmods.append(max((e['lastmod'] or '' for e in chunk), default='') or None)
+    files[os.path.join(root, SITEMAP)] = render_index(locs, lastmods)
+    return files
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Generate sitemap.xml from the site pages.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('--base-url', help='site origin (default: from the Sitemap: line in robots.txt)')
+    ap.add_argument('--lastmod', choices=('git', 'hash'), default='git',
+                    help='git commit time, falling back to the content hash (default), or content hash only')
+    ap.add_argument('--clean-urls', action='store_true',
+                    help='list pages without the .html suffix (only where the host serves them that way)')
+    ap.add_argument('--check', action='store_true', help='do not write; exit 1 if the sitemap is out of date')
+    args = ap.parse_args(argv)
+    root = os.path.abspath(args.root)
+
+    robots_path = os.path.join(root, 'robots.txt')
+    robots = Robots()
+    if os.path.isfile(robots_path):
+        with open(robots_path, encoding='utf-8') as fh:
+            robots = Robots(fh.read())
+    base_url = args.base_url
+    if not base_url:
+        for value in robots.sitemaps:
+            parsed = urlparse(value)
+            base_url = '{}://{}'.format(parsed.scheme, parsed.netloc)
+            break
+    if not base_url:
+        ap.error('no Sitemap: line in robots.txt; pass --base-url')
+    base_url = base_url.rstrip('/')
+
+    index = SiteIndex(root).build()
+    pages = {}   # url key -> (url path, page)
+    skipped = {'excluded': 0, 'robots.txt': 0, 'noindex': 0}
+    for page in index:
+        rel = os.path.relpath(page.path, root).replace(os.sep, '/')
+        url_path = page_url_path(root, page.path, args.clean_urls)
+        if any(fnmatch.fnmatch(rel, pattern) for pattern in EXCLUDE_PAGES):
+            skipped['excluded'] += 1
+        elif robots.disallowed(url_path):
+            skipped['robots.txt'] += 1
+        elif noindex(page):
+            skipped['noindex'] += 1
+        else:
+            pages.setdefault(url_key(url_path), (url_path, page))
+
+    hashes = load_json(cache_path('sitemap', root), {})
+    times = git_times(root) if args.lastmod == 'git' else {}
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0).isoformat()
+
+    sitemap_path = os.path.join(root, SITEMAP)
+    existing = read_sitemap(sitemap_path)
+    entries, changed, new_hashes = [], 0, {}
+    seen = set()
+
+    def lastmod_for(url_path, page, previous):
+        new_hashes[url_path] = page.digest
+        if page.path in times:
+            return times[page.path]
+        if previous and hashes.get(url_path) == page.digest:
+            return previous
+        return now
+
+    for entry in existing:
+        key = url_key(urlparse(entry['loc']).path or '/')
+        if key not in pages or key in seen:
+            changed += 1     # removed
+            continue
+        seen.add(key)
+        url_path, page = pages[key]
+        updated = dict(entry, loc=base_url + url_path)
+        updated['lastmod'] = lastmod_for(url_path, page, entry['lastmod'])
+        if updated != entry:
+            changed += 1
+        entries.append(updated)
+    added = 0
+    for key, (url_path, page) in pages.items():
+        if key not in seen:
+            entries.append({'loc': base_url + url_path, 'lastmod': lastmod_for(url_path, page, None)})
+            added += 1
+
+    files = sitemap_files(root, base_url, entries)
+    stale = []
+    for path, text in files.items():
+        try:
+            with open(path, encoding='utf-8') as fh:
+                if fh.read() == text:
+                    continue
+        except OSError:
+            pass
+        stale.append(path)
+
+    print('{} URLs ({} new, {} updated or removed); left out: {}'.format(
+        len(entries), added, changed, ', '.join('{} {}'.format(n, why) for why, n in skipped.items() if n) or 'none'))
+    if args.check:
+        if stale:
+            print('Out of date:', ', '.join(os.path.relpath(p, ROOT) for p in stale))
+            return 1
+        print('{} is up to date'.format(os.path.relpath(sitemap_path, ROOT)))
+        return 0
+    for path in stale:
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(files[path])
+        print('Wrote', os.path.relpath(path, ROOT))
+    if not stale:
+        print('{} is up to date'.format(os.path.relpath(sitemap_path, ROOT)))
+    save_json(cache_path('sitemap', root), new_hashes)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Pluggable HTML parser backends for the tools/ scripts.
+- Every backend drives the same small handler interface, so SiteIndex (link checkers,
+  fixer prefilters) and the audit engine do not care which parser produced the events:
+      handler.start(tag, attrs, offset)   attrs: dict
+      handler.end(tag)
+      handler.data(text, offset)
+- stdlib: html.parser, always available; offsets are exact character offsets into the text.
+  Attribute values are unescaped with the HTML5 attribute rule (html.parser alone turns
+  the &curren in "?a=1&currency=USD" into a currency sign; browsers do not).
+- lxml / selectolax: used when installed (pip install lxml / selectolax); much faster.
+  lxml offsets are the start of the element's source line, selectolax reports none (None).
+  Valueless attributes (<script defer>) are None with stdlib and selectolax, and '' or
+  the attribute name with lxml.
+  Tree backends report an end for every element, including void ones, and add the
+  implied <html>/<head>/<body> when a page leaves them out.
+- get_backend() picks the fastest installed backend, or the one named by the argument or
+  the SITE_HTML_BACKEND environment variable; html5=True restricts the choice to backends
+  that follow the HTML5 parsing rules. lxml is libxml2's HTML4 parser: it knows nothing of
+  <header>, <nav> etc. and recovers from a stray end tag differently from browsers, so the
+  nesting (and every rule that looks at it) can differ. audit_engine and prune_css ask for
+  html5=True; a named lxml falls back to the stdlib there.
+
+parser_conformance.py checks that every backend extracts the same links, ids and
+attributes from our pages, gives the same audit findings and CSS usage where it is
+offered for them, and benchmarks them.
+"""
+import html
+import os
+import re
+import sys
+from html.entities import html5
+from html.parser import HTMLParser, attrfind_tolerant, tagfind_tolerant
+
+try:
+    import lxml.etree
+except ImportError:  # optional: pip install lxml
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # optional: pip install selectolax
+    LexborHTMLParser = None
+
+ENV_VAR = 'SITE_HTML_BACKEND'
+PREFERENCE = ('selectolax', 'lxml', 'stdlib')
+
+
+# Same shape as the character reference pattern in the html module
+CHARREF_RE = re.compile(r'&(#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[^\t\n\f <&#;]{1,32};?)')
+
+
+def _replace_attr_charref(m):
+    s = m.group(1)
+    if s[0] == '#' or s in html5:
+        return html.unescape(m.group(0))
+    # legacy reference without ';' (&curren in ?a=1&currency=USD): in attribute values it is
+    # left alone when followed by a letter, digit or '='
+    for x in range(len(s) - 1, 1, -1):
+        if s[:x] in html5:
+            if s[x].isalnum() or s[x] == '=':
+                return m.group(0)
+            return html5[s[:x]] + s[x:]
+    return m.group(0)
+
+
+def unescape_attr(value):
+    """html.unescape with the HTML5 rule for attribute values (what browsers and lxml do)."""
+    return CHARREF_RE.sub(_replace_attr_charref, value) if '&' in value else value
+
+
+def line_starts(text):
+    """Offsets of the first character of every line in text."""
+    starts = [0]
+    find = text.find
+    i = find('\n')
+    while i != -1:
+        starts.append(i + 1)
+        i = find('\n', i + 1)
+    return starts
+
+
+class _StdlibDriver(HTMLParser):
+
+    def __init__(self, handler, text):
+        super().__init__(convert_charrefs=True)
+        self.handler = handler
+        self._line_starts = line_starts(text)
+
+    def _offset(self):
+        line, col = self.getpos()
+        return self._line_starts[line - 1] + col
+
+    def _attrs(self, attrs):
+        raw = self.get_starttag_text()
+        if raw is None or '&' not in raw:
+            return dict(attrs)
+        # html.parser unescapes attribute values like text; redo them from the raw tag
+        # (same scan as HTMLParser.parse_starttag) with the attribute-value rule
+        values = {}
+        k = tagfind_tolerant.match(raw, 1).end()
+        while k < len(raw):
+            m = attrfind_tolerant.match(raw, k)
+            if not m:
+                break
+            name, rest, value = m.group(1, 2, 3)
+            if not rest:
+                value = None
+            elif value[:1] == '\'' == value[-1:] or value[:1] == '"' == value[-1:]:
+                value = value[1:-1]
+            if value:
+                value = unescape_attr(value)
+            values[name.lower()] = value
+            k = m.end()
+        return values
+
+    def handle_starttag(self, tag, attrs):
+        self.handler.start(tag, self._attrs(attrs), self._offset())
+
+    def handle_startendtag(self, tag, attrs):
+        self.handler.start(tag, self._attrs(attrs), self._offset())
+        self.handler.end(tag)
+
+    def handle_endtag(self, tag):
+        self.handler.end(tag)
+
+    def handle_data(self, data):
+        self.handler.data(data, self._offset())
+
+
+class StdlibBackend:
+    name = 'stdlib'
+    html5 = True
+
+    def parse(self, text, handler):
+        driver = _StdlibDriver(handler, text)
+        driver.feed(text)
+        driver.close()
+
+
+class LxmlBackend:
+    name = 'lxml'
+    html5 = False
+
+    def __init__(self):
+        self._parser = lxml.etree.HTMLParser(encoding='utf-8', remove_comments=False, remove_pis=False)
+
+    def parse(self, text, handler):
+        if not text.strip():
+            return
+        root = lxml.etree.fromstring(text.encode('utf-8'), self._parser)
+        if root is None:
+            return
+        starts = line_starts(text)
+        start, end, data = handler.start, handler.end, handler.data
+        # (element, closing) pairs; tails are emitted after the element they follow
+        stack = [(root, False)]
+        while stack:
+            el, closing = stack.pop()
+            offset = starts[min(el.sourceline or 1, len(starts)) - 1]
+            if closing:
+                end(el.tag)
+            elif isinstance(el.tag, str):
+                start(el.tag, dict(el.attrib), offset)
+                if el.text:
+                    data(el.text, offset)
+                stack.append((el, True))
+                stack.extend((child, False) for child in reversed(el))
+                continue
+            if el.tail and el is not root:
+                data(el.tail, offset)
+
+
+class SelectolaxBackend:
+    name = 'selectolax'
+    html5 = True
+
+    def parse(self, text, handler):
+        if not text.strip():
+            return
+        root = LexborHTMLParser(text).root
+        start, end, data = handler.start, handler.end, handler.data
+        stack = [(root, False)]
+        while stack:
+            node, closing = stack.pop()
+            if closing:
+                end(node.tag)
+                continue
+            tag = node.tag
+            if tag == '-text':
+                data(node.text_content, None)
+            elif not tag.startswith('-'):
+                start(tag, dict(node.attributes), None)
+                stack.append((node, True))
+                children = []
+                child = node.child
+                while child is not None:
+                    children.append(child)
+                    child = child.next
+                stack.extend((c, False) for c in reversed(children))
+
+
+BACKENDS = {'stdlib': StdlibBackend, 'lxml': LxmlBackend, 'selectolax': SelectolaxBackend}
+
+
+def is_available(name):
+    if name == 'lxml':
+        return lxml is not None
+    if name == 'selectolax':
+        return LexborHTMLParser is not None
+    return name == 'stdlib'
+
+
+def html5_backends():
+    return [name for name in BACKENDS if BACKENDS[name].html5]
+
+
+def available_backends():
+    return [name for name in PREFERENCE if is_available(name)]
+
+
+_instances = {}
+
+
+def get_backend(name=None, html5=False):
+    """Backend instance by name ('auto' or None: fastest installed; env SITE_HTML_BACKEND overrides).
+
+    A named backend that is not installed, or is not an HTML5 parser when html5=True,
+    falls back to the stdlib with a warning.
+    """
+    if not isinstance(name, (str, type(None))):
+        return name
+    name = name or os.environ.get(ENV_VAR) or 'auto'
+    if name == 'auto':
+        name = next(n for n in available_backends() if not html5 or BACKENDS[n].html5)
+    elif name not in BACKENDS:
+        raise ValueError('unknown HTML backend {!r} (choose from auto, {})'.format(name, ', '.join(BACKENDS)))
+    elif not is_available(name) or (html5 and not BACKENDS[name].html5):
+        print('HTML backend {} is not usable here; using stdlib'.format(name), file=sys.stderr)
+        name = 'stdlib'
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Minimal source edits for the BeautifulSoup fixers, instead of writing back str(soup).
+- A Patch parses the page with BeautifulSoup as before, so find(), select() and get_text()
+  work unchanged, and also records where every element sits in the source: its start tag,
+  its end tag (empty where the end is implied) and, when an attribute is edited, the name
+  and value spans inside the start tag. Elements are matched to the soup by the source
+  position BeautifulSoup records for each tag.
+- The fixers edit through the Patch, which changes the soup and records a text edit:
+  set_attr, remove (optionally with the whitespace after it) and replace_with (the whole
+  element), replace_tags (start and end tag only, the
+  content stays as written), insert_before / insert_after / prepend / append, and wrap.
+  New nodes are written the way str(soup) writes them; everything else keeps its bytes,
+  whitespace, quotes and attribute order.
+- text() applies the edits to the original text. verify() re-parses that text and compares
+  it with the edited soup, and checks that the text outside the edited spans is unchanged.
+- Edits inside an element that was already removed or replaced are dropped with it; other
+  edits that overlap (an insertion inside an element that is replaced) raise PatchError.
+
+Use from a fixer:
+    patch = Patch(text)
+    for a in patch.soup.find_all('a', target='_blank'):
+        patch.set_attr(a, 'rel', 'noopener noreferrer')
+    if patch.changed:
+        write(patch.text())
+
+Self-check: applies a mix of edits to every page under the root and verifies them.
+Run from repo root: python tools/html_patch.py [--root frontend]
+"""
+import argparse
+import os
+import sys
+from html.parser import HTMLParser, attrfind_tolerant, tagfind_tolerant
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.builder import HTMLParserTreeBuilder
+
+from fs_snapshot import FsSnapshot
+from html_backend import line_starts
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+VOID_TAGS = frozenset(HTMLParserTreeBuilder().empty_element_tags)
+
+
+class PatchError(Exception):
+    pass
+
+
+class ElementSpan:
+    """Source offsets of one element: [start, start_end) is the start tag, [end_start, end) the end tag."""
+    __slots__ = ('name', 'start', 'start_end', 'end_start', 'end')
+
+    def __init__(self, name, start, start_end):
+        self.name = name
+        self.start = start
+        self.start_end = start_end
+        self.end_start = self.end = None
+
+
+class _SpanParser(HTMLParser):
+    """Element spans, nested the way BeautifulSoup's html.parser builder nests the elements."""
+
+    def __init__(self, text):
+        super().__init__(convert_charrefs=True)
+        self.text = text
+        self.spans = {}   # start offset -> ElementSpan
+        self._line_starts = line_starts(text)
+        self._open = []
+        self._closed_void = []
+
+    def _offset(self):
+        line, col = self.getpos()
+        return self._line_starts[line - 1] + col
+
+    def _element(self, tag):
+        start = self._offset()
+        span = ElementSpan(tag, start, start + len(self.get_starttag_text()))
+        self.spans[start] = span
+        return span
+
+    def handle_starttag(self, tag, attrs):
+        span = self._element(tag)
+        if tag in VOID_TAGS:
+            span.end_start = span.end = span.start_end
+            # a later </img> is dropped, like BeautifulSoup does
+            self._closed_void.append(tag)
+        else:
+            self._open.append(span)
+
+    def handle_startendtag(self, tag, attrs):
+        span = self._element(tag)
+        span.end_start = span.end = span.start_end
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+            return
+        if not any(span.name == tag for span in self._open):
+            return
+        at = self._offset()
+        close = self.text.find('>', at)
+        end = close + 1 if close != -1 else len(self.text)
+        while self._open:
+            span = self._open.pop()
+            if span.name == tag:
+                span.end_start, span.end = at, end
+                break
+            # closed by an ancestor's end tag: the element ends where that tag starts
+            span.end_start = span.end = at
+
+    def close(self):
+        super().close()
+        for span in self._open:
+            span.end_start = span.end = len(self.text)
+        self._open = []
+
+
+def source_spans(text):
+    """{start offset: ElementSpan} for every element in text."""
+    parser = _SpanParser(text)
+    parser.feed(text)
+    parser.close()
+    return parser.spans
+
+
+def attr_spans(text, span):
+    """{name: (start, value start, value end, quote)} for the attributes of span's start tag.
+
+    The whole attribute is [start, value end + len(quote)); valueless attributes have value
+    start == value end == the end of the name and quote None, unquoted values quote ''. A
+    repeated attribute maps to its last occurrence, the one BeautifulSoup keeps.
+    """
+    raw = text[span.start:span.start_end]
+    out = {}
+    k = tagfind_tolerant.match(raw, 1).end()
+    while k < len(raw):
+        m = attrfind_tolerant.match(raw, k)
+        if not m:
+            break
+        name = m.group(1).lower()
+        start = span.start + m.start(1)
+        if not m.group(2):
+            out[name] = (start, span.start + m.end(1), span.start + m.end(1), None)
+        else:
+            value = m.group(3)
+            quote = value[:1] if value[:1] in ('"', '\'') and value[-1:] == value[:1] and len(value) > 1 else ''
+            value_start = span.start + m.start(3) + len(quote)
+            out[name] = (start, value_start, span.start + m.end(3) - len(quote), quote)
+        k = m.end()
+    return out
+
+
+def attr_text(value, quote='"'):
+    """An attribute value as it sits between quote characters (list values joined like bs4 does)."""
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(value)
+    value = value.replace('&', '&amp;')
+    return value.replace(quote, '&quot;' if quote == '"' else '&#39;')
+
+
+def start_tag(tag):
+    """The start tag of a bs4 Tag, without its contents."""
+    attrs = ''.join(' {}="{}"'.format(name, attr_text(value)) for name, value in tag.attrs.items())
+    return '<{}{}>'.format(tag.name, attrs)
+
+
+def outline(soup):
+    """[(depth, element or text)] for comparing trees: attributes sorted, text with blank runs
+    collapsed, side-by-side strings joined and blank ones left out, since where text nodes split
+    depends on edits and stray end tags, not on the page."""
+    out = []
+    text = None
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            if text is not None and text[1].strip():
+                out.append(text)
+            text = None
+            attrs = sorted((k, ' '.join(v) if isinstance(v, list) else v) for k, v in node.attrs.items())
+            out.append((len(list(node.parents)), node.name, attrs))
+        else:
+            depth = len(list(node.parents))
+            chunk = ' '.join(str(node).split())
+            if isinstance(node, NavigableString) and type(node) is not NavigableString:
+                chunk = '{}:{}'.format(type(node).__name__, chunk)
+            if text is not None and text[0] == depth:
+                text = (depth, (text[1] + ' ' + chunk).strip())
+            else:
+                if text is not None and text[1].strip():
+                    out.append(text)
+                text = (depth, chunk)
+    if text is not None and text[1].strip():
+        out.append(text)
+    return out
+
+
+class Patch:
+    def __init__(self, text):
+        self.original = text
+        self.soup = BeautifulSoup(text, 'html.parser')
+        self._spans = source_spans(text)
+        self._line_starts = line_starts(text)
+        self._edits = []        # (start, end, seq, render) with render() -> replacement text
+        self._attrs = {}        # id(tag) -> (tag, span, {edited attribute names})
+        self._removed = {}      # id -> source element replaced as a whole or renamed (kept alive)
+        self._new = set()       # ids of nodes inserted by an edit (written out in full)
+        self._seq = 0
+
+    @property
+    def changed(self):
+        return bool(self._edits or self._attrs)
+
+    # -- locating elements
+
+    def span(self, tag):
+        """The ElementSpan of a tag parsed from the source, or None for a node added by an edit."""
+        if tag.sourceline is None or self._inside_new(tag):
+            return None
+        span = self._spans.get(self._line_starts[tag.sourceline - 1] + tag.sourcepos)
+        if span is None or span.name != tag.name:
+            raise PatchError('no source span for <{}> at line {}'.format(tag.name, tag.sourceline))
+        return span
+
+    def _source_span(self, tag, action):
+        if self._inside_removed(tag):
+            return None   # an ancestor is already out of the page, and this edit with it
+        span = self.span(tag)
+        if span is None and not self._inside_new(tag):
+            raise PatchError('cannot {} <{}>: not from the source and not inside a new node'.format(action, tag.name))
+        return span
+
+    def _inside_removed(self, node):
+        return any(id(t) in self._removed for t in node.parents)
+
+    def _inside_new(self, node):
+        return any(id(t) in self._new for t in (node,) + tuple(node.parents))
+
+    def _attached(self, tag):
+        top = tag
+        for top in tag.parents:
+            pass
+        return top is self.soup
+
+    def _edit(self, start, end, render):
+        self._seq += 1
+        self._edits.append((start, end, self._seq, render))
+
+    def _replace(self, span, old, render):
+        # earlier edits inside old are moot: the replacement is written out as it is now
+        self._edits = [e for e in self._edits if not (
+            span.start <= e[0] and e[1] <= span.end and not (e[0] == e[1] and e[0] in (span.start, span.end)))]
+        self._removed[id(old)] = old
+        self._edit(span.start, span.end, render)
+
+    def _insert(self, pos, node):
+        if isinstance(node, Tag):
+            self._new.add(id(node))
+        self._edit(pos, pos, lambda: str(node))
+
+    # -- edits
+
+    def set_attr(self, tag, name, value):
+        """tag[name] = value; value None removes the attribute."""
+        if tag.get(name) == value:
+            return
+        if value is None:
+            tag.attrs.pop(name, None)
+        else:
+            tag[name] = value
+        span = self._source_span(tag, 'set an attribute on')
+        if span is not None:
+            self._attrs.setdefault(id(tag), (tag, span, set()))[2].add(name)
+
+    def replace_with(self, old, new):
+        """Replace old and its contents with new (a Tag or a string of markup)."""
+        span = self._source_span(old, 'replace')
+        if isinstance(new, str):
+            markup = new
+            nodes = list(BeautifulSoup(markup, 'html.parser').contents)
+            self._new.update(id(node) for node in nodes)
+            old.replace_with(*nodes)
+            render = lambda: markup
+        else:
+            old.replace_with(new)
+            self._new.add(id(new))
+            render = lambda: str(new)
+        if span is not None:
+            self._replace(span, old, render)
+
+    def remove(self, tag, trailing_space=False):
+        """Take tag and its contents out of the page; with trailing_space also the whitespace
+        right after it (the start of the text that follows)."""
+        span = self._source_span(tag, 'remove')
+        after = tag.next_sibling
+        tag.extract()
+        if span is None:
+            return
+        self._replace(span, tag, lambda: '')
+        if trailing_space and type(after) is NavigableString:
+            # measured in the source: the soup keeps a blank text node as a single newline
+            end = span.end
+            while end < len(self.original) and self.original[end].isspace():
+                end += 1
+            if end > span.end:
+                rest = after.lstrip()
+                if rest:
+                    after.replace_with(rest)
+                else:
+                    after.extract()
+                self._edit(span.end, end, lambda: '')
+
+    def replace_tags(self, old, new):
+        """Replace old by the empty Tag new, moving old's contents into it: only the start
+        and end tags change in the source."""
+        span = self._source_span(old, 'rename')
+        for child in list(old.contents):
+            new.append(child)
+        old.replace_with(new)
+        if span is None:
+            return
+        self._removed[id(old)] = old
+        self._edit(span.start, span.start_end, lambda: start_tag(new))
+        self._edit(span.end_start, span.end, lambda: '</{}>'.format(new.name))
+
+    def insert_before(self, tag, node):
+        span = self._source_span(tag, 'insert before')
+        tag.insert_before(node)
+        if span is not None:
+            self._insert(span.start, node)
+
+    def insert_after(self, tag, node):
+        span = self._source_span(tag, 'insert after')
+        tag.insert_after(node)
+        if span is not None:
+            self._insert(span.end, node)
+
+    def prepend(self, parent, node):
+        span = self._source_span(parent, 'insert into')
+        parent.insert(0, node)
+        if span is not None:
+            self._insert(span.start_end, node)
+
+    def append(self, parent, node):
+        span = self._source_span(parent, 'insert into')
+        parent.append(node)
+        if span is not None:
+            self._insert(span.end_start, node)
+
+    def wrap(self, tag, wrapper):
+        """Wrap tag in the empty Tag wrapper; returns wrapper."""
+        span = self._source_span(tag, 'wrap')
+        tag.wrap(wrapper)
+        if span is not None:
+            self._edit(span.start, span.start, lambda: start_tag(wrapper))
+            self._edit(span.end, span.end, lambda: '</{}>'.format(wrapper.name))
+        return wrapper
+
+    # -- output
+
+    def _attr_edits(self):
+        edits = []
+        for tag, span, names in self._attrs.values():
+            if id(tag) in self._removed or not self._attached(tag):
+                continue
+            spans = attr_spans(self.original, span)
+            for name in sorted(names):
+                value = tag.get(name)
+                if name in spans:
+                    start, value_start, value_end, quote = spans[name]
+                    if value is None:
+                        while start > span.start and self.original[start - 1].isspace():
+                            start -= 1
+                        edits.append((start, value_end + len(quote or ''), lambda: ''))
+                    elif quote:
+                        edits.append((value_start, value_end, lambda v=value, q=quote: attr_text(v, q)))
+                    else:
+                        edits.append((start, value_end, lambda n=name, v=value: '{}="{}"'.format(n, attr_text(v))))
+                elif value is not None:
+                    # new attribute: after the last one, before any '/>' or '>'
+                    close = span.start_end - 1
+                    if self.original[close - 1:close] == '/':
+                        close -= 1
+                    while self.original[close - 1].isspace():
+                        close -= 1
+                    edits.append((close, close, lambda n=name, v=value: ' {}="{}"'.format(n, attr_text(v))))
+        return edits
+
+    def edits(self):
+        """[(start, end, replacement)] in source order; PatchError if two edits overlap."""
+        seq = self._seq + 1
+        pending = list(self._edits)
+        for start, end, render in self._attr_edits():
+            pending.append((start, end, seq, render))
+            seq += 1
+        pending.sort(key=lambda e: (e[0], e[1] > e[0], e[2]))
+        out = []
+        last = 0
+        for start, end, _, render in pending:
+            if start < last:
+                raise PatchError('overlapping edits at offset {}'.format(start))
+            out.append((start, end, render()))
+            last = end
+        return out
+
+    def text(self):
+        """The original text with the edits applied."""
+        out, pos = [], 0
+        for start, end, replacement in self.edits():
+            out.append(self.original[pos:start])
+            out.append(replacement)
+            pos = end
+        out.append(self.original[pos:])
+        return ''.join(out)
+
+    def verify(self, text=None):
+        """[problems]: text (default: text()) must parse like the edited soup and keep the
+        original bytes outside the edited spans."""
+        problems = []
+        edits = self.edits()
+        text = self.text() if text is None else text
+        pos = shift = 0
+        for start, end, replacement in edits:
+            if text[pos + shift:start + shift] != self.original[pos:start]:
+                problems.append('source changed between offsets {} and {}'.format(pos, start))
+            shift += len(replacement) - (end - start)
+            pos = end
+        if text[pos + shift:] != self.original[pos:]:
+            problems.append('source changed after offset {}'.format(pos))
+        if outline(BeautifulSoup(text, 'html.parser')) != outline(self.soup):
+            problems.append('patched text does not parse like the edited tree')
+        return problems
+
+
+def self_check(text):
+    """Edit text the ways the fixers do and return Patch.verify()'s problems."""
+    patch = Patch(text)
+    soup = patch.soup
+    tags = soup.find_all(True)
+    for i, tag in enumerate(tags):
+        if i % 3 == 0:
+            patch.set_attr(tag, 'data-patch', 'a&b "{}"'.format(i))
+        elif i % 5 == 1 and tag.attrs:
+            patch.set_attr(tag, next(iter(tag.attrs)), 'changed')
+        elif i % 7 == 2 and len(tag.attrs) > 1:
+            patch.set_attr(tag, list(tag.attrs)[-1], None)
+    head, body = soup.find('head'), soup.find('body')
+    if head is not None:
+        patch.append(head, soup.new_tag('meta', attrs={'name': 'x-patch', 'content': '1'}))
+    if body is not None:
+        h1 = soup.new_tag('h1')
+        h1.string = 'Patched <title>'
+        patch.prepend(body, h1)
+    for img in soup.find_all('img')[:2]:
+        picture = patch.wrap(img, soup.new_tag('picture'))
+        patch.insert_before(img, soup.new_tag('source', attrs={'type': 'image/webp', 'srcset': 'x.webp'}))
+        picture['class'] = 'patched'
+    for a in soup.find_all('a')[:3]:
+        button = soup.new_tag('button', attrs={'type': 'button'})
+        patch.replace_tags(a, button)
+    for li in soup.find_all('li')[-2:]:
+        patch.remove(li)
+    p = soup.find('p')
+    if p is not None:
+        patch.replace_with(p, '<p class="patched">replaced</p>')
+    return patch.verify()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Check that source patches keep every page byte-identical outside the edits.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    args = ap.parse_args(argv)
+    root = os.path.abspath(args.root)
+
+    failed = checked = 0
+    for path in FsSnapshot.scan(root).iter_files(('.html',)):
+        with open(path, 'r', encoding='utf-8') as fh:
+            text = fh.read()
+        try:
+            problems = self_check(text)
+        except PatchError as e:
+            problems = [str(e)]
+        checked += 1
+        if problems:
+            failed += 1
+            print(os.path.relpath(path, ROOT))
+            for problem in problems:
+                print('   ', problem)
+    print('Checked {} pages, {} with problems'.format(checked, failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Find files under a site root that nothing references, and backup files left behind by the fixers.
+- HTML and CSS references come from the SiteIndex (href/src/srcset, <link>s, url(), @import).
+- JS (files and inline <script> blocks), sw.js, site-manifest.json, blog-posts.json,
+  sitemap.xml and other .json/.xml files are scanned for quoted strings and element text
+  that look like paths. JS is tokenized (comments, regex literals and the ${...} parts of
+  template literals are skipped), so a quote or backtick in one of those does not swallow
+  the strings after it. The paths are relative to whatever page loads them, so they count
+  as a reference to every file whose path ends with them ('../../assets/images/a.png' keeps
+  assets/images/a.png).
+- A file whose name appears anywhere in the JS, CSS or HTML source is kept too, however the
+  path around it is built (a name itself built from parts, 'quote-' + n + '.png', is not
+  seen). This errs on the side of keeping.
+- *.bak / *.orig / *~ files (remove_duplicate_h1.py, strip_git_markers.py, the restore
+  scripts) and Office ~$ lock files are always listed, and never count as referencing anything.
+- Entry points (index.html, 404.html, robots.txt, sitemap.xml, sw.js, ...) and paths already
+  in .vercelignore are never reported.
+- --exclude-file writes the backups and unreferenced files, one '/path' per line, in the
+  .vercelignore / rsync --exclude-from format, so they stay out of the upload and the
+  service-worker precache.
+
+Run from repo root:
+    python tools/orphaned_assets.py [--root frontend] [--keep 'assets/documents/*'] [--exclude-file deploy-exclude.txt]
+"""
+import argparse
+import fnmatch
+import os
+import re
+import sys
+from urllib.parse import unquote, urlparse
+
+from site_index import SiteIndex, is_local_link
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+ENTRY_POINTS = frozenset(('index.html', '404.html', 'robots.txt', 'sitemap.xml', 'sw.js', 'site-manifest.json',
+                          'favicon.ico', 'vercel.json', '.vercelignore', '_redirects', '_headers', '.htaccess'))
+BACKUP_SUFFIXES = ('.bak', '.orig', '.rej', '~')
+JS_SOURCES = ('.js', '.mjs')
+TEXT_SOURCES = JS_SOURCES + ('.json', '.webmanifest', '.xml')
+NAME_SOURCES = JS_SOURCES + ('.css', '.html')
+
+INLINE_SCRIPT_RE = re.compile(r'<script\b[^>]*>(.*?)</script>', re.S | re.I)
+STRING_RE = re.compile(r'''"((?:\\.|[^"\\\n])*)"|'((?:\\.|[^'\\\n])*)'|>([^<>]+)<''')
+# the JS tokens that matter for finding strings; everything between them is skipped
+JS_TOKEN_RE = re.compile(r'''//[^\n]*|/\*.*?(?:\*/|$)|"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?|[`/]''', re.S)
+# the same inside a ${...} of a template literal, where the '}' closing it matters too
+JS_EXPR_TOKEN_RE = re.compile(JS_TOKEN_RE.pattern + '|[{}]', re.S)
+TEMPLATE_CHUNK_RE = re.compile(r'(?:\\.|[^`\\$]|\$(?!\{))*', re.S)
+REGEX_RE = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*')
+# a '/' after these words starts a regex literal; after a value it divides
+REGEX_KEYWORDS = frozenset(('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void',
+                            'throw', 'yield', 'await', 'instanceof'))
+VALUE_END = frozenset(')]}"\'`')
+
+
+def is_backup(path):
+    return path.endswith(BACKUP_SUFFIXES) or os.path.basename(path).startswith('~$')
+
+
+def divides(text, pos):
+    """Is the '/' at pos a division (it follows a value) rather than the start of a regex literal?"""
+    while pos and text[pos - 1].isspace():
+        pos -= 1
+    if not pos:
+        return False
+    before = text[pos - 1]
+    if before.isalnum() or before in '_$':
+        start = pos - 1
+        while start and (text[start - 1].isalnum() or text[start - 1] in '_$'):
+            start -= 1
+        return text[start:pos] not in REGEX_KEYWORDS
+    return before in VALUE_END
+
+
+def js_strings(text):
+    """Contents of the string literals and static template-literal parts of JS source."""
+    braces = []   # per open ${...}: '{' depth inside it
+    pos, n = 0, len(text)
+    while pos < n:
+        m = (JS_EXPR_TOKEN_RE if braces else JS_TOKEN_RE).search(text, pos)
+        if m is None:
+            break
+        token, pos = m.group(), m.end()
+        c = token[0]
+        if c in '"\'':
+            yield token[1:-1] if len(token) > 1 and token[-1] == c else token[1:]
+        elif c == '`' or (c == '}' and braces[-1] == 0):
+            if c == '}':
+                braces.pop()
+            chunk = TEMPLATE_CHUNK_RE.match(text, pos)
+            yield chunk.group()
+            pos = chunk.end()
+            if text.startswith('${', pos):
+                braces.append(0)
+                pos += 2
+            else:
+                pos += 1   # closing backtick
+        elif c == '{':
+            braces[-1] += 1
+        elif c == '}':
+            braces[-1] -= 1
+        elif token == '/' and not divides(text, m.start()):
+            regex = REGEX_RE.match(text, m.start())
+            if regex:
+                pos = regex.end()
+
+
+def path_strings(text, js=False):
+    """Strings in JS/JSON/XML text that could name a file ('a/b.png', '/x.html?v=1', 'https://host/p')."""
+    values = js_strings(text) if js else (next(g for g in m.groups() if g is not None)
+                                          for m in STRING_RE.finditer(text))
+    for value in values:
+        value = value.strip()
+        if not value or '\n' in value or '${' in value or len(value) > 300:
+            continue
+        if '.' not in value and '/' not in value:
+            continue
+        yield value
+
+
+def string_tail(value):
+    """'../../assets/a.png?v=2' -> 'assets/a.png'; '' if value cannot name a local file."""
+    parsed = urlparse(value)
+    if parsed.scheme not in ('', 'http', 'https'):
+        return ''
+    path = unquote(parsed.path).replace('\\', '/')
+    while path.startswith(('./', '../', '/')):
+        path = path[path.index('/') + 1:]
+    return path.rstrip('/')
+
+
+def ignore_patterns(root):
+    """Entries of root/.vercelignore (gitignore syntax, only plain names and paths are honoured)."""
+    try:
+        with open(os.path.join(root, '.vercelignore'), 'r', encoding='utf-8') as fh:
+            lines = fh.read().splitlines()
+    except OSError:
+        return []
+    return [ln.strip().strip('/') for ln in lines if ln.strip() and not ln.startswith('#')]
+
+
+def is_ignored(rel, patterns):
+    parts = rel.split('/')
+    for pat in patterns:
+        if '/' in pat:
+            if rel == pat or rel.startswith(pat + '/') or fnmatch.fnmatch(rel, pat):
+                return True
+        elif any(fnmatch.fnmatch(part, pat) for part in parts):
+            return True
+    return False
+
+
+def referenced_files(index):
+    """Set of absolute paths referenced from pages, stylesheets and JS/JSON/XML sources."""
+    fs = index.fs
+    referenced = set()
+    for doc in index.documents():
+        for ref in doc.refs:
+            value = ref.value.strip()
+            if value and is_local_link(value, skip_javascript=True):
+                target = index.resolve(doc, value)
+                referenced.add(fs.dir_index(target) or target)
+
+    # Path suffix -> files, so each string from a text source is one dict lookup
+    by_tail = {}
+    for path in fs.files:
+        parts = os.path.relpath(path, index.root).replace(os.sep, '/').split('/')
+        for i in range(len(parts)):
+            by_tail.setdefault('/'.join(parts[i:]), []).append(path)
+    sources = []
+    for path in fs.iter_files(TEXT_SOURCES + NAME_SOURCES):
+        if is_backup(path):
+            continue
+        with open(path, 'r', encoding='utf-8', errors='replace') as fh:
+            text = fh.read()
+        lower = path.lower()
+        if lower.endswith(NAME_SOURCES):
+            sources.append(text)
+        if lower.endswith('.css'):
+            continue
+        if lower.endswith('.html'):
+            values = path_strings('\n'.join(INLINE_SCRIPT_RE.findall(text)), js=True)
+        else:
+            values = path_strings(text, js=lower.endswith(JS_SOURCES))
+        for value in values:
+            tail = string_tail(value)
+            if tail:
+                referenced.update(by_tail.get(tail, ()))
+                referenced.update(by_tail.get(tail + '/index.html', ()))
+
+    # any file whose name the source mentions at all, however the path around it is built
+    source = '\n'.join(sources)
+    referenced.update(path for path in fs.files if path not in referenced and os.path.basename(path) in source)
+    return referenced
+
+
+def find_orphans(index, keep=()):
+    """(backups, orphans): lists of (abs path, size), largest first."""
+    referenced = referenced_files(index)
+    patterns = ignore_patterns(index.root)
+    backups = []
+    orphans = []
+    for path in index.fs.iter_files():
+        rel = os.path.relpath(path, index.root).replace(os.sep, '/')
+        if is_ignored(rel, patterns) or any(fnmatch.fnmatch(rel, k) for k in keep):
+            continue
+        if is_backup(path):
+            backups.append((path, os.path.getsize(path)))
+        elif rel not in ENTRY_POINTS and path not in referenced:
+            orphans.append((path, os.path.getsize(path)))
+    backups.sort(key=lambda f: f[1], reverse=True)
+    orphans.sort(key=lambda f: f[1], reverse=True)
+    return backups, orphans
+
+
+def fmt_size(n):
+    return '{:9.1f} KB'.format(n / 1024)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='List unreferenced files and backups under a site root.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('--keep', action='append', default=[], metavar='GLOB',
+                    help='never report paths (relative to root) matching GLOB; repeatable')
+    ap.add_argument('--exclude-file', metavar='PATH', help='write the deploy exclude list to PATH')
+    args = ap.parse_args(argv)
+
+    index = SiteIndex(args.root).build()
+    backups, orphans = find_orphans(index, args.keep)
+    patterns = ignore_patterns(index.root)
+    total = sum(os.path.getsize(p) for p in index.fs.iter_files()
+                if not is_ignored(os.path.relpath(p, index.root).replace(os.sep, '/'), patterns))
+
+    print('Backup and lock files: {} ({:.1f} KB)'.format(len(backups), sum(s for _, s in backups) / 1024))
+    for path, size in backups:
+        print('  ', fmt_size(size), os.path.relpath(path, ROOT))
+    print('\nUnreferenced files: {} ({:.1f} KB)'.format(len(orphans), sum(s for _, s in orphans) / 1024))
+    for path, size in orphans:
+        print('  ', fmt_size(size), os.path.relpath(path, ROOT))
+
+    excluded = backups + orphans
+    saved = sum(s for _, s in excluded)
+    print('\nExcluding them would cut the deploy from {:.1f} MB to {:.1f} MB'.format(
+        total / 1024 / 1024, (total - saved) / 1024 / 1024))
+    if args.exclude_file:
+        with open(args.exclude_file, 'w', encoding='utf-8') as fh:
+            for path, _ in excluded:
+                fh.write('/' + os.path.relpath(path, index.root).replace(os.sep, '/') + '\n')
+        print('Wrote', len(excluded), 'entries to', args.exclude_file)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Per-page transfer weight: what a first visit to each page downloads.
+- Built on the SiteIndex asset graph: the page's HTML plus every local file it loads
+  (CSS, JS, images, fonts, manifest), following @import/url() through stylesheets.
+- Reports the raw size and the estimated transfer size with gzip and, when the optional
+  `brotli` package is installed, brotli. Like nginx.conf, only text types are compressed
+  (gzip_types, gzip_min_length 1024, level 6); images, fonts and PDFs count at raw size.
+- Each distinct file is read and compressed once, however many pages share it.
+- Fails (exit 1) when a page exceeds the budget, so regressions are caught before deploy.
+  Remote files (CDN fonts, Font Awesome) and assets fetched by JS at runtime are not counted.
+
+Run from repo root:
+    python tools/page_weight.py [--root frontend] [--budget 1500] [--metric gzip] [--top 10]
+"""
+import argparse
+import gzip
+import os
+import sys
+
+from site_index import SiteIndex
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+# Mirrors gzip_types / gzip_min_length in nginx.conf
+COMPRESSIBLE = ('.html', '.htm', '.css', '.js', '.mjs', '.json', '.webmanifest', '.xml', '.svg', '.txt')
+MIN_COMPRESS_LENGTH = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 11
+
+METRICS = ('raw', 'gzip', 'br')
+
+
+def file_weight(path):
+    """{'raw': n, 'gzip': n, 'br': n or None} for one file, or None if it does not exist."""
+    try:
+        with open(path, 'rb') as fh:
+            data = fh.read()
+    except OSError:
+        return None
+    raw = len(data)
+    if not path.lower().endswith(COMPRESSIBLE) or raw < MIN_COMPRESS_LENGTH:
+        return {'raw': raw, 'gzip': raw, 'br': raw if brotli else None}
+    return {
+        'raw': raw,
+        'gzip': len(gzip.compress(data, GZIP_LEVEL, mtime=0)),
+        'br': len(brotli.compress(data, quality=BROTLI_QUALITY)) if brotli else None,
+    }
+
+
+class PageWeight:
+    """Transfer weight of one page and the files behind it."""
+
+    def __init__(self, page, files, missing):
+        self.page = page
+        self.files = files        # [(path, weight)] HTML first, then assets in load order
+        self.missing = missing    # asset paths that do not exist
+        self.totals = {}
+        for metric in METRICS:
+            values = [w[metric] for _, w in files]
+            self.totals[metric] = None if None in values else sum(values)
+
+    def heaviest(self, n=3, metric='raw'):
+        return sorted(self.files[1:], key=lambda f: f[1][metric] or 0, reverse=True)[:n]
+
+
+def weigh_site(index):
+    """[PageWeight] for every page in index, in walk order."""
+    weights = {}
+
+    def weight(path):
+        if path not in weights:
+            weights[path] = file_weight(path)
+        return weights[path]
+
+    results = []
+    for page in index:
+        files = [(page.path, weight(page.path))]
+        missing = []
+        for path in index.asset_closure(page):
+            if path == page.path or not index.fs.isfile(path):
+                if not index.fs.isdir(path):
+                    missing.append(path)
+                continue
+            files.append((path, weight(path)))
+        results.append(PageWeight(page, files, missing))
+    return results
+
+
+def fmt_kb(n):
+    return '     n/a' if n is None else '{:8.1f}'.format(n / 1024)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Report per-page transfer weight and enforce a budget.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('--budget', type=float, default=None, metavar='KB',
+                    help='fail when a page transfers more than KB kilobytes')
+    ap.add_argument('--metric', choices=METRICS, default=None,
+                    help='size the budget applies to (default: br if brotli is installed, else gzip)')
+    ap.add_argument('--top', type=int, default=3, metavar='N', help='heaviest assets listed per over-budget page')
+    args = ap.parse_args(argv)
+
+    metric = args.metric or ('br' if brotli else 'gzip')
+    if metric == 'br' and brotli is None:
+        print("--metric br needs the 'brotli' package (pip install brotli)")
+        return 2
+
+    index = SiteIndex(args.root).build()
+    results = weigh_site(index)
+    results.sort(key=lambda r: r.totals[metric], reverse=True)
+
+    print('Page weight for {} pages (KB; {} first visit, local files only)'.format(len(results), metric))
+    print('  {:>8} {:>8} {:>8} {:>6}  page'.format('raw', 'gzip', 'br', 'files'))
+    over = []
+    for r in results:
+        flag = ''
+        if args.budget is not None and r.totals[metric] > args.budget * 1024:
+            over.append(r)
+            flag = '  OVER BUDGET'
+        print('  {} {} {} {:6}  {}{}'.format(fmt_kb(r.totals['raw']), fmt_kb(r.totals['gzip']), fmt_kb(r.totals['br']),
+                                             len(r.files), os.path.relpath(r.page.path, ROOT), flag))
+
+    missing = sum(len(r.missing) for r in results)
+    if missing:
+        print('\nMissing assets not counted: {} (see check_links.py)'.format(missing))
+    if args.budget is None:
+        return 0
+    print('\nBudget: {:.0f} KB {} per page; {} page(s) over'.format(args.budget, metric, len(over)))
+    for r in over:
+        print('  {} ({:.1f} KB)'.format(os.path.relpath(r.page.path, ROOT), r.totals[metric] / 1024))
+        for path, w in r.heaviest(args.top, metric):
+            print('     {:8.1f} KB  {}'.format(w[metric] / 1024, os.path.relpath(path, ROOT)))
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
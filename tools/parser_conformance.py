@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Conformance check and benchmark for the html_backend parsers.
+- Parses every page under the root(s) with each installed backend and compares what the
+  tools consume against the stdlib parser: links and asset refs (tag, attribute, value),
+  ids, anchor names, the indexed elements and their attributes, lang, title and headings.
+  Valueless attributes compare equal whether a backend reports None, '' or the name.
+- Also compares what audit_engine and prune_css consume: the event stream (start/end tags
+  and their nesting, attributes, text; implied <html>/<head>/<body>, void-element ends and
+  whitespace-only text aside), the audit findings and score of every rule, and the tags,
+  classes, ids and script words prune_css collects. Those tools only take html5 backends
+  (see html_backend), so for lxml these counts are reported but do not fail the check.
+- lxml reports line-level offsets; those are checked to fall on the same line as stdlib's.
+- With --bench N each backend parses the (already read) pages N times and the speedup
+  over stdlib is printed.
+- Exits 1 if any backend disagrees with stdlib where it is used, so it can gate switching the
+  default.
+
+Run from repo root:
+    python tools/parser_conformance.py [--root frontend] [--bench 5]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+from audit_engine import DATA, END, START, AuditEngine, PageContext, record_events
+from audit_rules import make_rules
+from fs_snapshot import FsSnapshot
+from html_backend import BACKENDS, available_backends, get_backend, line_starts
+from prune_css import IMPLIED_TAGS, Usage, UsageCollector
+from site_index import parse_page
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                       'source', 'track', 'wbr'))
+
+
+def _attrs(attrs):
+    return tuple(sorted((k.lower(), None if v in (None, '', k) else v) for k, v in attrs.items()))
+
+
+def extracted(page):
+    """What the tools read from a Page, without offsets."""
+    return {
+        'refs': Counter((r.tag, r.attr, r.value) for r in page.refs),
+        'srcs': Counter((r.tag, r.attr, r.value) for r in page.srcs),
+        'ids': page.ids,
+        'names': page.names,
+        'elements': Counter((e.tag, _attrs(e.attrs)) for e in page.elements),
+        'lang': page.lang,
+        'title': page.title,
+        'title_count': page.title_count,
+        'headings': [(level, text) for level, text, _ in page.headings],
+    }
+
+
+def event_stream(events):
+    """The recorded events of a page with the differences tree builders may add taken out."""
+    out = []
+    for event in events:
+        kind = event[0]
+        if kind == START:
+            if event[1] not in IMPLIED_TAGS:
+                out.append((START, event[1], _attrs(event[2])))
+        elif kind == END:
+            if event[1] not in IMPLIED_TAGS and event[1] not in VOID_TAGS:
+                out.append((END, event[1]))
+        else:
+            text = ' '.join(event[1].split())
+            if not text:
+                continue
+            if out and out[-1][0] == DATA:
+                out[-1] = (DATA, out[-1][1] + ' ' + text)
+            else:
+                out.append((DATA, text))
+    return out
+
+
+def consumed(engine, page, text, backend):
+    """What audit_engine and prune_css get from one parse of the page."""
+    events = record_events(text, backend)
+    usage = Usage()
+    get_backend(backend).parse(text, UsageCollector(usage))
+    return {
+        'events': event_stream(events),
+        'findings': engine.audit_events(page, events),
+        'score': engine.scores.get(page.path),
+        'usage': (usage.tags, usage.classes, usage.ids, usage.words, usage.prefixes),
+    }
+
+
+def first_difference(want, got):
+    """Short description of where two event streams part."""
+    for i, (a, b) in enumerate(zip(want, got)):
+        if a != b:
+            return 'event {}: expected {!r} got {!r}'.format(i, a, b)
+    return 'expected {} events got {}'.format(len(want), len(got))
+
+
+def differences(expected, actual):
+    """['field: detail'] where actual differs from expected."""
+    out = []
+    for field, want in expected.items():
+        got = actual[field]
+        if want == got:
+            continue
+        if field == 'events':
+            out.append('events: ' + first_difference(want, got))
+        elif isinstance(want, Counter):
+            missing = list((want - got).elements())[:3]
+            extra = list((got - want).elements())[:3]
+            out.append('{}: missing {} extra {}'.format(field, missing, extra))
+        else:
+            out.append('{}: expected {!r} got {!r}'.format(field, want, got))
+    return out
+
+
+def offset_lines_match(reference, page, text):
+    """Do the line-level offsets of page's refs fall on the lines of reference's exact offsets?"""
+    starts = line_starts(text)
+
+    def line_of(offset):
+        lo, hi = 0, len(starts)
+        while lo + 1 < hi:
+            mid = (lo + hi) // 2
+            if starts[mid] <= offset:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+    want = sorted((r.tag, r.attr, r.value, line_of(r.offset)) for r in reference.refs if r.offset is not None)
+    got = sorted((r.tag, r.attr, r.value, line_of(r.offset)) for r in page.refs if r.offset is not None)
+    return want == got
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Compare html_backend parsers on real pages and benchmark them.')
+    ap.add_argument('--root', action='append', help='site root (repeatable; default: frontend/)')
+    ap.add_argument('--bench', type=int, default=0, metavar='N', help='parse every page N times per backend')
+    args = ap.parse_args(argv)
+    roots = [os.path.abspath(r) for r in (args.root or [FRONTEND])]
+
+    backends = available_backends()
+    missing = [name for name in BACKENDS if name not in backends]
+    print('Backends:', ', '.join(backends), '(not installed: {})'.format(', '.join(missing)) if missing else '')
+
+    texts = {}
+    contexts = {}
+    for root in roots:
+        fs = FsSnapshot.scan(root)
+        for path in fs.iter_files(('.html',)):
+            with open(path, 'rb') as fh:
+                texts[path] = fh.read().decode('utf-8')
+            contexts[path] = PageContext(path, root, fs)
+    print('Pages:', len(texts))
+
+    engine = AuditEngine(make_rules(), backend='stdlib')
+    expected = {path: consumed(engine, contexts[path], text, get_backend('stdlib')) for path, text in texts.items()}
+    failures = 0
+    for name in backends:
+        if name == 'stdlib':
+            continue
+        backend = get_backend(name)
+        bad = []
+        bad_consumed = []
+        offset_mismatch = 0
+        for path, text in texts.items():
+            reference = parse_page(path, text=text, backend='stdlib')
+            page = parse_page(path, text=text, backend=backend)
+            diffs = differences(extracted(reference), extracted(page))
+            if diffs:
+                bad.append((path, diffs))
+            diffs = differences(expected[path], consumed(engine, contexts[path], text, backend))
+            if diffs:
+                bad_consumed.append((path, diffs))
+            if backend.name == 'lxml' and not offset_lines_match(reference, page, text):
+                offset_mismatch += 1
+        failures += len(bad) + (len(bad_consumed) if backend.html5 else 0)
+        print('\n{}: {} of {} pages match stdlib'.format(name, len(texts) - len(bad), len(texts)))
+        print('  events, audit findings and CSS usage: {} of {} pages match{}'.format(
+            len(texts) - len(bad_consumed), len(texts),
+            '' if backend.html5 else ' (not an html5 backend: not offered to audit_engine/prune_css)'))
+        if backend.name == 'lxml':
+            print('  ref offsets on a different line than stdlib: {} pages'.format(offset_mismatch))
+        for path, diffs in bad + bad_consumed:
+            print('  ', os.path.relpath(path, ROOT))
+            for d in diffs:
+                print('      ', d)
+
+    if args.bench:
+        print('\nParse time, {} pages x {}:'.format(len(texts), args.bench))
+        baseline = None
+        for name in ['stdlib'] + [b for b in backends if b != 'stdlib']:
+            backend = get_backend(name)
+            start = time.perf_counter()
+            for _ in range(args.bench):
+                for path, text in texts.items():
+                    parse_page(path, text=text, backend=backend)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print('  {:12} {:8.1f} ms  {:8.0f} pages/s  {:5.2f}x'.format(
+                name, elapsed * 1000, len(texts) * args.bench / elapsed, baseline / elapsed))
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
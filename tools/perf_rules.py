@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Front-end performance rules for the audit engine (see audit_engine.py).
+- render-blocking-script: external <script> in <head> without defer/async (or type=module)
+- img-dimensions: <img> without width and height (layout shift while it loads)
+- img-lazy: images below the fold without loading="lazy"; the first ABOVE_FOLD_IMAGES
+  images of <body> outside <header>/<nav>, and fetchpriority="high" ones, count as above it
+- img-oversized: local images more than OVERSIZE_RATIO times wider (or taller) than the
+  largest size the page shows them at: their width/height attributes, else the px
+  width/height (capped by max-width/max-height) that the page's <style> blocks and
+  stylesheets give their classes. srcset images are skipped.
+- css-import-chain: stylesheets that @import others (each level is another round trip)
+- duplicate-script: the same script included more than once
+
+Every rule is scored: each finding costs WEIGHTS[name] points (up to MAX_PENALTY per rule)
+of the page's performance score out of 100.
+
+`python tools/perf_rules.py --check-image-sizes [--root frontend]` compares image_size()
+with the size Pillow reports, for the site's images and a sample of every format it reads.
+"""
+import argparse
+import os
+import re
+import struct
+import sys
+import tempfile
+from functools import lru_cache
+
+from audit_engine import Rule
+from css_rules import StyleRule, parse_css, split_selectors, structural
+from site_index import css_refs, is_local_link, resolve_path
+
+try:
+    from PIL import Image
+except ImportError:  # optional: pip install pillow (only for --check-image-sizes)
+    Image = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+ABOVE_FOLD_IMAGES = 2
+OVERSIZE_RATIO = 2.0   # allows for 2x (retina) displays
+MAX_IMPORT_DEPTH = 10
+
+# px sizes in a declaration block, and the classes of a selector's last compound ('.card img.thumb')
+PX_DECL_RE = re.compile(r'(?<![-\w])(max-width|width|max-height|height)\s*:\s*(\d+(?:\.\d+)?)px\b', re.I)
+CLASS_TAIL_RE = re.compile(r'(?:^|[\s>+~])(?:img)?((?:\.[-\w]+)+)$')
+
+WEIGHTS = {
+    'render-blocking-script': 10,
+    'img-dimensions': 2,
+    'img-lazy': 2,
+    'img-oversized': 5,
+    'css-import-chain': 10,
+    'duplicate-script': 5,
+}
+MAX_PENALTY = 30
+
+
+@lru_cache(maxsize=None)
+def image_size(path):
+    """(width, height) of a PNG, GIF, JPEG or WebP file from its header, or None."""
+    try:
+        with open(path, 'rb') as fh:
+            head = fh.read(32)
+            if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+            if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+                chunk = head[12:16]
+                if chunk == b'VP8X':
+                    return (int.from_bytes(head[24:27], 'little') + 1,
+                            int.from_bytes(head[27:30], 'little') + 1)
+                if chunk == b'VP8L':
+                    bits = int.from_bytes(head[21:25], 'little')
+                    return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+                if chunk == b'VP8 ':
+                    w, h = struct.unpack('<HH', head[26:30])
+                    return w & 0x3fff, h & 0x3fff
+                return None
+            if head[:2] == b'\xff\xd8':
+                return _jpeg_size(fh)
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+def _jpeg_size(fh):
+    fh.seek(2)
+    while True:
+        marker = fh.read(2)
+        if len(marker) < 2 or marker[0] != 0xff:
+            return None
+        code = marker[1]
+        if code == 0xff:           # fill byte
+            fh.seek(-1, 1)
+            continue
+        if code in (0x01,) or 0xd0 <= code <= 0xd9:
+            continue               # markers without a length
+        length = struct.unpack('>H', fh.read(2))[0]
+        if 0xc0 <= code <= 0xcf and code not in (0xc4, 0xc8, 0xcc):
+            h, w = struct.unpack('>xHH', fh.read(5))
+            return w, h
+        fh.seek(length - 2, 1)
+
+
+def _pixels(value):
+    """Integer pixel size from a width/height attribute ('300', '300px'), else None."""
+    value = (value or '').strip().lower()
+    if value.endswith('px'):
+        value = value[:-2]
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=256)
+def css_class_sizes(text):
+    """{frozenset of classes: (width, height)}: the largest px size any rule of the stylesheet
+    text gives an element with those classes (width capped by max-width, height by
+    max-height; 0 when it gives none)."""
+    sizes = {}
+
+    def walk(nodes):
+        for node in nodes:
+            if not isinstance(node, StyleRule):
+                walk(node.rules or ())
+                continue
+            px = {prop.lower(): float(value) for prop, value in PX_DECL_RE.findall(node.body)}
+            width = min((v for v in (px.get('width'), px.get('max-width')) if v), default=0)
+            height = min((v for v in (px.get('height'), px.get('max-height')) if v), default=0)
+            if not width and not height:
+                continue
+            for selector in split_selectors(node.selector):
+                m = CLASS_TAIL_RE.search(structural(selector))
+                if m:
+                    key = frozenset(m.group(1).split('.')[1:])
+                    w, h = sizes.get(key, (0, 0))
+                    sizes[key] = (max(w, width), max(h, height))
+    walk(parse_css(text))
+    return sizes
+
+
+@lru_cache(maxsize=None)
+def stylesheet_class_sizes(path):
+    """css_class_sizes() of the stylesheet at path."""
+    try:
+        with open(path, encoding='utf-8', errors='replace') as fh:
+            return css_class_sizes(fh.read())
+    except OSError:
+        return {}
+
+
+@lru_cache(maxsize=None)
+def stylesheet_imports(root, path):
+    """Local files @import-ed by the stylesheet at path."""
+    try:
+        with open(path, encoding='utf-8', errors='replace') as fh:
+            text = fh.read()
+    except OSError:
+        return ()
+    return tuple(resolve_path(root, path, value) for kind, value, _ in css_refs(text, None)
+                 if kind == 'import' and is_local_link(value))
+
+
+class PerfRule(Rule):
+    """Scored rule: findings cost WEIGHTS[name] points each, capped at MAX_PENALTY."""
+    scored = True
+
+    def begin(self, page):
+        self.page = page
+        self.findings = []
+
+    def local_path(self, link):
+        if not is_local_link(link):
+            return None
+        return resolve_path(self.page.root, self.page.path, link)
+
+    def penalty(self):
+        return min(MAX_PENALTY, WEIGHTS[self.name] * len(self.findings))
+
+
+class RenderBlockingScriptRule(PerfRule):
+    name = 'render-blocking-script'
+    description = 'No <script src> in <head> without defer/async'
+    tags = ('head', 'body', 'script')
+    end_tags = ('head',)
+
+    def begin(self, page):
+        super().begin(page)
+        self.in_head = False
+
+    def start(self, tag, attrs, offset):
+        if tag == 'head':
+            self.in_head = True
+        elif tag == 'body':
+            self.in_head = False
+        elif self.in_head and attrs.get('src') and 'defer' not in attrs and 'async' not in attrs \
+                and (attrs.get('type') or '').lower() != 'module':
+            self.findings.append(attrs['src'])
+
+    def end(self, tag):
+        self.in_head = False
+
+    def finish(self):
+        if self.findings:
+            return ['Render-blocking scripts in <head> (add defer or async): {}'.format(
+                ', '.join(self.findings[:5]))]
+        return []
+
+
+class ImgDimensionsRule(PerfRule):
+    name = 'img-dimensions'
+    description = '<img> has width and height attributes'
+    tags = ('img',)
+
+    def start(self, tag, attrs, offset):
+        if not attrs.get('width') or not attrs.get('height'):
+            self.findings.append(attrs.get('src', ''))
+
+    def finish(self):
+        if self.findings:
+            return ['Images without width/height ({}): {}'.format(
+                len(self.findings), ', '.join(self.findings[:5]))]
+        return []
+
+
+class ImgLazyRule(PerfRule):
+    name = 'img-lazy'
+    description = 'Images below the fold use loading="lazy"'
+    tags = ('body', 'header', 'nav', 'img')
+    end_tags = ('header', 'nav')
+
+    def begin(self, page):
+        super().begin(page)
+        self.in_body = False
+        self.chrome = 0       # depth inside <header>/<nav>
+        self.seen = 0
+
+    def start(self, tag, attrs, offset):
+        if tag == 'body':
+            self.in_body = True
+        elif tag in ('header', 'nav'):
+            self.chrome += 1
+        elif self.in_body and not self.chrome:
+            self.seen += 1
+            if self.seen > ABOVE_FOLD_IMAGES and (attrs.get('loading') or '').lower() != 'lazy' \
+                    and (attrs.get('fetchpriority') or '').lower() != 'high':
+                self.findings.append(attrs.get('src', ''))
+
+    def end(self, tag):
+        self.chrome = max(0, self.chrome - 1)
+
+    def finish(self):
+        if self.findings:
+            return ['Below-the-fold images without loading="lazy" ({}): {}'.format(
+                len(self.findings), ', '.join(self.findings[:5]))]
+        return []
+
+
+class ImgOversizedRule(PerfRule):
+    name = 'img-oversized'
+    description = 'Images are not much larger than their display size'
+    tags = ('img', 'link', 'style')
+    end_tags = ('style',)
+    text = True
+
+    def begin(self, page):
+        super().begin(page)
+        self.images = []      # (src, width attribute, height attribute, classes)
+        self.styles = []      # text of each <style>
+        self.sheets = []      # local stylesheet paths
+        self.in_style = False
+
+    def start(self, tag, attrs, offset):
+        if tag == 'style':
+            self.in_style = True
+            self.styles.append('')
+            return
+        if tag == 'link':
+            rels = (attrs.get('rel') or '').lower().split()
+            path = self.local_path(attrs.get('href')) if 'stylesheet' in rels else None
+            if path and self.page.fs.isfile(path):
+                self.sheets.append(path)
+            return
+        src = attrs.get('src')
+        if src and not attrs.get('srcset'):
+            self.images.append((src, _pixels(attrs.get('width')), _pixels(attrs.get('height')),
+                                frozenset((attrs.get('class') or '').split())))
+
+    def end(self, tag):
+        self.in_style = False
+
+    def data(self, text):
+        if self.in_style:
+            self.styles[-1] += text
+
+    def _css_size(self, classes):
+        """Largest (width, height) the page's CSS gives an element with these classes."""
+        width = height = 0
+        if classes:
+            for sizes in [css_class_sizes(text) for text in self.styles] + \
+                         [stylesheet_class_sizes(path) for path in self.sheets]:
+                for key, (w, h) in sizes.items():
+                    if key <= classes:
+                        width, height = max(width, w), max(height, h)
+        return int(width), int(height)
+
+    def finish(self):
+        declared = {}    # src -> (largest display width, height)
+        for src, width, height, classes in self.images:
+            if not width and not height:
+                width, height = self._css_size(classes)
+            if not width and not height:
+                continue
+            w, h = declared.get(src, (0, 0))
+            declared[src] = (max(w, width or 0), max(h, height or 0))
+        for src, (width, height) in declared.items():
+            path = self.local_path(src)
+            size = image_size(path) if path and self.page.fs.isfile(path) else None
+            if size is None:
+                continue
+            if (width and size[0] > width * OVERSIZE_RATIO) or (height and size[1] > height * OVERSIZE_RATIO):
+                self.findings.append('{} ({}x{} shown at {}x{})'.format(
+                    src, size[0], size[1], width or '?', height or '?'))
+        if self.findings:
+            return ['Oversized images: {}'.format(', '.join(self.findings[:5]))]
+        return []
+
+
+class CssImportChainRule(PerfRule):
+    name = 'css-import-chain'
+    description = 'Stylesheets do not @import other stylesheets'
+    tags = ('link', 'style')
+    end_tags = ('style',)
+    text = True
+
+    def begin(self, page):
+        super().begin(page)
+        self.in_style = False
+
+    def start(self, tag, attrs, offset):
+        if tag == 'style':
+            self.in_style = True
+            return
+        rels = (attrs.get('rel') or '').lower().split()
+        path = self.local_path(attrs.get('href')) if 'stylesheet' in rels else None
+        if path and self.page.fs.isfile(path):
+            chain = self._chain(path)
+            if len(chain) > 1:
+                self.findings.append(' -> '.join(os.path.relpath(p, self.page.root) for p in chain))
+
+    def end(self, tag):
+        self.in_style = False
+
+    def data(self, text):
+        if self.in_style and '@import' in text:
+            for kind, value, _ in css_refs(text, None):
+                if kind == 'import':
+                    self.findings.append('<style> @import {}'.format(value))
+
+    def _chain(self, path):
+        """Longest @import chain starting at path (cycles and depth bounded)."""
+        best = [path]
+        stack = [[path]]
+        while stack:
+            chain = stack.pop()
+            if len(chain) > len(best):
+                best = chain
+            if len(chain) >= MAX_IMPORT_DEPTH:
+                continue
+            for imported in stylesheet_imports(self.page.root, chain[-1]):
+                if imported not in chain and self.page.fs.isfile(imported):
+                    stack.append(chain + [imported])
+        return best
+
+    def finish(self):
+        if self.findings:
+            return ['CSS @import chains: {}'.format('; '.join(self.findings[:5]))]
+        return []
+
+
+class DuplicateScriptRule(PerfRule):
+    name = 'duplicate-script'
+    description = 'No script is included twice'
+    tags = ('script',)
+
+    def begin(self, page):
+        super().begin(page)
+        self.seen = set()
+
+    def start(self, tag, attrs, offset):
+        src = (attrs.get('src') or '').strip()
+        if not src:
+            return
+        key = self.local_path(src) or src
+        if key in self.seen:
+            self.findings.append(src)
+        self.seen.add(key)
+
+    def finish(self):
+        if self.findings:
+            return ['Scripts included more than once: {}'.format(', '.join(self.findings[:5]))]
+        return []
+
+
+PERF_RULES = [RenderBlockingScriptRule, ImgDimensionsRule, ImgLazyRule, ImgOversizedRule,
+              CssImportChainRule, DuplicateScriptRule]
+
+
+# --check-image-sizes: (suffix, mode, Pillow save options) for one sample per header layout
+SAMPLE_FORMATS = [
+    ('.png', 'RGB', {}),
+    ('.gif', 'P', {}),
+    ('.jpg', 'RGB', {}),
+    ('.jpg', 'RGB', {'progressive': True}),
+    ('.webp', 'RGB', {'lossless': False}),                     # VP8
+    ('.webp', 'RGB', {'lossless': True}),                      # VP8L
+    ('.webp', 'RGBA', {'lossless': False}),                    # VP8X (alpha)
+    ('.webp', 'RGB', {'lossless': True, 'exif': b'Exif\x00\x00'}),  # VP8X (metadata)
+]
+SAMPLE_SIZES = [(300, 200), (1, 1), (257, 1031)]
+
+
+def check_image_sizes(root):
+    """['path: image_size() x, Pillow y'] for the images under root and the samples that disagree."""
+    image_size.cache_clear()
+    problems = []
+    paths = [os.path.join(d, f) for d, _, files in os.walk(root) for f in files
+             if f.lower().endswith(('.png', '.gif', '.jpg', '.jpeg', '.webp'))]
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (suffix, mode, options) in enumerate(SAMPLE_FORMATS):
+            for width, height in SAMPLE_SIZES:
+                path = os.path.join(tmp, 'sample-{}-{}x{}{}'.format(i, width, height, suffix))
+                Image.new(mode, (width, height)).save(path, **options)
+                paths.append(path)
+        for path in paths:
+            with Image.open(path) as im:
+                expected = im.size
+            got = image_size(path)
+            if got is None or tuple(got) != expected:
+                problems.append('{}: image_size() {}, Pillow {}'.format(path, got, expected))
+    image_size.cache_clear()
+    return problems, len(paths)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Self-checks for the performance rules.')
+    ap.add_argument('--check-image-sizes', action='store_true',
+                    help='compare image_size() with Pillow on the site images and generated samples')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    args = ap.parse_args(argv)
+    if not args.check_image_sizes:
+        ap.print_help()
+        return 0
+    if Image is None:
+        print('Pillow is not installed (pip install pillow)', file=sys.stderr)
+        return 2
+    problems, checked = check_image_sizes(os.path.abspath(args.root))
+    for problem in problems:
+        print('  ', problem)
+    print('Image sizes: {} files checked, {} differ from Pillow'.format(checked, len(problems)))
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Minify-and-precompress build stage, run in place on a deploy copy of the site (e.g. public/).
+- Minifies conservatively:
+  - HTML: whitespace runs between and inside text are collapsed to one character and
+    comments (except conditional comments) are dropped. Tags, <pre>, <textarea> and
+    <script> are kept byte for byte; <style> blocks are minified as CSS.
+  - CSS: comments (except /*! ... */) and whitespace that carries no meaning are removed.
+  - JSON/.webmanifest: re-serialized without whitespace; key order is kept.
+  - JS is not minified.
+  A minified file is only kept when it is smaller.
+- Writes .gz (level 9) and, when the optional `brotli` package is installed, .br (quality 11)
+  siblings of every compressible file (page_weight.COMPRESSIBLE, at least 1 KB) for nginx
+  gzip_static / brotli_static. A sibling that would not be smaller is not written.
+- Skips files whose content hash matches the last run (.cache/) and whose siblings exist.
+- Runs across a process pool (--jobs, default: all cores) and reports the bytes saved.
+
+Run from repo root:
+    python tools/precompress.py --root public [--jobs N] [--no-minify] [--force]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from fs_snapshot import FsSnapshot
+from page_weight import COMPRESSIBLE, MIN_COMPRESS_LENGTH
+from tool_cache import cache_path, load_json, save_json
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+SIBLINGS = ('.gz', '.br')
+
+HTML_TOKEN_RE = re.compile(r'''
+    (?P<raw><(?P<rawtag>pre|textarea|script)\b[^>]*>.*?</(?P=rawtag)\s*>)
+  | (?P<style>(?P<open><style\b[^>]*>)(?P<css>.*?)(?P<close></style\s*>))
+  | (?P<comment><!--.*?-->)
+  | (?P<tag><[^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*>)
+''', re.I | re.S | re.X)
+HTML_SPACE_RE = re.compile(r'[ \t\n\r\f]+')
+CSS_TOKEN_RE = re.compile(r'''
+    (?P<comment>/\*.*?\*/)
+  | (?P<keep>"(?:\\.|[^"\\\n])*" | '(?:\\.|[^'\\\n])*' | url\((?!\s*["'])[^)]*\))
+''', re.S | re.I | re.X)
+
+
+def _collapse(m):
+    return '\n' if '\n' in m.group(0) else ' '
+
+
+def minify_css(text):
+    """CSS without comments and insignificant whitespace; strings and url()s are kept as they are."""
+    out, pos = [], 0
+
+    def squeeze(chunk):
+        chunk = re.sub(r'\s+', ' ', chunk)
+        chunk = re.sub(r' ?([{};,>]) ?', r'\1', chunk)
+        return re.sub(r': ', ':', chunk)
+
+    # dropped comments become blanks of the text around them, so it is squeezed as one run
+    pending = []
+    for m in CSS_TOKEN_RE.finditer(text):
+        pending.append(text[pos:m.start()])
+        if m.group('keep') or m.group(0).startswith('/*!'):
+            out.append(squeeze(' '.join(pending)))
+            out.append(m.group(0))
+            pending = []
+        pos = m.end()
+    pending.append(text[pos:])
+    out.append(squeeze(' '.join(pending)))
+    return ''.join(out).replace(';}', '}').strip()
+
+
+def minify_html(text):
+    """HTML with collapsed whitespace and no comments; tags and raw-text elements are untouched."""
+    out, pos = [], 0
+    for m in HTML_TOKEN_RE.finditer(text):
+        out.append(HTML_SPACE_RE.sub(_collapse, text[pos:m.start()]))
+        if m.group('comment'):
+            if m.group(0).startswith('<!--[if') or m.group(0).startswith('<!--<!'):
+                out.append(m.group(0))
+        elif m.group('style'):
+            out.append(m.group('open') + minify_css(m.group('css')) + m.group('close'))
+        else:
+            out.append(m.group(0))
+        pos = m.end()
+    out.append(HTML_SPACE_RE.sub(_collapse, text[pos:]))
+    return ''.join(out)
+
+
+def minify_json(text):
+    return json.dumps(json.loads(text), ensure_ascii=False, separators=(',', ':'))
+
+
+MINIFIERS = {'.html': minify_html, '.htm': minify_html, '.css': minify_css,
+             '.json': minify_json, '.webmanifest': minify_json}
+
+
+def sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def process_file(path, minify=True):
+    """Minify path in place and write its compressed siblings; return a result dict."""
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    result = {'path': path, 'original': len(data), 'minified': len(data), 'gz': None, 'br': None}
+    minifier = MINIFIERS.get(os.path.splitext(path)[1].lower()) if minify else None
+    if minifier is not None:
+        try:
+            smaller = minifier(data.decode('utf-8')).encode('utf-8')
+        except (UnicodeDecodeError, ValueError):
+            smaller = data
+        if len(smaller) < len(data):
+            data = smaller
+            with open(path, 'wb') as fh:
+                fh.write(data)
+            result['minified'] = len(data)
+
+    for ext, compress in (('.gz', lambda d: gzip.compress(d, GZIP_LEVEL, mtime=0)),
+                          ('.br', lambda d: brotli.compress(d, quality=BROTLI_QUALITY) if brotli else None)):
+        packed = compress(data) if len(data) >= MIN_COMPRESS_LENGTH else None
+        if packed is not None and len(packed) < len(data):
+            with open(path + ext, 'wb') as fh:
+                fh.write(packed)
+            result[ext[1:]] = len(packed)
+        elif os.path.exists(path + ext):
+            os.remove(path + ext)
+    result['sha1'] = sha1(data)
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Minify HTML/CSS/JSON and write .gz/.br siblings, in place.')
+    ap.add_argument('--root', required=True, help='deploy copy of the site to process in place (e.g. public/)')
+    ap.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='worker processes (default: all cores)')
+    ap.add_argument('--no-minify', action='store_true', help='only write the compressed siblings')
+    ap.add_argument('--force', action='store_true', help='process every file, ignoring the cache')
+    args = ap.parse_args(argv)
+    root = os.path.abspath(args.root)
+    minify = not args.no_minify
+
+    settings = {'minify': minify, 'gzip': GZIP_LEVEL, 'brotli': BROTLI_QUALITY if brotli else None}
+    cached = {}
+    if not args.force:
+        data = load_json(cache_path('precompress', root), {})
+        if data.get('settings') == settings:
+            cached = data.get('files', {})
+
+    fs = FsSnapshot.scan(root)
+    files = [p for p in fs.iter_files(COMPRESSIBLE) if not p.endswith(SIBLINGS)]
+    sources = set(files)
+    removed = 0
+    for path in fs.iter_files(SIBLINGS):
+        source = path[:-3]
+        if source.lower().endswith(COMPRESSIBLE) and source not in sources:
+            os.remove(path)
+            removed += 1
+
+    entries, todo, skipped = {}, [], 0
+    for path in files:
+        key = os.path.relpath(path, root).replace(os.sep, '/')
+        with open(path, 'rb') as fh:
+            digest = sha1(fh.read())
+        entry = cached.get(key)
+        if entry and entry['sha1'] == digest and all(fs.isfile(path + ext) for ext in entry['siblings']):
+            entries[key] = entry
+            skipped += 1
+        else:
+            todo.append(path)
+
+    if args.jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(min(args.jobs, len(todo))) as pool:
+            results = list(pool.map(process_file, todo, [minify] * len(todo), chunksize=max(1, len(todo) // (args.jobs * 8))))
+    else:
+        results = [process_file(path, minify) for path in todo]
+
+    totals = dict.fromkeys(('original', 'minified', 'gz', 'br', 'gz_base', 'br_base'), 0)
+    for r in results:
+        key = os.path.relpath(r['path'], root).replace(os.sep, '/')
+        entries[key] = {'sha1': r['sha1'], 'siblings': ['.' + k for k in ('gz', 'br') if r[k] is not None]}
+        totals['original'] += r['original']
+        totals['minified'] += r['minified']
+        for k in ('gz', 'br'):
+            if r[k] is not None:
+                totals[k] += r[k]
+                totals[k + '_base'] += r['minified']
+
+    save_json(cache_path('precompress', root), {'settings': settings, 'files': entries})
+
+    print('{} files: {} processed, {} unchanged; {} stale siblings removed'.format(
+        len(files), len(todo), skipped, removed))
+    if results:
+        print('Minified: {:.1f} KB -> {:.1f} KB (saved {:.1f} KB)'.format(
+            totals['original'] / 1024, totals['minified'] / 1024, (totals['original'] - totals['minified']) / 1024))
+        print('gzip -{}: {:.1f} KB saved on {:.1f} KB'.format(
+            GZIP_LEVEL, (totals['gz_base'] - totals['gz']) / 1024, totals['gz_base'] / 1024))
+        if brotli:
+            print('brotli -{}: {:.1f} KB saved on {:.1f} KB'.format(
+                BROTLI_QUALITY, (totals['br_base'] - totals['br']) / 1024, totals['br_base'] / 1024))
+        else:
+            print('brotli: not installed (pip install brotli), no .br files written')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Cheap byte-level prefilters for the fixers: skip files that cannot match before decoding or
+parsing them.
+- A Prefilter is a small set of literals checked on the raw file bytes: a file is a
+  candidate when any of them occurs (require_all: every one of them; min_count: at least
+  that many occurrences in total). A bytes regex can stand in for checks literals cannot
+  express (case-insensitive, whitespace around '=').
+- Files of MMAP_MIN_SIZE bytes or more are searched through mmap instead of being read into
+  memory; use_mmap=True/False forces either way.
+- Each prefilter counts the files it checked and skipped, and report() prints that as one
+  line, so every fixer run shows what its prefilter saved.
+
+Use from a fixer:
+    from prefilter import Prefilter
+    prefilter = Prefilter('href="#"', regex=rb'href\\s*=\\s*["\\']?\\s*#\\s*["\\'\\s>]')
+    for path in prefilter.filter(paths):
+        ...full parse...
+    prefilter.report()
+"""
+import mmap
+import os
+import re
+
+MMAP_MIN_SIZE = 1 << 20
+
+
+class Prefilter:
+    def __init__(self, name, literals=(), regex=None, require_all=False, min_count=1, use_mmap=None):
+        """name: what the report calls it; literals: bytes; regex: bytes pattern or compiled bytes regex."""
+        if not literals and regex is None:
+            raise ValueError('a prefilter needs literals or a regex')
+        self.name = name
+        self.literals = tuple(literals)
+        self.regex = re.compile(regex) if isinstance(regex, bytes) else regex
+        self.require_all = require_all
+        self.min_count = min_count
+        self.use_mmap = use_mmap
+        self.checked = 0
+        self.skipped = 0
+
+    def matches(self, data):
+        """Could data (bytes or an mmap) hold a match?"""
+        if self.regex is not None and not self.regex.search(data):
+            return False
+        if not self.literals:
+            return True
+        if self.require_all:
+            return all(data.find(lit) != -1 for lit in self.literals)
+        if self.min_count <= 1:
+            return any(data.find(lit) != -1 for lit in self.literals)
+        count = 0
+        for lit in self.literals:
+            pos = data.find(lit)
+            while pos != -1:
+                count += 1
+                if count >= self.min_count:
+                    return True
+                pos = data.find(lit, pos + len(lit))
+        return False
+
+    def check(self, path):
+        """True if the file at path is a candidate; unreadable files are not."""
+        self.checked += 1
+        try:
+            with open(path, 'rb') as fh:
+                size = os.fstat(fh.fileno()).st_size
+                use_mmap = self.use_mmap if self.use_mmap is not None else size >= MMAP_MIN_SIZE
+                if use_mmap and size:
+                    with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        ok = self.matches(data)
+                else:
+                    ok = self.matches(fh.read())
+        except OSError:
+            ok = False
+        if not ok:
+            self.skipped += 1
+        return ok
+
+    def filter(self, paths):
+        """The candidates among paths, in order."""
+        return [path for path in paths if self.check(path)]
+
+    def report(self):
+        print('Prefilter {}: {} of {} files skipped, {} candidates'.format(
+            self.name, self.skipped, self.checked, self.checked - self.skipped))
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Find and prune unused CSS rules across the whole site.
+- Collects every tag, class and id used in the HTML under the root (one parse per page with
+  the html_backend), plus every word inside a string literal of the site's JS files, inline
+  <script> blocks and on* handler attributes, which covers classList.add('open'),
+  className = 'card active', innerHTML templates and getElementById('menu'). A string word
+  ending in '-' ('status-' + state) keeps every class and id starting with it.
+- A selector is used when every class, id and tag it names is used; arguments of functional
+  pseudo-classes (:not(.x), :is(...)) and attribute selectors are not required, and
+  pseudo-elements and state pseudo-classes are ignored. A rule stays when any selector in its
+  list is used or matches the SAFELIST (fnmatch patterns on class/id names, e.g. 'is-*',
+  extendable with --safelist). @media/@supports blocks left empty go too; @font-face,
+  @keyframes and @import are kept.
+- Stylesheets under VENDORED_DIRS are not pruned or scanned.
+- Reports the bytes and rules removed per stylesheet; --out DIR writes the pruned copies
+  there, --in-place prunes a deploy copy, neither only reports. --verbose lists the removed
+  selectors.
+
+Run from repo root:
+    python tools/prune_css.py [--root frontend] [--safelist 'is-*'] [--out build/css | --in-place] [--verbose]
+"""
+import argparse
+import fnmatch
+import os
+import re
+import sys
+
+from css_rules import filtered, parse_css, split_selectors, structural
+from fs_snapshot import FsSnapshot
+from html_backend import get_backend
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+# Classes/ids added by code this tool cannot see (third-party widgets, server templates)
+SAFELIST = ()
+VENDORED_DIRS = ('js/pdfjs/',)
+# Element names every page has even when the markup leaves them out
+IMPLIED_TAGS = frozenset(('html', 'head', 'body'))
+
+STRING_RE = re.compile(r'''"((?:\\.|[^"\\\n])*)"|'((?:\\.|[^'\\\n])*)'|`([^`]*)`''')
+WORD_RE = re.compile(r'[A-Za-z_][\w-]*')
+FUNCTIONAL_PSEUDO_RE = re.compile(r':[\w-]+\((?:[^()]|\([^()]*\))*\)')
+ATTRIBUTE_SELECTOR_RE = re.compile(r'\[[^\]]*\]')
+CLASS_RE = re.compile(r'\.((?:\\.|[\w-])+)')
+ID_RE = re.compile(r'#((?:\\.|[\w-])+)')
+TAG_RE = re.compile(r'(?:^|(?<=[\s>+~]))([a-zA-Z][\w-]*)')
+ESCAPE_RE = re.compile(r'\\(.)')
+
+
+class UsageCollector:
+    """html_backend handler collecting tags, classes and ids, and the script text of a page."""
+
+    def __init__(self, usage):
+        self.usage = usage
+        self.in_script = False
+
+    def start(self, tag, attrs, offset):
+        self.usage.tags.add(tag)
+        for name, value in attrs.items():
+            if not value:
+                continue
+            if name == 'class':
+                self.usage.classes.update(value.split())
+            elif name == 'id':
+                self.usage.ids.add(value.strip())
+            elif name.startswith('on'):
+                self.usage.add_script(value)
+        self.in_script = tag == 'script'
+
+    def end(self, tag):
+        self.in_script = False
+
+    def data(self, text, offset):
+        if self.in_script:
+            self.usage.add_script(text)
+
+
+class Usage:
+    def __init__(self, safelist=SAFELIST):
+        self.tags = set(IMPLIED_TAGS)
+        self.classes = set()
+        self.ids = set()
+        self.words = set()      # words inside JS strings
+        self.prefixes = set()   # JS string words ending in '-'
+        self.safelist = tuple(safelist)
+
+    def add_script(self, text):
+        for m in STRING_RE.finditer(text):
+            for word in WORD_RE.findall(next(g for g in m.groups() if g is not None)):
+                (self.prefixes if word.endswith('-') else self.words).add(word)
+
+    def _named(self, name, names):
+        return (name in names or name in self.words or any(name.startswith(p) for p in self.prefixes)
+                or any(fnmatch.fnmatchcase(name, pattern) for pattern in self.safelist))
+
+    def selector_used(self, selector):
+        part = structural(selector)
+        part = ATTRIBUTE_SELECTOR_RE.sub('', FUNCTIONAL_PSEUDO_RE.sub('', part))
+        for name in CLASS_RE.findall(part):
+            if not self._named(ESCAPE_RE.sub(r'\1', name), self.classes):
+                return False
+        for name in ID_RE.findall(part):
+            if not self._named(ESCAPE_RE.sub(r'\1', name), self.ids):
+                return False
+        for name in TAG_RE.findall(part):
+            if name.lower() not in self.tags and name.lower() not in self.words:
+                return False
+        return True
+
+
+def is_vendored(rel):
+    return any(rel.startswith(d) for d in VENDORED_DIRS)
+
+
+def collect_usage(fs, root, safelist):
+    usage = Usage(safelist)
+    backend = get_backend(html5=True)
+    for path in fs.iter_files(('.html', '.htm')):
+        if is_vendored(os.path.relpath(path, root).replace(os.sep, '/')):
+            continue
+        with open(path, 'r', encoding='utf-8', errors='replace') as fh:
+            backend.parse(fh.read(), UsageCollector(usage))
+    for path in fs.iter_files(('.js', '.mjs')):
+        if is_vendored(os.path.relpath(path, root).replace(os.sep, '/')):
+            continue
+        with open(path, 'r', encoding='utf-8', errors='replace') as fh:
+            usage.add_script(fh.read())
+    return usage
+
+
+def prune(text, usage):
+    """(pruned text, [selectors of the removed rules])."""
+    removed = []
+
+    def keep(rule):
+        if any(usage.selector_used(part) for part in split_selectors(rule.selector)):
+            return True
+        removed.append(rule.selector)
+        return False
+
+    return filtered(text, parse_css(text), keep), removed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Find and prune CSS rules no page or script uses.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('--safelist', action='append', default=[], metavar='PATTERN',
+                    help='class/id name pattern to always keep, e.g. "is-*" (repeatable)')
+    where = ap.add_mutually_exclusive_group()
+    where.add_argument('--out', help='write the pruned stylesheets under this directory')
+    where.add_argument('--in-place', action='store_true', help='prune the stylesheets under --root itself')
+    ap.add_argument('-v', '--verbose', action='store_true', help='list the removed selectors')
+    args = ap.parse_args(argv)
+    root = os.path.abspath(args.root)
+
+    fs = FsSnapshot.scan(root)
+    usage = collect_usage(fs, root, SAFELIST + tuple(args.safelist))
+    print('Used: {} tags, {} classes, {} ids; {} script words'.format(
+        len(usage.tags), len(usage.classes), len(usage.ids), len(usage.words) + len(usage.prefixes)))
+
+    total_before = total_after = 0
+    for path in sorted(fs.iter_files(('.css',))):
+        rel = os.path.relpath(path, root).replace(os.sep, '/')
+        if is_vendored(rel):
+            continue
+        with open(path, 'r', encoding='utf-8') as fh:
+            text = fh.read()
+        pruned, removed = prune(text, usage)
+        before, after = len(text.encode('utf-8')), len(pruned.encode('utf-8'))
+        total_before += before
+        total_after += after
+        print('{:<40} {:>8.1f} KB -> {:>8.1f} KB  (-{:.1f} KB, {} rules)'.format(
+            rel, before / 1024, after / 1024, (before - after) / 1024, len(removed)))
+        if args.verbose:
+            for selector in removed:
+                print('    ' + ' '.join(selector.split()))
+        dest = os.path.join(os.path.abspath(args.out), rel) if args.out else path if args.in_place else None
+        if dest and (pruned != text or dest != path):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with open(dest, 'w', encoding='utf-8') as fh:
+                fh.write(pruned)
+    print('Total: {:.1f} KB -> {:.1f} KB (-{:.1f} KB)'.format(
+        total_before / 1024, total_after / 1024, (total_before - total_after) / 1024))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,60 +1,90 @@
 #!/usr/bin/env python3
 """
 Quick replacement script to fix known broken paths and asset names.
+- The literal replacements and the blog-post-N regex below run through one
+  rewrite_engine.RuleSet: each file is scanned once, in this order (once per rule if the
+  RuleSet finds rules that can interact).
+- Prints the per-rule hit counts and warns about interacting, duplicate and shadowed rules.
+- --verify also rewrites every file one rule pass at a time and compares (exit 1 if any
+  differs).
+
+Run from repo root: python tools/quick_replace.py [--root DIR] [--verify] [-v]
 """
+import argparse
 import os
+import re
+import sys
 from pathlib import Path
 
+from rewrite_engine import RuleSet
+
 ROOT = Path(__file__).resolve().parents[1]
 FRONTEND = ROOT / 'frontend'
 
-REPLACE_MAP = {
+REPLACEMENTS = [
     # pages: ../books.html -> ../books/books.html
-    'href="../books.html"': 'href="../books/books.html"',
-    "href='../books.html'": "href='../books/books.html'",
+    ('href="../books.html"', 'href="../books/books.html"'),
+    ("href='../books.html'", "href='../books/books.html'"),
     # blog prev/next placeholders -> blog index
-    'href="previous-post.html"': 'href="index.html"',
-    'href="next-post.html"': 'href="index.html"',
-    "href='../blog/previous-post.html'": 'href="../blog/index.html"',
+    ('href="previous-post.html"', 'href="index.html"'),
+    ('href="next-post.html"', 'href="index.html"'),
+    ("href='../blog/previous-post.html'", 'href="../blog/index.html"'),
     # assets mapping
-    'assets/images/blog-1.jpg': 'assets/images/blog-post-1.png',
-    'assets/images/blog-2.jpg': 'assets/images/blog-post-2.jpg',
-    'assets/images/blog-3.jpg': 'assets/images/blog-post-3.jpg',
-    'assets/images/blog-4.jpg': 'assets/images/blog-post-4.jpg',
-    'assets/images/blog-5.jpg': 'assets/images/blog-post-5.jpg',
-    'assets/images/blog-6.jpg': 'assets/images/blog-post-6.jpg',
-    'assets/images/blog-featured.jpg': 'assets/images/blog-post-1.png',
-    'assets/images/blog-image.jpg': 'assets/images/blog-post-1.png',
-    'assets/images/author-raphael.jpg': 'assets/images/raphael.png',
-    "../../assets/images/blank": "../../assets/images/raphael.png",
-    # other patterns
-    'href="../books.html"': 'href="../books/books.html"',
-}
+    ('assets/images/blog-1.jpg', 'assets/images/blog-post-1.png'),
+    ('assets/images/blog-2.jpg', 'assets/images/blog-post-2.jpg'),
+    ('assets/images/blog-3.jpg', 'assets/images/blog-post-3.jpg'),
+    ('assets/images/blog-4.jpg', 'assets/images/blog-post-4.jpg'),
+    ('assets/images/blog-5.jpg', 'assets/images/blog-post-5.jpg'),
+    ('assets/images/blog-6.jpg', 'assets/images/blog-post-6.jpg'),
+    ('assets/images/blog-featured.jpg', 'assets/images/blog-post-1.png'),
+    ('assets/images/blog-image.jpg', 'assets/images/blog-post-1.png'),
+    ('assets/images/author-raphael.jpg', 'assets/images/raphael.png'),
+    ("../../assets/images/blank", "../../assets/images/raphael.png"),
+    # regex-based fixes
+    # blog-post-N.html -> post-N.html
+    (re.compile(r'blog-post-(\d+)\.html'), r'post-\1.html'),
+]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Fix known broken paths and asset names in HTML files.')
+    ap.add_argument('--root', default=str(FRONTEND), help='site root (default: frontend/)')
+    ap.add_argument('--verify', action='store_true',
+                    help='also apply the rules one pass at a time and compare (exit 1 if any file differs)')
+    ap.add_argument('-v', '--verbose', action='store_true', help='list the hit count of every rule')
+    args = ap.parse_args(argv)
+    rules = RuleSet(REPLACEMENTS)
+
+    # Replace occurrences in all html files
+    nd = []
+    mismatched = []
+    for root, dirs, files in os.walk(os.path.abspath(args.root)):
+        for f in files:
+            if not f.lower().endswith('.html'):
+                continue
+            path = Path(root) / f
+            with open(path, 'r', encoding='utf-8') as fh:
+                data = fh.read()
+            new = rules.rewrite(data)
+            if args.verify and new != rules.sequential(data):
+                mismatched.append(os.path.relpath(path, ROOT))
+            if new != data:
+                with open(path, 'w', encoding='utf-8') as fh:
+                    fh.write(new)
+                nd.append(os.path.relpath(path, ROOT))
+
+    print('Updated files:')
+    for p in sorted(set(nd)):
+        print('  ', p)
+
+    rules.print_report(args.verbose)
+    if args.verify:
+        print('Verify: {} files differ from sequential application'.format(len(mismatched)))
+        for p in mismatched:
+            print('  ', p)
+    print('Done')
+    return 1 if mismatched else 0
 
-import re
 
-# Replace occurrences in all html files
-nd = []
-for root, dirs, files in os.walk(FRONTEND):
-    for f in files:
-        if not f.lower().endswith('.html'):
-            continue
-        path = Path(root) / f
-        with open(path, 'r', encoding='utf-8') as fh:
-            data = fh.read()
-        new = data
-        for k, v in REPLACE_MAP.items():
-            new = new.replace(k, v)
-        # regex-based fixes
-        # blog-post-N.html -> post-N.html
-        new = re.sub(r'blog-post-(\d+)\.html', r'post-\1.html', new)
-        if new != data:
-            with open(path, 'w', encoding='utf-8') as fh:
-                fh.write(new)
-            nd.append(str(path.relative_to(ROOT)))
-
-print('Updated files:')
-for p in sorted(set(nd)):
-    print('  ', p)
-
-print('Done')
+if __name__ == '__main__':
+    sys.exit(main())
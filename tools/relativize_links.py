@@ -6,32 +6,106 @@ Relativize all local links and asset sources in frontend HTML files.
 - Preserve anchors/fragments
 - Skip external and anchor-only links
 
-Run: python tools/relativize_links.py (from repo root)
+Pages come from one FsSnapshot walk of frontend/, which also answers the existence checks
+for the resolution fallbacks instead of stat calls per attribute. resolve_target() is the
+link resolution shared with fingerprint_assets.py.
+A link resolves the same way from every page in a directory, so LinkResolver memoizes the
+rewritten value per (page directory, link value); most pages reference the same few assets.
+Pages are processed across a process pool (--jobs, default: all cores), each worker with its
+own memo; the output does not depend on the number of jobs.
+
+Run: python tools/relativize_links.py [--root DIR] [--jobs N] (from repo root)
 """
+import argparse
 import os
 import re
-from urllib.parse import urlparse, urlunparse
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+from fs_snapshot import FsSnapshot
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 FRONTEND = os.path.join(ROOT, 'frontend')
 
-HTML_FILES = []
-for root, dirs, files in os.walk(FRONTEND):
-    for f in files:
-        if f.lower().endswith('.html'):
-            HTML_FILES.append(os.path.join(root, f))
-
 # Patterns to find attributes in HTML: href, src
 HREF_SRC_RE = re.compile(r'(href|src)=("|\')([^"\']+)("|\')', re.IGNORECASE)
 
 # Skip if link starts with these
 SKIP_PREFIXES = ('http://', 'https://', 'mailto:', 'tel:', 'javascript:')
 
-changed = []
+# Paths starting with these are treated as relative to the site root even without a leading '/'
+ROOT_LIKE_PREFIXES = ('pages/', 'assets/', 'css/', 'js/', 'fonts/')
 
-for page in HTML_FILES:
-    with open(page, 'r', encoding='utf-8') as f:
-        content = f.read()
+
+def resolve_target(fs, root, page, path):
+    """The file a link path (no query/fragment) on page points at, with the fallbacks below; None if missing."""
+    # Normalize: treat root-like paths (leading '/' or beginning with these known root folders) as root relative
+    if path.startswith('/') or any(path.startswith(pref) for pref in ROOT_LIKE_PREFIXES):
+        target = os.path.normpath(os.path.join(root, path.lstrip('/')))
+    else:
+        # relative to current page
+        base_dir = os.path.dirname(page)
+        target = os.path.normpath(os.path.join(base_dir, path))
+
+    # If path doesn't exist, try some fallbacks: maybe the path is correct but missing extension
+    if not fs.exists(target):
+        # if it's linking to a directory index, try index.html
+        if fs.dir_index(target):
+            target = fs.dir_index(target)
+    # If still missing, try common alt mappings: convert '../books/...', '../about/...' etc to 'pages/books/...', 'pages/about/...'
+    if not fs.exists(target):
+        # Attempt to map '../books/books.html' -> 'pages/books/books.html'
+        stripped = path.lstrip('./')
+        if stripped.startswith('..'):
+            # remove leading ../ segments
+            s = re.sub(r'^(?:\.\./)+', '', path)
+            alt = os.path.normpath(os.path.join(root, 'pages', s))
+            if fs.exists(alt):
+                target = alt
+        # If direct 'books/books.html' (no pages prefix) found in the top-level pages folder
+        if not fs.exists(target):
+            alt2 = os.path.normpath(os.path.join(root, 'pages', path.lstrip('/')))
+            if fs.exists(alt2):
+                target = alt2
+    return target if fs.exists(target) else None
+
+
+class LinkResolver:
+    """resolve_target() plus relpath for link values, memoized per (page directory, value)."""
+
+    def __init__(self, fs, root):
+        self.fs = fs
+        self.root = root
+        self._memo = {}
+
+    def relative(self, page, value):
+        """value (a local link with its fragment) relative to page's directory; None if it does not resolve."""
+        page_dir = os.path.dirname(page)
+        key = (page_dir, value)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        # Parse value and preserve fragment
+        parsed = urlparse(value)
+        frag = parsed.fragment
+        target = resolve_target(self.fs, self.root, page, parsed.path)
+        rel = None
+        if target is not None:
+            # Compute relative path from page dir to target
+            rel = os.path.relpath(target, page_dir).replace('\\', '/')
+            if frag:
+                rel = f'{rel}#{frag}'
+        self._memo[key] = rel
+        return rel
+
+
+def relativize_page(fs, root, page, content, resolver=None):
+    """content with every resolvable local href/src made relative to page.
+
+    resolver: a LinkResolver for fs and root to share its memo between pages.
+    """
+    resolver = resolver or LinkResolver(fs, root)
 
     def replace_attr(match):
         attr = match.group(1)
@@ -47,59 +121,60 @@ for page in HTML_FILES:
                 return f'{attr}={quote}#{quote}'
             return match.group(0)
 
-        # Parse value and preserve fragment
-        parsed = urlparse(value)
-        frag = parsed.fragment
-        path = parsed.path
-
-        # Normalize: treat root-like paths (leading '/' or beginning with these known root folders) as FRONTEND relative
-        root_like_prefixes = ('pages/', 'assets/', 'css/', 'js/', 'fonts/')
-        if path.startswith('/') or any(path.startswith(pref) for pref in root_like_prefixes):
-            target = os.path.normpath(os.path.join(FRONTEND, path.lstrip('/')))
-        else:
-            # relative to current page
-            base_dir = os.path.dirname(page)
-            target = os.path.normpath(os.path.join(base_dir, path))
-
-        # If path doesn't exist, try some fallbacks: maybe the path is correct but missing extension
-        if not os.path.exists(target):
-            # if it's linking to a directory index, try index.html
-            if os.path.isdir(target) and os.path.exists(os.path.join(target, 'index.html')):
-                target = os.path.join(target, 'index.html')
-        # If still missing, try common alt mappings: convert '../books/...', '../about/...' etc to 'pages/books/...', 'pages/about/...'
-        if not os.path.exists(target):
-            # Attempt to map '../books/books.html' -> 'pages/books/books.html'
-            stripped = path.lstrip('./')
-            if stripped.startswith('..'):
-                # remove leading ../ segments
-                s = re.sub(r'^(?:\.\./)+', '', path)
-                alt = os.path.normpath(os.path.join(FRONTEND, 'pages', s))
-                if os.path.exists(alt):
-                    target = alt
-            # If direct 'books/books.html' (no pages prefix) found in the top-level pages folder
-            if not os.path.exists(target):
-                alt2 = os.path.normpath(os.path.join(FRONTEND, 'pages', path.lstrip('/')))
-                if os.path.exists(alt2):
-                    target = alt2
+        rel = resolver.relative(page, value)
         # If still missing, leave unchanged
-        if not os.path.exists(target):
+        if rel is None:
             return match.group(0)
-
-        # Compute relative path from page dir to target
-        page_dir = os.path.dirname(page)
-        rel = os.path.relpath(target, page_dir).replace('\\', '/')
-        if frag:
-            rel = f'{rel}#{frag}'
         # For images and js/css, keep relative
         return f'{attr}={quote}{rel}{quote}'
 
-    new_content = HREF_SRC_RE.sub(replace_attr, content)
-    if new_content != content:
-        with open(page, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        changed.append(os.path.relpath(page, ROOT))
+    return HREF_SRC_RE.sub(replace_attr, content)
+
+
+# Per-process state for --jobs workers, set once by the pool initializer
+_worker_resolver = None
+
+
+def _init_worker(fs, root):
+    global _worker_resolver
+    _worker_resolver = LinkResolver(fs, root)
+
+
+def relativize_file(page, resolver=None):
+    """Relativize the links of one page in place; True if it changed."""
+    resolver = resolver or _worker_resolver
+    with open(page, 'r', encoding='utf-8') as f:
+        content = f.read()
+    new_content = relativize_page(resolver.fs, resolver.root, page, content, resolver)
+    if new_content == content:
+        return False
+    with open(page, 'w', encoding='utf-8') as f:
+        f.write(new_content)
+    return True
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Relativize local links in HTML files.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='worker processes (default: all cores)')
+    args = ap.parse_args(argv)
+    root = os.path.abspath(args.root)
+
+    fs = FsSnapshot.scan(root)
+    pages = list(fs.iter_files(('.html',)))
+    if args.jobs > 1 and len(pages) > 1:
+        with ProcessPoolExecutor(min(args.jobs, len(pages)), initializer=_init_worker, initargs=(fs, root)) as pool:
+            results = list(pool.map(relativize_file, pages, chunksize=max(1, len(pages) // (args.jobs * 8))))
+    else:
+        resolver = LinkResolver(fs, root)
+        results = [relativize_file(page, resolver) for page in pages]
+    changed = [os.path.relpath(page, ROOT) for page, updated in zip(pages, results) if updated]
+
+    print('Updated files:')
+    for c in changed:
+        print('  ', c)
+    print('\nDone')
+
 
-print('Updated files:')
-for c in changed:
-    print('  ', c)
-print('\nDone')
+if __name__ == '__main__':
+    main()
@@ -3,37 +3,80 @@
 Remove first <h1> tag in HTML files when multiple <h1> tags exist and the first <h1> appears immediately under <body>.
 - This keeps the hero/main <h1> and removes the redundant one at the body start.
 - Backs up original file to .bak if a change is made.
+- Files with fewer than two '<h1' in their raw bytes are skipped without being decoded.
+- The <h1> and the whitespace after it are cut out of the source (html_patch.Patch), as the
+  regex this replaced did; the rest of the page keeps its bytes.
+  remove_duplicate_h1() is also the 'remove-duplicate-h1' step of fix_pipeline.py.
+
+Run from repo root: python tools/remove_duplicate_h1.py [--root DIR]
 """
 
+import argparse
 import os
-import re
+import sys
 from pathlib import Path
 
+from bs4 import NavigableString
+
+from html_patch import Patch
+from prefilter import Prefilter
+
 ROOT = Path(__file__).resolve().parents[1]
 FRONTEND = ROOT / 'frontend'
 
-changed_files = []
-for root, dirs, files in os.walk(FRONTEND):
-    for f in files:
-        if not f.lower().endswith('.html'):
-            continue
-        path = Path(root) / f
-        with open(path, 'r', encoding='utf-8') as fh:
-            data = fh.read()
-        h1_count = len(re.findall(r'<h1\b', data, flags=re.IGNORECASE))
-        if h1_count > 1:
-            # look for a first <body> followed by a top-level <h1> and remove that one
-            new = re.sub(r'(<body[^>]*>\s*)<h1[\s\S]*?</h1>\s*', r'\1', data, count=1, flags=re.IGNORECASE)
-            if new != data:
+# <h1\b, case-insensitive, at least twice
+TWO_H1 = Prefilter('two <h1>', literals=(b'<h1', b'<H1'), min_count=2)
+
+
+def remove_duplicate_h1(patch):
+    """Remove the <h1> that opens <body> when the page has another one; True if it was removed."""
+    soup = patch.soup
+    if len(soup.find_all('h1')) < 2:
+        return False
+    body = soup.find('body')
+    if body is None:
+        return False
+    # the first thing in <body> other than blank text must be the <h1>
+    first = next((node for node in body.contents
+                  if not (type(node) is NavigableString and not node.strip())), None)
+    if first is None or first.name != 'h1':
+        return False
+    patch.remove(first, trailing_space=True)
+    return True
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Remove a duplicate <h1> at the start of <body>.')
+    ap.add_argument('--root', default=str(FRONTEND), help='site root (default: frontend/)')
+    args = ap.parse_args(argv)
+
+    changed_files = []
+    for root, dirs, files in os.walk(os.path.abspath(args.root)):
+        for f in files:
+            if not f.lower().endswith('.html'):
+                continue
+            path = Path(root) / f
+            if not TWO_H1.check(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as fh:
+                data = fh.read()
+            patch = Patch(data)
+            if remove_duplicate_h1(patch):
                 bak = str(path) + '.bak'
                 if not os.path.exists(bak):
                     with open(bak, 'wb') as bfh:
                         bfh.write(data.encode('utf-8'))
                 with open(path, 'w', encoding='utf-8') as fh:
-                    fh.write(new)
-                changed_files.append(str(path.relative_to(ROOT)))
+                    fh.write(patch.text())
+                changed_files.append(os.path.relpath(path, ROOT))
+
+    print('Updated files:')
+    for p in changed_files:
+        print('  ', p)
+    TWO_H1.report()
+    print('Done')
+    return 0
+
 
-print('Updated files:')
-for p in changed_files:
-    print('  ', p)
-print('Done')
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,18 +3,22 @@
 Usage: python tools/resolve_conflicts.py [paths...]
 If no paths provided, defaults to frontend/ and backend/.
 This script makes in-place edits and prints files modified. Review before committing.
+Files that do not have all three markers in their raw bytes are skipped without being decoded.
 """
 import sys
 from pathlib import Path
 import re
 
+from prefilter import Prefilter
+
 paths = sys.argv[1:] or ['frontend', 'backend']
 pattern = re.compile(r'<<<<<<<.*?=======(.*?)>>>>>>>.*?\n', re.DOTALL)
+markers = Prefilter('conflict markers', literals=(b'<<<<<<<', b'=======', b'>>>>>>>'), require_all=True)
 
 modified = []
 for p in paths:
     for f in Path(p).rglob('*'):
-        if f.is_file():
+        if f.is_file() and markers.check(f):
             try:
                 s = f.read_text(encoding='utf-8')
             except Exception:
@@ -28,4 +32,5 @@ for p in paths:
 print('Modified files:')
 for m in modified:
     print(m)
+markers.report()
 print('Done. Please review changes before committing.')
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Responsive image variants for the site's PNG/JPEG images (needs Pillow: pip install pillow).
+- Every image under assets/images/ that a page shows with <img src> is resized to the WIDTHS breakpoints (never upscaled; an
+  image narrower than the largest breakpoint also gets a variant at its own width) and saved
+  as WebP, and as AVIF when Pillow was built with AVIF support, next to each other in
+  assets/images/responsive/<subdir>/<name>-<width>w.<format>.
+- Content-hash cached: .cache/ remembers each source's sha1 and the settings it was built
+  with, so unchanged images whose variants still exist are skipped. Variants of removed or
+  renamed images, and of images no page shows any more, are deleted.
+- Images are processed in parallel (--jobs, default: all cores).
+- The originals are kept as the <img> fallback. `python tools/enhance_seo_a11y.py --responsive`
+  then wraps <img> tags that have variants in <picture> with one <source srcset> per format.
+- The variants are committed with the site: Vercel, Netlify and the Docker image serve the tree
+  as it is and none of them runs this tool. A browser does not fall back to the <img> when a
+  <source> 404s, so --responsive refuses to rewrite pages while git does not track a variant.
+
+Run from repo root:
+    python tools/responsive_images.py [--root frontend] [--jobs N] [--force]
+"""
+import argparse
+import hashlib
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from site_index import SiteIndex, is_local_link, resolve_path
+from tool_cache import cache_path, load_json, save_json
+
+try:
+    from PIL import Image, features
+except ImportError:  # optional: pip install pillow (only needed to build variants)
+    Image = features = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+SOURCE_DIR = 'assets/images'
+VARIANT_DIR = 'assets/images/responsive'
+SOURCE_SUFFIXES = ('.png', '.jpg', '.jpeg')
+WIDTHS = (480, 960, 1600)
+QUALITY = {'avif': 55, 'webp': 80}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}   # <source> order: smallest first
+
+VARIANT_RE = re.compile(r'^(?P<stem>.+)-(?P<width>\d+)w\.(?P<fmt>avif|webp)$')
+
+
+def output_formats():
+    """Formats this Pillow can write, in <picture> preference order."""
+    if features is None:
+        return []
+    return [fmt for fmt in MIME_TYPES if features.check(fmt)]
+
+
+def target_widths(width):
+    """Breakpoint widths for an image `width` pixels wide, without upscaling."""
+    return sorted({min(w, width) for w in WIDTHS})
+
+
+def variant_path(root, source, width, fmt):
+    rel = os.path.relpath(source, os.path.join(root, SOURCE_DIR))
+    stem = os.path.splitext(rel)[0]
+    return os.path.join(root, VARIANT_DIR, '{}-{}w.{}'.format(stem, width, fmt))
+
+
+def build_variants(root, source, formats):
+    """Write every variant of one source image; return (source, [(path, bytes)])."""
+    written = []
+    with Image.open(source) as im:
+        im.load()
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGBA' if 'transparency' in im.info or im.mode in ('LA', 'PA') else 'RGB')
+        for width in target_widths(im.width):
+            height = max(1, round(im.height * width / im.width))
+            resized = im if width == im.width else im.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                path = variant_path(root, source, width, fmt)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                resized.save(path, fmt.upper(), quality=QUALITY[fmt])
+                written.append((path, os.path.getsize(path)))
+    return source, written
+
+
+def sha1_file(path):
+    with open(path, 'rb') as fh:
+        return hashlib.sha1(fh.read()).hexdigest()
+
+
+def source_images(index, root):
+    """The PNG/JPEG images under SOURCE_DIR that some page of index (a built SiteIndex) has an <img src> for."""
+    shown = {resolve_path(root, page.path, img.attrs['src']) for page in index for img in page.find('img')
+             if img.attrs.get('src') and is_local_link(img.attrs['src'])}
+    variant_dir = os.path.join(root, VARIANT_DIR) + os.sep
+    source_dir = os.path.join(root, SOURCE_DIR) + os.sep
+    return [p for p in index.fs.iter_files(SOURCE_SUFFIXES)
+            if p in shown and p.startswith(source_dir) and not p.startswith(variant_dir)]
+
+
+def variant_index(fs, root):
+    """{source image path without extension: {format: [(width, variant path)] by width}} from fs."""
+    variant_dir = os.path.join(root, VARIANT_DIR)
+    source_dir = os.path.join(root, SOURCE_DIR)
+    index = {}
+    for path in fs.iter_files(('.avif', '.webp')):
+        if not path.startswith(variant_dir + os.sep):
+            continue
+        m = VARIANT_RE.match(os.path.basename(path))
+        if not m:
+            continue
+        rel_dir = os.path.relpath(os.path.dirname(path), variant_dir)
+        key = os.path.normpath(os.path.join(source_dir, rel_dir, m.group('stem')))
+        index.setdefault(key, {}).setdefault(m.group('fmt'), []).append((int(m.group('width')), path))
+    for formats in index.values():
+        for variants in formats.values():
+            variants.sort()
+    return index
+
+
+class UntrackedVariants(Exception):
+    """Variants on disk that git does not track, so a deploy would not have them."""
+
+    def __init__(self, paths):
+        super().__init__('{} variants are not committed: {}'.format(
+            len(paths), ', '.join(os.path.relpath(p, ROOT) for p in paths[:5]) + (' ...' if len(paths) > 5 else '')))
+        self.paths = paths
+
+
+def tracked_files(root):
+    """Set of the absolute paths git tracks under root, or None when root is not in a git work tree."""
+    try:
+        out = subprocess.run(['git', 'ls-files', '-z', '--', '.'], cwd=root, capture_output=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {os.path.normpath(os.path.join(root, os.fsdecode(rel))) for rel in out.split(b'\0') if rel}
+
+
+def committed_variant_index(fs, root):
+    """variant_index() for rewriting pages; raise UntrackedVariants if git does not track every variant."""
+    index = variant_index(fs, root)
+    tracked = tracked_files(root)
+    if tracked is not None:
+        untracked = sorted(path for formats in index.values() for variants in formats.values()
+                           for _, path in variants if path not in tracked)
+        if untracked:
+            raise UntrackedVariants(untracked)
+    return index
+
+
+def picture_sources(variants, root, page_path, src, source_path):
+    """[(mime type, srcset)] for the <source> tags of an <img src=src> on page_path, or []."""
+    formats = variants.get(os.path.splitext(source_path)[0])
+    if not formats:
+        return []
+    sources = []
+    for fmt, mime in MIME_TYPES.items():
+        candidates = []
+        for width, path in formats.get(fmt, ()):
+            if src.startswith('/'):
+                url = '/' + os.path.relpath(path, root).replace(os.sep, '/')
+            else:
+                url = os.path.relpath(path, os.path.dirname(page_path)).replace(os.sep, '/')
+            candidates.append('{} {}w'.format(url, width))
+        if candidates:
+            sources.append((mime, ', '.join(candidates)))
+    return sources
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Build WebP/AVIF responsive variants of the site images.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='worker processes (default: all cores)')
+    ap.add_argument('--force', action='store_true', help='rebuild every variant, ignoring the cache')
+    args = ap.parse_args(argv)
+    root = os.path.abspath(args.root)
+
+    if Image is None:
+        print('Pillow is not installed (pip install pillow)', file=sys.stderr)
+        return 2
+    formats = output_formats()
+    settings = {'widths': list(WIDTHS), 'formats': formats, 'quality': QUALITY}
+    cache_file = cache_path('responsive_images', root)
+    data = {} if args.force else load_json(cache_file, {})
+    cached = data.get('sources', {}) if data.get('settings') == settings else {}
+
+    index = SiteIndex(root).build()
+    fs = index.fs
+    sources = source_images(index, root)
+    stems = {}
+    for path in sources:
+        stems.setdefault(os.path.splitext(path)[0], []).append(path)
+    clashes = [paths for paths in stems.values() if len(paths) > 1]
+    for paths in clashes:
+        print('Skipping images that would share variant names:',
+              ', '.join(os.path.relpath(p, ROOT) for p in paths), file=sys.stderr)
+    sources = [p for p in sources if len(stems[os.path.splitext(p)[0]]) == 1]
+
+    entries = {}
+    todo = []
+    for path in sources:
+        key = os.path.relpath(path, root).replace(os.sep, '/')
+        digest = sha1_file(path)
+        entry = cached.get(key)
+        if entry and entry['sha1'] == digest and all(fs.isfile(os.path.join(root, v)) for v in entry['variants']):
+            entries[key] = entry
+        else:
+            entries[key] = {'sha1': digest, 'variants': []}
+            todo.append(path)
+
+    if args.jobs > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(min(args.jobs, len(todo))) as pool:
+            results = list(pool.map(build_variants, [root] * len(todo), todo, [formats] * len(todo)))
+    else:
+        results = [build_variants(root, path, formats) for path in todo]
+    for path, written in results:
+        key = os.path.relpath(path, root).replace(os.sep, '/')
+        entries[key]['variants'] = [os.path.relpath(p, root).replace(os.sep, '/') for p, _ in written]
+
+    # delete variants no current source produces
+    keep = {os.path.join(root, v) for entry in entries.values() for v in entry['variants']}
+    removed = 0
+    for formats_by_source in variant_index(fs, root).values():
+        for variants in formats_by_source.values():
+            for _, path in variants:
+                if path not in keep:
+                    os.remove(path)
+                    removed += 1
+    save_json(cache_file, {'settings': settings, 'sources': entries})
+
+    original = sum(os.path.getsize(p) for p in sources)
+    largest = 0
+    for entry in entries.values():
+        by_format = {}
+        for v in entry['variants']:
+            m = VARIANT_RE.match(os.path.basename(v))
+            size = os.path.getsize(os.path.join(root, v))
+            by_format[m.group('fmt')] = max(by_format.get(m.group('fmt'), 0), size)
+        largest += min(by_format.values(), default=0)
+    print('Formats: {}'.format(', '.join(formats)))
+    print('{} images: {} built, {} unchanged, {} stale variants removed'.format(
+        len(sources), len(todo), len(sources) - len(todo), removed))
+    print('Originals {:.1f} KB; largest variant in the smallest format {:.1f} KB'.format(
+        original / 1024, largest / 1024))
+    return 1 if clashes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
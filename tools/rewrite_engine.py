@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Single-pass multi-pattern rewrite engine shared by the replacement fixers
+(apply_replacements.py, quick_replace.py, fix_divine_case.py).
+- A RuleSet takes the fixer's ordered (pattern, replacement) rules, literal strings or
+  compiled regexes, and scans each file once instead of once per rule:
+  - one regex of the rules' leading literals ('href="', 'assets/images/', ...) finds the
+    next position where any rule could match, at the speed of a literal search;
+  - there, the rules whose leading literal starts with that character are tried as one
+    alternation, one named group per rule, in rule order.
+  One big alternation of every rule would be tried at every character, and is much slower
+  than the passes it replaces.
+- Precedence is the order the rules used to be applied in one after another:
+  - where several rules match at the same position, the earliest rule wins;
+  - the replacement text is rescanned with only the rules after the one that produced it,
+    so a chain such as a.jpg -> b.jpg (one rule) -> b.png (a later one) still happens. A
+    replacement is short, so there the later rules whose leading literal it contains are
+    simply run one after another.
+  That equals sequential application unless a rule can match overlapping another rule's
+  match, or a later rule can match across the edge of an earlier rule's replacement. The
+  RuleSet checks for that when it is built, on the structure of the patterns (each one as a
+  sequence of character classes; anything it cannot model counts as overlapping), and a set
+  where it is possible is applied with RuleSet.sequential(), the old one-rule-per-pass
+  behaviour. With --verify the fixers also compare the two on every file.
+- hits counts the matches per rule (chained ones included) for the fixers' report.
+- warnings() lists the rule pairs that made the set fall back to sequential(), rules that
+  are duplicates of an earlier rule, literal rules an earlier rule always matches first
+  (shadowed: they only ever see text earlier rules produced), and rules whose replacements
+  a later rule rewrote again during the run.
+
+Use from a sibling tool:
+    from rewrite_engine import RuleSet
+    rules = RuleSet([(re.compile(r'post-(\\d+)\\.html'), r'/pages/blog/post-\\1.html'), ('a.jpg', 'a.png')])
+    new_text = rules.rewrite(text)
+    rules.print_report()
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+try:
+    from re import _parser as sre_parse   # Python 3.11+
+except ImportError:
+    import sre_parse
+
+SCOPED_FLAGS = (re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x')
+
+
+def _literal(items, prefix=False):
+    """The text parsed items match: the whole of it, or with prefix=True the literal lead (None if empty)."""
+    out = []
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            out.append(chr(av))
+            continue
+        inner = None
+        if op == sre_parse.MAX_REPEAT and av[0] == av[1]:
+            inner = _literal(av[2])
+            inner = inner * av[0] if inner is not None else None
+        elif op == sre_parse.SUBPATTERN:
+            inner = _literal(av[-1], prefix)
+            if prefix and inner is not None and _literal(av[-1]) is None:
+                out.append(inner)
+                break
+        if inner is None:
+            if prefix:
+                break
+            return None
+        out.append(inner)
+    return ''.join(out) or None
+
+
+def _parsed(regex):
+    if regex.flags & re.IGNORECASE:
+        return None
+    try:
+        return sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:   # re.error and patterns the parser version here reads differently
+        return None
+
+
+def literal_of(regex):
+    """The one string a regex matches when it has no alternatives, classes or variable repeats, else None."""
+    items = _parsed(regex)
+    return None if items is None else _literal(items)
+
+
+def leading_literal(regex):
+    """The literal text every match of regex starts with ('href="' for r'href="(\\d+)'), or None."""
+    items = _parsed(regex)
+    return None if items is None else _literal(items, prefix=True)
+
+
+# Interaction check: a pattern or replacement as a list of atoms (charset, min, max), a charset
+# being (predicate on a character, may match characters outside the rules' own alphabet)
+MAX_REPEAT = sre_parse.MAXREPEAT
+CATEGORIES = {getattr(sre_parse, 'CATEGORY_' + name): re.compile(escape) for name, escape in (
+    ('DIGIT', r'\d'), ('NOT_DIGIT', r'\D'), ('SPACE', r'\s'), ('NOT_SPACE', r'\S'),
+    ('WORD', r'\w'), ('NOT_WORD', r'\W'), ('LINEBREAK', r'\n'), ('NOT_LINEBREAK', r'[^\n]'))}
+ANY_CHAR = (lambda ch: True, True)
+ZERO_WIDTH = (sre_parse.AT,)
+
+
+@lru_cache(maxsize=None)
+def _literal_charset(c):
+    """The charset of the one character c (shared, so _resolve() works it out once)."""
+    return (lambda ch: ch == c), False
+
+
+def _charset(op, av, alphabet):
+    """The charset of one single-character item, or None."""
+    if op == sre_parse.LITERAL:
+        alphabet.add(chr(av))
+        return _literal_charset(chr(av))
+    if op == sre_parse.NOT_LITERAL:
+        alphabet.add(chr(av))
+        return (lambda ch, c=chr(av): ch != c), True
+    if op == sre_parse.ANY:
+        return ANY_CHAR
+    if op != sre_parse.IN:
+        return None
+    tests, negated, outside = [], False, False
+    for iop, iav in av:
+        if iop == sre_parse.NEGATE:
+            negated = True
+        elif iop == sre_parse.LITERAL:
+            alphabet.add(chr(iav))
+            tests.append(lambda ch, c=chr(iav): ch == c)
+        elif iop == sre_parse.RANGE:
+            tests.append(lambda ch, lo=iav[0], hi=iav[1]: lo <= ord(ch) <= hi)
+            outside = True
+        elif iop == sre_parse.CATEGORY and iav in CATEGORIES:
+            tests.append(lambda ch, regex=CATEGORIES[iav]: regex.match(ch) is not None)
+            outside = True
+        else:
+            return None
+    if negated:
+        return (lambda ch: not any(test(ch) for test in tests)), True
+    return (lambda ch: any(test(ch) for test in tests)), outside
+
+
+def _atoms(items, alphabet, groups):
+    """Atom list of parsed items, or None for constructs the check does not model (alternation, ...).
+
+    groups gets the atom list of every capturing group, for the replacements' group references.
+    """
+    out = []
+    for op, av in items:
+        if op in ZERO_WIDTH:
+            continue   # dropping an anchor only lets the pattern match more
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            lo, hi, sub = av
+            inner = _atoms(sub, alphabet, groups)
+            if inner is None:
+                return None
+            if len(inner) == 1 and inner[0][1] == inner[0][2] == 1:
+                out.append((inner[0][0], lo, hi))
+            elif lo == hi and lo * len(inner) <= 256:
+                out.extend(inner * lo)
+            else:
+                return None
+        elif op == sre_parse.SUBPATTERN:
+            inner = _atoms(av[-1], alphabet, groups)
+            if inner is None:
+                return None
+            if av[0] is not None:
+                groups[av[0]] = inner
+            out.extend(inner)
+        else:
+            charset = _charset(op, av, alphabet)
+            if charset is None:
+                return None
+            out.append((charset, 1, 1))
+    return out
+
+
+def _text_atoms(text, alphabet):
+    alphabet.update(text)
+    return [_literal_charset(c) for c in text]
+
+
+TEMPLATE_RE = re.compile(r'\\(?:(\d{1,2})|g<(\d+)>|(.))', re.S)
+TEMPLATE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v', 'a': '\a', 'b': '\b', '\\': '\\'}
+
+
+def _template_atoms(repl, groups, alphabet):
+    """Atom list of what a regex replacement template produces; an unmodelled group is any text."""
+    out, pos = [], 0
+    for m in TEMPLATE_RE.finditer(repl):
+        out.extend((charset, 1, 1) for charset in _text_atoms(repl[pos:m.start()], alphabet))
+        if m.group(3) is not None:
+            ch = TEMPLATE_ESCAPES.get(m.group(3))
+            if ch is None:
+                return None
+            out.extend((charset, 1, 1) for charset in _text_atoms(ch, alphabet))
+        else:
+            group = groups.get(int(m.group(1) or m.group(2)))
+            out.extend(group if group is not None else [(ANY_CHAR, 0, MAX_REPEAT)])
+        pos = m.end()
+    out.extend((charset, 1, 1) for charset in _text_atoms(repl[pos:], alphabet))
+    return out
+
+
+def _closure(atoms, state):
+    """The states reachable from state without consuming a character."""
+    out = [state]
+    i, count = state
+    while i < len(atoms) and count >= atoms[i][1]:
+        i, count = i + 1, 0
+        out.append((i, count))
+    return out
+
+
+def _steps(atoms, state):
+    """[(charset, next state)] for the characters state can consume."""
+    i, count = state
+    if i >= len(atoms) or count >= atoms[i][2]:
+        return []
+    charset, lo, hi = atoms[i]
+    count = count + 1 if hi < MAX_REPEAT else min(count + 1, max(lo, 1))
+    return [(charset, (i, count))]
+
+
+def _resolve(atoms, alphabet, memo):
+    """atoms with each charset as (the alphabet characters it matches, may match others)."""
+    out = []
+    for charset, lo, hi in atoms:
+        if id(charset) not in memo:
+            memo[id(charset)] = (frozenset(ch for ch in alphabet if charset[0](ch)), charset[1]), charset
+        out.append((memo[id(charset)][0], lo, hi))
+    return out
+
+
+def _intersect(a, b):
+    return (a[1] and b[1]) or not a[0].isdisjoint(b[0])
+
+
+@lru_cache(maxsize=1024)
+def _first_steps(y, inside):
+    """The states of atoms y after the first character of a match starting anywhere in y (inside:
+    after y's first character), as ({alphabet character: [states]}, [states after a charset that
+    also matches characters outside the alphabet])."""
+    starts = set(_closure(y, (0, 0)))
+    later, todo = set(), list(starts)
+    while todo:   # y states after one character or more
+        for _, nxt in _steps(y, todo.pop()):
+            for state in _closure(y, nxt):
+                if state not in later:
+                    later.add(state)
+                    todo.append(state)
+    by_char, outside = {}, []
+    for state in (later if inside else starts | later):
+        for charset, nxt in _steps(y, state):
+            for ch in charset[0]:
+                by_char.setdefault(ch, []).append(nxt)
+            if charset[1]:
+                outside.append(nxt)
+    return by_char, outside
+
+
+def _overlaps(x, y, inside, spill_only):
+    """Can a match of atoms x start inside text of atoms y and share a character with it?
+
+    inside: x starts after y's first character (else at any offset, its start included).
+    spill_only: only count an x that runs past the end of y (one y contains is fine).
+    """
+    todo, done = [], set()
+
+    def advance(xnext, ynext):
+        for nx in _closure(x, xnext):
+            for ny in _closure(y, ynext):
+                x_final, y_final = nx[0] == len(x), ny[0] == len(y)
+                if spill_only:
+                    if y_final and _steps(x, nx):
+                        return True
+                elif x_final or y_final:
+                    return True
+                if (nx, ny) not in done:
+                    done.add((nx, ny))
+                    todo.append((nx, ny))
+        return False
+
+    by_char, outside = _first_steps(tuple(y), inside)
+    for xs in _closure(x, (0, 0)):
+        for xset, xnext in _steps(x, xs):
+            ynexts = {ynext for ch in xset[0] for ynext in by_char.get(ch, ())}
+            if xset[1]:
+                ynexts.update(outside)
+            if any(advance(xnext, ynext) for ynext in ynexts):
+                return True
+    while todo:
+        xs, ys = todo.pop()
+        for xset, xnext in _steps(x, xs):
+            for yset, ynext in _steps(y, ys):
+                if _intersect(xset, yset) and advance(xnext, ynext):
+                    return True
+    return False
+
+
+def _literal_text(atoms):
+    """The one text atoms match, or None."""
+    out = []
+    for (chars, outside), lo, hi in atoms:
+        if outside or lo != 1 or hi != 1 or len(chars) != 1:
+            return None
+        out.extend(chars)
+    return ''.join(out)
+
+
+def _text_overlaps(x, y, inside, spill_only):
+    """_overlaps() for atoms that each match one literal text."""
+    k = y.find(x[0], 1 if inside else 0)
+    while k != -1:
+        rest = len(y) - k
+        if spill_only:
+            if len(x) > rest and x.startswith(y[k:]):
+                return True
+        elif y.startswith(x[:rest], k):
+            return True
+        k = y.find(x[0], k + 1)
+    return False
+
+
+def printable(text):
+    """text with control characters escaped ('post-\\x01.html' for a non-raw '\\1')."""
+    return ''.join(ch if ch.isprintable() else repr(ch)[1:-1] for ch in text)
+
+
+class Rule:
+    def __init__(self, index, pattern, repl):
+        self.index = index
+        self.literal = pattern if isinstance(pattern, str) else None
+        self.regex = re.compile(re.escape(pattern)) if isinstance(pattern, str) else pattern
+        self.repl = repl
+        self.source = pattern if isinstance(pattern, str) else pattern.pattern
+        self.lead = pattern if self.literal is not None else leading_literal(pattern)
+        # literal rules and regexes without group references in repl can skip match.expand()
+        self.fixed = repl if self.literal is not None or '\\' not in repl else None
+
+    def combinable(self, named=True):
+        """The pattern wrapped so it can sit in a shared alternation (scoped flags, no backrefs)."""
+        flags = ''.join(ch for flag, ch in SCOPED_FLAGS if self.regex.flags & flag)
+        body = '(?{}:{})'.format(flags, self.regex.pattern) if flags else '(?:{})'.format(self.regex.pattern)
+        return '(?P<r{}>{})'.format(self.index, body) if named else body
+
+    def label(self):
+        return '#{} {} -> {}'.format(self.index + 1, printable(self.source), printable(self.repl))
+
+
+class RuleSet:
+    def __init__(self, rules):
+        """rules: [(literal string or compiled regex, replacement)] in precedence order."""
+        self.rules = [Rule(i, pattern, repl) for i, (pattern, repl) in enumerate(rules)]
+        self.hits = Counter()
+        self.chained = Counter()   # (producing rule, rewriting rule) -> count
+        self._scan_regexes = None
+        for rule in self.rules:
+            if rule.regex.groupindex or re.search(r'\\[1-9]|\(\?P=', rule.regex.pattern):
+                raise ValueError('rule {} uses named groups or backreferences and cannot be combined'.format(
+                    rule.label()))
+        self.interaction = self._interaction()
+
+    def _interaction(self):
+        """(rule, other rule or None, how) for the first thing found that could make one scan differ
+        from sequential(), or None."""
+        alphabet = set()
+        matches, outputs = [], []
+        for rule in self.rules:
+            alphabet.update(rule.source, rule.repl)
+            if rule.literal is not None:
+                match = [(charset, 1, 1) for charset in _text_atoms(rule.literal, alphabet)]
+                output = [(charset, 1, 1) for charset in _text_atoms(rule.repl, alphabet)]
+            else:
+                groups = {}
+                items = _parsed(rule.regex)
+                match = None if items is None else _atoms(items, alphabet, groups)
+                output = None if match is None else _template_atoms(rule.repl, groups, alphabet)
+            matches.append(match)
+            outputs.append(output if output is not None else [(ANY_CHAR, 0, MAX_REPEAT)])
+        memo = {}
+        matches = [None if match is None else _resolve(match, alphabet, memo) for match in matches]
+        outputs = [_resolve(output, alphabet, memo) for output in outputs]
+        for rule, match in zip(self.rules, matches):
+            if match is None:
+                return rule, None, 'its pattern cannot be checked'
+            if all(lo == 0 for _, lo, _ in match):
+                return rule, None, 'it can match empty text'
+        texts = {id(atoms): _literal_text(atoms) for atoms in matches + outputs}
+
+        def overlaps(x, y, inside, spill_only):
+            tx, ty = texts[id(x)], texts[id(y)]
+            if tx is not None and ty is not None:
+                return _text_overlaps(tx, ty, inside, spill_only)
+            return _overlaps(x, y, inside, spill_only)
+        for a in self.rules:
+            for b in self.rules:
+                if a is b:
+                    continue
+                i, j = a.index, b.index
+                same = a.source == b.source and a.regex.flags == b.regex.flags
+                if not same and overlaps(matches[j], matches[i], inside=True, spill_only=False):
+                    return a, b, 'a match of #{} can start inside a match of #{}'.format(j + 1, i + 1)
+                if i > j:
+                    continue
+                if all(lo == 0 for _, lo, _ in outputs[i]):
+                    return a, b, 'the replacement of #{} can be empty'.format(i + 1)
+                if overlaps(matches[j], outputs[i], inside=False, spill_only=True):
+                    return a, b, 'a match of #{} can run past the end of the replacement of #{}'.format(j + 1, i + 1)
+                if overlaps(outputs[i], matches[j], inside=True, spill_only=False):
+                    return a, b, 'the replacement of #{} can start inside a match of #{}'.format(i + 1, j + 1)
+        return None
+
+    def _scanner(self):
+        """(candidate regex, {first char: combined regex}, combined regex for other chars).
+
+        The candidate regex finds the next position where some rule's leading literal starts
+        (or, for rules without one, where the rule itself matches); only the rules whose leading
+        literal starts with the character there are then tried, in rule order.
+        """
+        if self._scan_regexes is None:
+            rules = self.rules
+            leads = {rule.index: rule.lead for rule in rules}
+            wildcards = [rule for rule in rules if leads[rule.index] is None]
+            starts = sorted({lead for lead in leads.values() if lead is not None})
+            # a lead that starts with a shorter lead adds no candidate positions
+            starts = [lead for i, lead in enumerate(starts) if not any(lead.startswith(s) for s in starts[:i])]
+            candidates = re.compile('|'.join([re.escape(lead) for lead in starts] +
+                                             [rule.combinable(named=False) for rule in wildcards]))
+
+            def combined(subset):
+                return re.compile('|'.join(rule.combinable() for rule in subset))
+            by_char = {}
+            for ch in {lead[0] for lead in starts}:
+                by_char[ch] = combined([rule for rule in rules if leads[rule.index] is None or leads[rule.index][0] == ch])
+            self._scan_regexes = (candidates, by_char, combined(wildcards) if wildcards else None)
+        return self._scan_regexes
+
+    def _rescan(self, text, producer):
+        """A replacement rule #producer wrote, with the later rules applied. Replacements are
+        short: the later rules whose leading literal they contain run one after another, which
+        for rules that do not interact is the same as scanning with them once."""
+        for rule in self.rules[producer + 1:]:
+            if rule.lead is not None and rule.lead not in text:
+                continue
+            if rule.literal is not None:
+                n = text.count(rule.literal)
+                text = text.replace(rule.literal, rule.repl)
+            else:
+                text, n = rule.regex.subn(rule.repl, text)
+            if n:
+                self.hits[rule.index] += n
+                self.chained[producer, rule.index] += n
+        return text
+
+    def _rewrite(self, text):
+        if not self.rules:
+            return text
+        candidates, by_char, other = self._scanner()
+        out, pos, search = [], 0, 0
+        while True:
+            c = candidates.search(text, search)
+            if c is None:
+                break
+            at = c.start()
+            regex = by_char.get(text[at], other)
+            m = regex.match(text, at) if regex is not None else None
+            if m is None or m.end() == at:
+                search = at + 1
+                continue
+            rule = self.rules[int(m.lastgroup[1:])]
+            self.hits[rule.index] += 1
+            if rule.fixed is not None:
+                repl = rule.fixed
+            else:
+                repl = rule.regex.match(text, at).expand(rule.repl)
+            out.append(text[pos:at])
+            out.append(self._rescan(repl, rule.index))
+            pos = search = m.end()
+        if not out:
+            return text
+        out.append(text[pos:])
+        return ''.join(out)
+
+    def rewrite(self, text):
+        """text with every rule applied in one scan (see the module docstring for precedence),
+        or one pass per rule when the rules interact."""
+        if self.interaction:
+            return self.sequential(text, count=True)
+        return self._rewrite(text)
+
+    def sequential(self, text, count=False):
+        """text with the rules applied one after another, one full pass each (the reference);
+        with count, the matches are added to hits."""
+        for rule in self.rules:
+            if rule.literal is not None:
+                n = text.count(rule.literal)
+                text = text.replace(rule.literal, rule.repl)
+            else:
+                text, n = rule.regex.subn(rule.repl, text)
+            if count:
+                self.hits[rule.index] += n
+        return text
+
+    def warnings(self):
+        """['rule ...: reason'] for interacting, duplicate and shadowed rules, and the chains seen so far."""
+        out = []
+        if self.interaction:
+            rule, other, how = self.interaction
+            out.append('rule {} {}: {}; the rules are applied one pass at a time'.format(
+                rule.label(), 'and #{} interact'.format(other.index + 1) if other else 'cannot be combined', how))
+        for j, later in enumerate(self.rules):
+            text = later.literal if later.literal is not None else literal_of(later.regex)
+            for earlier in self.rules[:j]:
+                if earlier.source == later.source and earlier.regex.flags == later.regex.flags:
+                    if earlier.repl == later.repl:
+                        out.append('rule {} duplicates rule #{}'.format(later.label(), earlier.index + 1))
+                    else:
+                        out.append('rule {} repeats the pattern of rule #{} and only sees its output'.format(
+                            later.label(), earlier.index + 1))
+                    break
+                if text is not None and earlier.regex.match(text):
+                    out.append('rule {} is shadowed by rule #{} and only sees text earlier rules produced'.format(
+                        later.label(), earlier.index + 1))
+                    break
+        for (i, j), count in sorted(self.chained.items()):
+            out.append('rule {} output was rewritten again by rule #{} ({} times)'.format(
+                self.rules[i].label(), j + 1, count))
+        return out
+
+    def print_report(self, verbose=False):
+        """Per-rule hit counts (all rules with verbose, else the ones that hit) and the warnings."""
+        print('Rule hits:')
+        for rule in self.rules:
+            if verbose or self.hits[rule.index]:
+                print('  {:>6}  {}'.format(self.hits[rule.index], rule.label()))
+        unused = sum(1 for rule in self.rules if not self.hits[rule.index])
+        if unused and not verbose:
+            print('  ({} rules did not match)'.format(unused))
+        for warning in self.warnings():
+            print('Warning:', warning)
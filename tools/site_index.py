@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+Shared single-parse index of the pages and stylesheets under a site root (frontend/ by default).
+- Walks the root once (one FsSnapshot scandir pass, exposed as index.fs) and parses every HTML
+  page and .css file once into a compact Page model: ids/names, hrefs, srcs, headings, title,
+  lang and the source offset of every reference.
+- HTML and CSS are tokenized in the same pass: srcset candidates, <source>/<audio>/<video>/<track>,
+  <link rel=preload|icon|manifest|...>, inline style="" and <style> url()/@import, and
+  url()/@import inside stylesheets all end up in Page.srcs, giving the full asset dependency
+  graph (dependencies(), asset_closure()) for size and caching analysis.
+- Keeps a reverse-reference map so "who links to X" and "does X define #frag" are dict lookups.
+- The other tools (check_links, audit_frontend, relativize_links, ...) run as queries against it.
+
+Offsets are character offsets into the decoded text (what the fixers edit).
+
+build() options:
+- cache: a PageCache; files whose mtime/size (or, failing that, content hash) match the cached
+  entry are loaded from it instead of being read and parsed again.
+- jobs: parse the remaining files across a process pool; order stays the walk order.
+- memo: a dict shared between indexes; byte-identical files (same sha1), e.g. the same page under
+  frontend/ and public/, are parsed once and the result is relocated.
+
+Use from a sibling tool:
+    from site_index import SiteIndex
+    index = SiteIndex(FRONTEND).build()
+
+Or query from the command line (run from repo root):
+    python tools/site_index.py --links-to pages/blog/index.html
+    python tools/site_index.py --defines index.html#contact
+    python tools/site_index.py --assets index.html
+"""
+import hashlib
+import os
+import re
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from urllib.parse import urlparse, unquote
+
+from fs_snapshot import FsSnapshot
+from html_backend import get_backend
+from tool_cache import load_json, save_json
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+# One href/src attribute found on a page
+Ref = namedtuple('Ref', 'tag attr value offset')
+# A start tag the audits and fixers care about, with its attributes
+Element = namedtuple('Element', 'tag attrs offset')
+
+# Tags whose attributes are kept on the Page model
+INDEXED_TAGS = frozenset(('html', 'meta', 'link', 'a', 'img', 'script'))
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+# Tags whose src is a sub-resource of the page
+ASSET_SRC_TAGS = frozenset(('img', 'script', 'source', 'audio', 'video', 'track', 'embed', 'input'))
+# <link rel> tokens that make the browser fetch href
+ASSET_LINK_RELS = frozenset(('stylesheet', 'preload', 'modulepreload', 'prefetch', 'icon', 'shortcut',
+                             'apple-touch-icon', 'apple-touch-icon-precomposed', 'mask-icon', 'manifest'))
+
+# Comments and strings are matched (and skipped) so url()/@import inside them are ignored
+CSS_TOKEN_RE = re.compile(r"""
+    /\*.*?\*/
+  | @import\s+(?:url\(\s*(?P<iq>["']?)(?P<iu>[^"')]*)(?P=iq)\s*\)|(?P<sq>["'])(?P<is>[^"']*)(?P=sq))
+  | url\(\s*(?P<q>["']?)(?P<u>[^"')]*?)(?P=q)\s*\)
+  | "(?:\\.|[^"\\])*" | '(?:\\.|[^'\\])*'
+""", re.S | re.I | re.X)
+
+
+def css_refs(text, base=0):
+    """Yield (kind, value, offset) for every @import and url() in CSS text; kind is 'import' or 'url'.
+
+    Offsets are relative to base; with base None (position unknown) they are None too.
+    """
+    for m in CSS_TOKEN_RE.finditer(text):
+        for kind, group in (('url', 'u'), ('import', 'iu'), ('import', 'is')):
+            if m.group(group) is not None:
+                yield kind, m.group(group).strip(), None if base is None else base + m.start(group)
+                break
+
+
+def srcset_urls(value):
+    """URLs of the candidates in a srcset attribute ('a.png 1x, b.png 2x')."""
+    urls = []
+    for candidate in value.split(','):
+        parts = candidate.split()
+        if parts:
+            urls.append(parts[0])
+    return urls
+
+
+def iter_html_files(root):
+    """Yield every .html file under root in os.walk order."""
+    for dirpath, dirs, files in os.walk(root):
+        for f in files:
+            if f.lower().endswith('.html'):
+                yield os.path.join(dirpath, f)
+
+
+def is_local_link(link, skip_javascript=False):
+    """True for links that point at a file on disk (not anchors, mailto:, tel: or http(s))."""
+    if not link:
+        return False
+    lp = link.strip()
+    if lp.startswith('#'):
+        return False
+    if lp.startswith('mailto:') or lp.startswith('tel:'):
+        return False
+    if skip_javascript and lp.startswith('javascript:'):
+        return False
+    parsed = urlparse(lp)
+    if parsed.scheme in ('http', 'https', 'data', 'blob') or parsed.netloc:
+        return False
+    return True
+
+
+def resolve_path(root, base_file, link):
+    """Resolve a link against its page; leading '/' is relative to the site root."""
+    path = unquote(urlparse(link).path)
+    if path.startswith('/'):
+        return os.path.normpath(os.path.join(root, path.lstrip('/')))
+    return os.path.normpath(os.path.join(os.path.dirname(base_file), path))
+
+
+class Page:
+    """Everything the tools need to know about one HTML page or stylesheet, without its text."""
+    __slots__ = ('path', 'kind', 'size', 'mtime', 'digest', 'title', 'title_count', 'lang',
+                 'ids', 'names', 'headings', 'refs', 'hrefs', 'srcs', 'elements')
+
+    def __init__(self, path, kind='html'):
+        self.path = path
+        self.kind = kind     # 'html' or 'css'
+        self.size = 0
+        self.mtime = 0       # st_mtime_ns
+        self.digest = None   # sha1 of the file bytes
+        self.title = None
+        self.title_count = 0
+        self.lang = None
+        self.ids = set()
+        self.names = set()
+        self.headings = []   # (level, text, offset)
+        self.refs = []       # every href/src/srcset/poster/style url() on any tag
+        self.hrefs = []      # a[href]
+        self.srcs = []       # sub-resources: src/srcset/poster, asset <link>s, CSS url()/@import
+        self.elements = []   # start tags in INDEXED_TAGS
+
+    @property
+    def h1_count(self):
+        return sum(1 for level, _, _ in self.headings if level == 1)
+
+    def defines(self, frag):
+        return frag in self.ids or frag in self.names
+
+    def find(self, tag):
+        return [e for e in self.elements if e.tag == tag]
+
+    def __repr__(self):
+        return f'<Page {self.path}>'
+
+    def relocated(self, path, st):
+        """A copy of this page's parse result for a byte-identical file at another path."""
+        page = Page(path, self.kind)
+        for slot in self.__slots__:
+            setattr(page, slot, getattr(self, slot))
+        page.path = path
+        page.size = st.st_size
+        page.mtime = st.st_mtime_ns
+        return page
+
+    def to_dict(self):
+        """JSON-friendly form used by PageCache (path is stored as the cache key)."""
+        refs = [list(r) for r in self.refs]
+        positions = {id(r): i for i, r in enumerate(self.refs)}
+        return {
+            'kind': self.kind, 'size': self.size, 'mtime': self.mtime, 'digest': self.digest,
+            'title': self.title, 'title_count': self.title_count, 'lang': self.lang,
+            'ids': sorted(self.ids), 'names': sorted(self.names),
+            'headings': [list(h) for h in self.headings],
+            'refs': refs,
+            'hrefs': [positions[id(r)] for r in self.hrefs],
+            'srcs': [positions[id(r)] for r in self.srcs],
+            'elements': [list(e) for e in self.elements],
+        }
+
+    @classmethod
+    def from_dict(cls, path, d):
+        page = cls(path, d['kind'])
+        page.size = d['size']
+        page.mtime = d['mtime']
+        page.digest = d['digest']
+        page.title = d['title']
+        page.title_count = d['title_count']
+        page.lang = d['lang']
+        page.ids = set(d['ids'])
+        page.names = set(d['names'])
+        page.headings = [tuple(h) for h in d['headings']]
+        page.refs = [Ref(*r) for r in d['refs']]
+        page.hrefs = [page.refs[i] for i in d['hrefs']]
+        page.srcs = [page.refs[i] for i in d['srcs']]
+        page.elements = [Element(*e) for e in d['elements']]
+        return page
+
+
+class PageCollector:
+    """Fill a Page from the start/end/data events of one parser backend pass."""
+
+    def __init__(self, page):
+        self.page = page
+        self._heading = None   # [level, [chunks], offset] while inside h1..h6
+        self._in_title = False
+        self._title_chunks = []
+        self._in_style = False
+
+    def start(self, tag, a, offset):
+        page = self.page
+        if tag in INDEXED_TAGS:
+            page.elements.append(Element(tag, a, offset))
+        for attr in ('href', 'src'):
+            value = a.get(attr)
+            if value is not None:
+                ref = Ref(tag, attr, value, offset)
+                page.refs.append(ref)
+                if tag == 'a' and attr == 'href':
+                    page.hrefs.append(ref)
+                elif attr == 'src' and tag in ASSET_SRC_TAGS:
+                    page.srcs.append(ref)
+                elif tag == 'link' and attr == 'href' and ASSET_LINK_RELS.intersection((a.get('rel') or '').lower().split()):
+                    page.srcs.append(ref)
+        if a.get('srcset'):
+            for url in srcset_urls(a['srcset']):
+                self._asset(Ref(tag, 'srcset', url, offset))
+        if tag == 'video' and a.get('poster'):
+            self._asset(Ref(tag, 'poster', a['poster'], offset))
+        if a.get('style'):
+            for kind, url, _ in css_refs(a['style']):
+                self._asset(Ref(tag, 'style', url, offset))
+        if a.get('id') is not None:
+            page.ids.add(a['id'])
+        if a.get('name') is not None and tag in ('a', 'map', 'iframe', 'form', 'img', 'object'):
+            page.names.add(a['name'])
+        if tag == 'html' and 'lang' in a:
+            page.lang = a['lang']
+        elif tag == 'title':
+            page.title_count += 1
+            self._in_title = page.title_count == 1
+        elif tag in HEADING_TAGS:
+            self._close_heading()
+            self._heading = [int(tag[1]), [], offset]
+        elif tag == 'style':
+            self._in_style = True
+
+    def _asset(self, ref):
+        self.page.refs.append(ref)
+        self.page.srcs.append(ref)
+
+    def end(self, tag):
+        if tag == 'style':
+            self._in_style = False
+        elif tag == 'title' and self._in_title:
+            self._in_title = False
+            self.page.title = ''.join(self._title_chunks).strip()
+        elif tag in HEADING_TAGS:
+            self._close_heading()
+
+    def data(self, data, offset):
+        if self._in_style:
+            # <style> content arrives as one chunk starting at offset
+            for kind, url, url_offset in css_refs(data, offset):
+                self._asset(Ref('style', kind, url, url_offset))
+        if self._in_title:
+            self._title_chunks.append(data)
+        if self._heading is not None:
+            self._heading[1].append(data)
+
+    def _close_heading(self):
+        if self._heading is not None:
+            level, chunks, offset = self._heading
+            self.page.headings.append((level, ' '.join(''.join(chunks).split()), offset))
+            self._heading = None
+
+    def close(self):
+        self._close_heading()
+        if self._in_title:
+            self.page.title = ''.join(self._title_chunks).strip()
+
+
+def parse_page(path, text=None, st=None, digest=None, backend=None):
+    """Parse one HTML file into a Page. Pass text/st/digest if the caller already has them.
+
+    backend is an html_backend name or instance (default: the fastest installed).
+    """
+    page = Page(path)
+    st = st or os.stat(path)
+    page.size = st.st_size
+    page.mtime = st.st_mtime_ns
+    if text is None:
+        with open(path, 'rb') as fh:
+            data = fh.read()
+        digest = hashlib.sha1(data).hexdigest()
+        text = data.decode('utf-8')
+    page.digest = digest
+    collector = PageCollector(page)
+    get_backend(backend).parse(text, collector)
+    collector.close()
+    return page
+
+
+def parse_stylesheet(path, st=None):
+    """Parse one .css file into a Page of kind 'css' whose srcs are its url()/@import refs."""
+    page = Page(path, 'css')
+    st = st or os.stat(path)
+    page.size = st.st_size
+    page.mtime = st.st_mtime_ns
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    page.digest = hashlib.sha1(data).hexdigest()
+    for kind, url, offset in css_refs(data.decode('utf-8', errors='replace')):
+        ref = Ref('css', kind, url, offset)
+        page.refs.append(ref)
+        page.srcs.append(ref)
+    return page
+
+
+def parse_file(path, backend=None):
+    """parse_stylesheet for .css files, parse_page for everything else."""
+    if path.lower().endswith('.css'):
+        return parse_stylesheet(path)
+    return parse_page(path, backend=backend)
+
+
+class PageCache:
+    """On-disk cache of parsed Page models for one site root, keyed by relative path.
+
+    Other tools can keep their own per-page data next to the pages under `extra`.
+    """
+    VERSION = 3
+
+    def __init__(self, path, root):
+        self.path = path
+        self.root = os.path.abspath(root)
+        self.pages = {}   # rel path -> Page.to_dict()
+        self.extra = {}
+        self.backend = None   # html_backend name the pages were parsed with
+
+    def load(self):
+        data = load_json(self.path, {})
+        if data.get('version') == self.VERSION and data.get('root') == self.root:
+            self.pages = data.get('pages', {})
+            self.extra = data.get('extra', {})
+            self.backend = data.get('backend')
+        return self
+
+    def save(self):
+        save_json(self.path, {'version': self.VERSION, 'root': self.root, 'backend': self.backend,
+                              'pages': self.pages, 'extra': self.extra})
+
+    def key(self, path):
+        return os.path.relpath(path, self.root).replace('\\', '/')
+
+    def lookup(self, path, st):
+        """Return the cached Page for path if it is still valid, else None."""
+        entry = self.pages.get(self.key(path))
+        if entry is None:
+            return None
+        if entry['mtime'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return Page.from_dict(path, entry)
+        if entry['size'] != st.st_size:
+            return None
+        with open(path, 'rb') as fh:
+            digest = hashlib.sha1(fh.read()).hexdigest()
+        if digest != entry['digest']:
+            return None
+        entry['mtime'] = st.st_mtime_ns
+        return Page.from_dict(path, entry)
+
+    def store(self, page):
+        self.pages[self.key(page.path)] = page.to_dict()
+
+    def prune(self, paths):
+        keep = {self.key(p) for p in paths}
+        for k in list(self.pages):
+            if k not in keep:
+                del self.pages[k]
+
+
+class SiteIndex:
+    """All pages under a root, parsed once, plus the reverse-reference map."""
+
+    def __init__(self, root=FRONTEND, backend=None):
+        self.root = os.path.abspath(root)
+        self.backend = get_backend(backend)   # html_backend used for pages that need a parse
+        self.pages = {}          # abs path -> Page, in walk order
+        self.styles = {}         # abs path -> Page for .css files, in walk order
+        self.reparsed = set()    # paths parsed (not loaded from a cache) by build()
+        self.fs = None           # FsSnapshot of root, taken by build()
+        self._links_to = None    # abs target path -> [(Page, Ref)]
+
+    def build(self, cache=None, jobs=1, memo=None):
+        """Parse every page, reusing entries from cache (a PageCache) when unchanged.
+
+        memo is a {sha1: Page} dict shared between indexes; files whose bytes were
+        already parsed (in this or another root) reuse that result.
+        With jobs > 1 the pages that need parsing are spread over a process pool.
+        Paths that had to be parsed or relocated are recorded in self.reparsed.
+        A cache written with another parser backend is discarded.
+        """
+        if cache is not None and cache.backend != self.backend.name:
+            cache.pages = {}
+            cache.backend = self.backend.name
+        pages = {}
+        todo = {}   # sha1 (or path without a memo) -> identical files needing a parse
+        relocated = set()
+        self.fs = FsSnapshot.scan(self.root)
+        for path in self.fs.iter_files(('.html', '.css')):
+            st = os.stat(path)
+            page = cache.lookup(path, st) if cache is not None else None
+            if page is not None:
+                if memo is not None:
+                    memo.setdefault(page.digest, page)
+            elif memo is None:
+                todo[path] = [path]
+            else:
+                with open(path, 'rb') as fh:
+                    digest = hashlib.sha1(fh.read()).hexdigest()
+                if digest in memo:
+                    page = memo[digest].relocated(path, st)
+                    relocated.add(path)
+                else:
+                    todo.setdefault(digest, []).append(path)
+            pages[path] = page
+
+        groups = list(todo.values())
+        first = [group[0] for group in groups]
+        if jobs > 1 and len(first) > 1:
+            chunksize = max(1, len(first) // (jobs * 8))
+            with ProcessPoolExecutor(jobs) as pool:
+                parsed = list(pool.map(partial(parse_file, backend=self.backend.name), first, chunksize=chunksize))
+        else:
+            parsed = [parse_file(path, self.backend) for path in first]
+        for page, group in zip(parsed, groups):
+            if memo is not None:
+                memo[page.digest] = page
+            pages[page.path] = page
+            for twin in group[1:]:
+                pages[twin] = page.relocated(twin, os.stat(twin))
+                relocated.add(twin)
+
+        self.pages = {p: page for p, page in pages.items() if page.kind == 'html'}
+        self.styles = {p: page for p, page in pages.items() if page.kind == 'css'}
+        self.reparsed = relocated.union(*groups)
+        if cache is not None:
+            for path in self.reparsed:
+                cache.store(pages[path])
+            cache.prune(pages)
+        self._links_to = None
+        return self
+
+    def __iter__(self):
+        return iter(self.pages.values())
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __contains__(self, path):
+        return path in self.pages
+
+    def get(self, path):
+        """The Page (HTML page or stylesheet) for path, or None."""
+        page = self.pages.get(path)
+        return page if page is not None else self.styles.get(path)
+
+    def documents(self):
+        """Pages then stylesheets, each in walk order."""
+        yield from self.pages.values()
+        yield from self.styles.values()
+
+    def resolve(self, page, link):
+        """Filesystem path a link on page points at."""
+        base = page.path if isinstance(page, Page) else page
+        return resolve_path(self.root, base, link)
+
+    def links_to(self, target):
+        """[(page, ref)] for every local reference that resolves to target."""
+        if self._links_to is None:
+            links = {}
+            for page in self.documents():
+                for ref in page.refs:
+                    value = ref.value.strip()
+                    if not is_local_link(value, skip_javascript=True):
+                        continue
+                    links.setdefault(self.resolve(page, value), []).append((page, ref))
+            self._links_to = links
+        return self._links_to.get(os.path.normpath(os.path.abspath(target)), [])
+
+    def dependencies(self, page):
+        """Local files page loads directly (its srcs), deduplicated, in document order."""
+        deps = []
+        for ref in page.srcs:
+            value = ref.value.strip()
+            if value and is_local_link(value, skip_javascript=True):
+                deps.append(self.resolve(page, value))
+        return list(dict.fromkeys(deps))
+
+    def asset_closure(self, page):
+        """Every local file page loads, following @import/url() through indexed stylesheets."""
+        seen = {}
+        stack = list(reversed(self.dependencies(page)))
+        while stack:
+            path = stack.pop()
+            if path in seen:
+                continue
+            seen[path] = None
+            style = self.styles.get(path)
+            if style is not None:
+                stack.extend(reversed(self.dependencies(style)))
+        return list(seen)
+
+    def defines(self, target, frag):
+        """Does the HTML page at target define id/name frag? None if target is not an indexed page."""
+        page = self.pages.get(target)
+        if page is None:
+            return None
+        return page.defines(frag)
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description='Query the site index.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('--links-to', metavar='PATH', help='list pages linking to PATH (relative to root)')
+    ap.add_argument('--defines', metavar='PATH#FRAG', help='does PATH define the fragment?')
+    ap.add_argument('--assets', metavar='PATH', help='list every local file PATH loads (through stylesheets)')
+    args = ap.parse_args(argv)
+
+    index = SiteIndex(args.root).build()
+    print('Indexed', len(index), 'html files and', len(index.styles), 'stylesheets')
+    if args.assets:
+        page = index.get(os.path.normpath(os.path.join(index.root, args.assets)))
+        if page is None:
+            print(args.assets, 'is not an indexed page or stylesheet')
+            return 1
+        for path in index.asset_closure(page):
+            flag = '' if index.fs.exists(path) else '  (missing)'
+            print('  ', os.path.relpath(path, ROOT) + flag)
+    if args.links_to:
+        target = os.path.join(index.root, args.links_to)
+        hits = index.links_to(target)
+        print('Pages linking to', args.links_to + ':', len(hits))
+        for page, ref in hits:
+            print('  ', os.path.relpath(page.path, ROOT), '->', ref.value, '@', ref.offset)
+    if args.defines:
+        path, _, frag = args.defines.partition('#')
+        found = index.defines(os.path.normpath(os.path.join(index.root, path)), frag)
+        print(args.defines, {True: 'is defined', False: 'is NOT defined', None: 'is not an indexed page'}[found])
+        return 0 if found else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
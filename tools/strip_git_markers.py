@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 """Strip leftover Git conflict markers like <<<<<<<, =======, >>>>>>> from files.
 Backs up files by creating .bak if changed.
+Files without any marker in their raw bytes are skipped without being decoded.
 """
 import sys
 from pathlib import Path
 import re
+
+from prefilter import Prefilter
+
 paths = sys.argv[1:] or ['frontend', 'backend']
 marker_re = re.compile(r'^(?:<{7,}.*|>{7,}.*|={7,}\s*)$', re.MULTILINE)
+markers = Prefilter('conflict markers', literals=(b'<<<<<<<', b'>>>>>>>', b'======='))
 modified = []
 for p in paths:
     for f in Path(p).rglob('*'):
-        if f.is_file():
+        if f.is_file() and markers.check(f):
             try:
                 s = f.read_text(encoding='utf-8')
             except Exception:
@@ -25,4 +30,5 @@ for p in paths:
 print('Stripped markers from:')
 for m in modified:
     print(m)
+markers.report()
 print('Done.')
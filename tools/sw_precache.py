@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Generate the service worker's precache list (PRECACHE_MANIFEST in frontend/sw.js).
+- Built from the SiteIndex link graph: the START_PAGES, the pages they link to (a[href], up
+  to --depth hops) and every local file those pages load (CSS, JS, images, fonts, manifest,
+  following @import/url() through stylesheets). srcset candidates are left to the runtime
+  cache: the browser fetches one of them, so precaching all widths and formats is waste.
+- Only PRECACHE_SUFFIXES are listed, and files over --max-size are left to the runtime
+  cache (reported), so one install does not pull in large book covers or PDFs.
+- Every entry carries a revision (hash of the file), so clients refetch only the files that
+  changed; the list itself changing is what makes browsers install the new service worker,
+  without a version bump. PRECACHE_VERSION, a hash of the list, names the static cache the
+  new worker fills, so it never writes to the cache the old worker is serving from.
+- Fails (exit 1, sw.js untouched) if a page in the list loads a file that does not exist;
+  --skip-missing lists them as warnings and leaves them out instead.
+- --check only compares: exit 1 if sw.js is out of date (for CI).
+
+Run from repo root:
+    python tools/sw_precache.py [--root frontend] [--depth 1] [--max-size 512] [--check]
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+from site_index import SiteIndex, is_local_link
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+
+# '/' is served from ROOT_DOCUMENT; START_PAGES are precached whatever --depth is
+ROOT_DOCUMENT = 'index.html'
+START_PAGES = ('index.html', '404.html')
+PRECACHE_SUFFIXES = ('.html', '.css', '.js', '.mjs', '.json', '.webmanifest', '.png', '.jpg', '.jpeg', '.gif',
+                     '.svg', '.webp', '.avif', '.ico', '.woff', '.woff2')
+REVISION_LEN = 10
+
+MANIFEST_RE = re.compile(r"^const PRECACHE_MANIFEST = \[\n.*?^\];(?:\nconst PRECACHE_VERSION = '\w*';)?$",
+                         re.M | re.S)
+
+
+def revision(path):
+    with open(path, 'rb') as fh:
+        return hashlib.sha256(fh.read()).hexdigest()[:REVISION_LEN]
+
+
+def linked_pages(index, page):
+    """HTML pages page links to with a[href], in document order."""
+    out = []
+    for ref in page.hrefs:
+        value = ref.value.strip()
+        if not is_local_link(value, skip_javascript=True):
+            continue
+        target = index.resolve(page, value.split('#', 1)[0].split('?', 1)[0])
+        target = index.fs.dir_index(target) or target
+        if target in index.pages:
+            out.append(target)
+    return out
+
+
+def srcset_only(index, page):
+    """Files page loads only as srcset candidates, not from a src or href too."""
+    candidates, direct = set(), set()
+    for ref in page.srcs:
+        value = ref.value.strip()
+        if is_local_link(value, skip_javascript=True):
+            (candidates if ref.attr == 'srcset' else direct).add(index.resolve(page, value))
+    return candidates - direct
+
+
+def precache_files(index, depth):
+    """(files to precache in discovery order, {missing file: [pages loading it]})."""
+    pages = []
+    seen = set()
+    frontier = [os.path.join(index.root, p) for p in START_PAGES]
+    for _ in range(depth + 1):
+        next_frontier = []
+        for path in frontier:
+            if path in seen or path not in index.pages:
+                continue
+            seen.add(path)
+            pages.append(path)
+            next_frontier.extend(linked_pages(index, index.pages[path]))
+        frontier = next_frontier
+
+    files = {}
+    missing = {}
+    for path in pages:
+        files[path] = None
+        skip = srcset_only(index, index.pages[path])
+        for dep in index.asset_closure(index.pages[path]):
+            if not index.fs.isfile(dep):
+                missing.setdefault(dep, []).append(path)
+            elif dep not in skip:
+                files[dep] = None
+    return list(files), missing
+
+
+def manifest_entries(root, files, max_size):
+    """([(url, revision)], [(path, size) skipped as too large])."""
+    entries, skipped = [], []
+    for path in files:
+        if not path.lower().endswith(PRECACHE_SUFFIXES):
+            continue
+        size = os.path.getsize(path)
+        if size > max_size:
+            skipped.append((path, size))
+            continue
+        rel = os.path.relpath(path, root).replace(os.sep, '/')
+        rev = revision(path)
+        if rel == ROOT_DOCUMENT:
+            entries.append(('/', rev))
+        entries.append(('/' + rel, rev))
+    return entries, skipped
+
+
+def render(entries):
+    lines = ['const PRECACHE_MANIFEST = [']
+    lines += ["  {{ url: '{}', revision: '{}' }},".format(url.replace("'", "\\'"), rev) for url, rev in entries]
+    lines.append('];')
+    version = hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()[:REVISION_LEN]
+    lines.append("const PRECACHE_VERSION = '{}';".format(version))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Generate the sw.js precache list from the site link graph.')
+    ap.add_argument('--root', default=FRONTEND, help='site root (default: frontend/)')
+    ap.add_argument('--sw', help='service worker to update (default: <root>/sw.js)')
+    ap.add_argument('--depth', type=int, default=1, help='link hops from the start pages to include (default: 1)')
+    ap.add_argument('--max-size', type=int, default=512, metavar='KB',
+                    help='leave files larger than this to the runtime cache (default: 512)')
+    ap.add_argument('--skip-missing', action='store_true', help='warn about missing files instead of failing')
+    ap.add_argument('--check', action='store_true', help='do not write; exit 1 if sw.js is out of date')
+    args = ap.parse_args(argv)
+    root = os.path.abspath(args.root)
+    sw_path = os.path.abspath(args.sw or os.path.join(root, 'sw.js'))
+
+    index = SiteIndex(root).build()
+    files, missing = precache_files(index, args.depth)
+    if missing:
+        if args.skip_missing:
+            print('Warning: {} missing files left out of the precache list:'.format(len(missing)))
+        else:
+            print('Precache list not written: {} missing files'.format(len(missing)))
+        for path, pages in sorted(missing.items()):
+            print('  {} (loaded by {})'.format(os.path.relpath(path, ROOT),
+                                               ', '.join(os.path.relpath(p, ROOT) for p in pages[:3])))
+        if not args.skip_missing:
+            return 1
+    entries, skipped = manifest_entries(root, files, args.max_size * 1024)
+
+    with open(sw_path, 'r', encoding='utf-8') as fh:
+        text = fh.read()
+    if not MANIFEST_RE.search(text):
+        print('No "const PRECACHE_MANIFEST = [ ... ];" block in {}'.format(os.path.relpath(sw_path, ROOT)))
+        return 1
+    new_text = MANIFEST_RE.sub(lambda m: render(entries), text, count=1)
+
+    print('{} precache entries, {:.1f} KB'.format(
+        len(entries), sum(os.path.getsize(os.path.join(root, url.lstrip('/') or ROOT_DOCUMENT))
+                          for url, _ in entries) / 1024))
+    if skipped:
+        print('Left to the runtime cache (over {} KB):'.format(args.max_size))
+        for path, size in skipped:
+            print('  {} ({:.0f} KB)'.format(os.path.relpath(path, ROOT), size / 1024))
+    if new_text == text:
+        print('{} is up to date'.format(os.path.relpath(sw_path, ROOT)))
+        return 0
+    if args.check:
+        print('{} is out of date; run tools/sw_precache.py'.format(os.path.relpath(sw_path, ROOT)))
+        return 1
+    with open(sw_path, 'w', encoding='utf-8') as fh:
+        fh.write(new_text)
+    print('Updated', os.path.relpath(sw_path, ROOT))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
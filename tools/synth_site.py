@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic site of N blog posts for benchmarking the tools/ scripts.
+- Starts from a copy of frontend/ (pages, css, js and assets; the library/ and documents/
+  downloads are left out) so shared assets and real pages resolve as usual.
+- Adds N posts under pages/blog/synth/NNN/ (1000 per directory) rendered from the real
+  pages/blog/blog-template.html with the blog's primary navigation and footer nav, links
+  rewritten root-relative so they resolve from any depth.
+- Each post links to its neighbours, a few random posts (some via #postContent) and,
+  at the seeded rates, to missing pages and missing #anchors. The expected counts are
+  written to synth.json at the site root.
+- Output is deterministic for a given (pages, seed, rates).
+
+Run from repo root:
+    python tools/synth_site.py --pages 1000 --dest .cache/synth/1000 [--seed 0]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FRONTEND = os.path.join(ROOT, 'frontend')
+TEMPLATE = os.path.join(FRONTEND, 'pages', 'blog', 'blog-template.html')
+NAV_SOURCE = os.path.join(FRONTEND, 'pages', 'blog', 'index.html')
+
+# Left out of the copy: large downloads and tooling that no page needs
+SKIP_DIRS = ('library', 'documents', 'tools', 'test-results', 'node_modules')
+POSTS_PER_DIR = 1000
+SYNTH_DIR = os.path.join('pages', 'blog', 'synth')
+
+FEATURED_IMAGES = ['/assets/images/blog-post-{}.{}'.format(i, ext) for i, ext in
+                   ((1, 'png'), (2, 'jpg'), (3, 'jpg'), (4, 'jpg'))]
+CATEGORIES = ('Faith & Belief', 'Divine Guidance', 'Spiritual Growth', "God's Promises", 'Life Purpose')
+WORDS = ('grace', 'promise', 'horizon', 'journey', 'light', 'tunnel', 'purpose', 'faith', 'hope',
+         'wisdom', 'elegance', 'jurisprudence', 'calling', 'renewal', 'patience', 'courage')
+
+ATTR_RE = re.compile(r'''(href|src)=(["'])([^"']*)\2''')
+NAV_RE = re.compile(r'<nav class="main-nav".*?</nav>', re.S)
+FOOTER_NAV_RE = re.compile(r'<nav class="footer-nav".*?</nav>', re.S)
+TAGS_RE = re.compile(r'\{\{#TAGS\}\}(.*?)\{\{/TAGS\}\}', re.S)
+
+
+def root_relative(html, base_dir):
+    """Rewrite relative href/src values in html (a page in base_dir) to '/'-rooted paths."""
+    def repl(m):
+        value = m.group(3)
+        if not value or value.startswith(('/', '#', 'http:', 'https:', 'mailto:', 'tel:', 'javascript:', 'data:', '{{')):
+            return m.group(0)
+        path = os.path.normpath(os.path.join(base_dir, value)).replace(os.sep, '/')
+        return '{}={}/{}{}'.format(m.group(1), m.group(2), path.lstrip('./'), m.group(2))
+    return ATTR_RE.sub(repl, html)
+
+
+def copy_skeleton(dest):
+    skip = {os.path.join(FRONTEND, d) for d in SKIP_DIRS}
+
+    def ignore(directory, names):
+        return [n for n in names if os.path.join(directory, n) in skip or n.endswith('.bak')]
+    shutil.copytree(FRONTEND, dest, ignore=ignore)
+
+
+def post_path(i):
+    return '/{}/{:03d}/post-{}.html'.format(SYNTH_DIR.replace(os.sep, '/'), i // POSTS_PER_DIR, i)
+
+
+def load_template():
+    """blog-template.html with the blog's real primary and footer navigation, links root-relative."""
+    with open(TEMPLATE, 'r', encoding='utf-8') as fh:
+        template = fh.read()
+    with open(NAV_SOURCE, 'r', encoding='utf-8') as fh:
+        blog_index = fh.read()
+    nav = NAV_RE.search(blog_index).group(0)
+    footer_nav = FOOTER_NAV_RE.search(blog_index).group(0)
+    template = NAV_RE.sub(lambda m: nav, template, count=1)
+    template = template.replace('</footer>', footer_nav + '\n</footer>', 1) if '</footer>' in template \
+        else template.replace('</body>', '<footer>' + footer_nav + '</footer>\n</body>', 1)
+    return root_relative(template, 'pages/blog')
+
+
+def render_post(template, i, pages, rng, rates, counts):
+    title = ' '.join(rng.choice(WORDS).title() for _ in range(4))
+    tags = rng.sample(WORDS, 3)
+    body = TAGS_RE.sub(lambda m: ''.join(m.group(1).replace('{{.}}', t) for t in tags), template)
+    values = {
+        'POST_TITLE': '{} #{}'.format(title, i),
+        'POST_SUBTITLE': 'Synthetic post {} of {}'.format(i, pages),
+        'POST_DESCRIPTION': 'Synthetic benchmark post about ' + ', '.join(tags),
+        'POST_DATE': '2025-{:02d}-{:02d}'.format(i % 12 + 1, i % 28 + 1),
+        'READ_TIME': str(3 + i % 9),
+        'CATEGORY': CATEGORIES[i % len(CATEGORIES)],
+        'FEATURED_IMAGE': FEATURED_IMAGES[i % len(FEATURED_IMAGES)],
+        'PREV_POST_URL': post_path((i - 1) % pages),
+        'NEXT_POST_URL': post_path((i + 1) % pages),
+    }
+    for key, value in values.items():
+        body = body.replace('{{' + key + '}}', value)
+
+    links = []
+    for _ in range(3):
+        target = post_path(rng.randrange(pages))
+        links.append(target + ('#postContent' if rng.random() < 0.5 else ''))
+    if rng.random() < rates['broken_link']:
+        links.append('/{}/missing-{}.html'.format(SYNTH_DIR.replace(os.sep, '/'), i))
+        counts['broken_links'] += 1
+    if rng.random() < rates['broken_anchor']:
+        links.append(post_path(rng.randrange(pages)) + '#no-such-section')
+        counts['broken_anchors'] += 1
+    related = ''.join('<li><a href="{}">Related post</a></li>'.format(link) for link in links)
+    return body.replace('</article>', '<ul class="related-posts">{}</ul>\n</article>'.format(related), 1)
+
+
+def generate(dest, pages, seed=0, broken_link=0.02, broken_anchor=0.02):
+    """Write the synthetic site to dest (replacing it); return the synth.json summary."""
+    if os.path.exists(dest):
+        shutil.rmtree(dest)
+    copy_skeleton(dest)
+    template = load_template()
+    rng = random.Random(seed)
+    rates = {'broken_link': broken_link, 'broken_anchor': broken_anchor}
+    counts = {'broken_links': 0, 'broken_anchors': 0}
+    for i in range(pages):
+        path = os.path.join(dest, post_path(i).lstrip('/'))
+        if i % POSTS_PER_DIR == 0:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(render_post(template, i, pages, rng, rates, counts))
+    summary = {'pages': pages, 'seed': seed, 'rates': rates, 'seeded': counts,
+               'html_files': sum(1 for _, _, files in os.walk(dest) for f in files if f.endswith('.html'))}
+    with open(os.path.join(dest, 'synth.json'), 'w', encoding='utf-8') as fh:
+        json.dump(summary, fh, indent=2)
+    return summary
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Generate a synthetic site for benchmarks.')
+    ap.add_argument('--pages', type=int, required=True, help='number of synthetic blog posts')
+    ap.add_argument('--dest', required=True, help='output directory (replaced if it exists)')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--broken-link-rate', type=float, default=0.02)
+    ap.add_argument('--broken-anchor-rate', type=float, default=0.02)
+    args = ap.parse_args(argv)
+    summary = generate(os.path.abspath(args.dest), args.pages, args.seed,
+                       args.broken_link_rate, args.broken_anchor_rate)
+    print('Generated {html_files} html files ({pages} synthetic posts); seeded {seeded}'.format(**summary))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
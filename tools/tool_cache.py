@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+The .cache/ files the incremental tools keep between runs (check_links, critical_css,
+generate_sitemap, precompress, responsive_images, site_index, external_links).
+- cache_path(name, root): one file per tool and site root, keyed on a hash of the root's
+  absolute path, so public/ and frontend/ (or two checkouts) never share one; the root's
+  basename in the name is only for reading.
+- load_json() treats a missing or unreadable file as no cache; save_json() writes to a
+  temp file and renames it into place, so an interrupted run never leaves half a cache.
+
+Use from a sibling tool:
+    from tool_cache import cache_path, load_json, save_json
+    path = cache_path('precompress', root)
+    data = load_json(path, {})
+    save_json(path, data)
+"""
+import hashlib
+import json
+import os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CACHE_DIR = os.path.join(ROOT, '.cache')
+
+
+def cache_path(name, root):
+    """.cache/<name>-<root basename>-<hash of the absolute root>.json"""
+    root = os.path.abspath(root)
+    digest = hashlib.sha1(root.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, '{}-{}-{}.json'.format(name, os.path.basename(root) or 'root', digest))
+
+
+def load_json(path, default=None):
+    """The JSON in path, or default if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data, **dump_args):
+    """Write data to path atomically (temp file + os.replace)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(data, fh, **dump_args)
+    os.replace(tmp, path)